@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import EquipmentDataset, EquipmentRecord
+from .models import EquipmentDataset, EquipmentRecord, EquipmentTypeAggregate, RetentionPolicy, UploadJob, UploadSession
 
 
 @admin.register(EquipmentDataset)
 class EquipmentDatasetAdmin(admin.ModelAdmin):
-    list_display = ['filename', 'uploaded_by', 'uploaded_at', 'total_count']
+    list_display = ['filename', 'uploaded_by', 'uploaded_at', 'total_count', 'archived_at']
     list_filter = ['uploaded_at', 'uploaded_by']
     search_fields = ['filename']
     readonly_fields = ['uploaded_at']
@@ -15,3 +15,28 @@ class EquipmentRecordAdmin(admin.ModelAdmin):
     list_display = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
     list_filter = ['equipment_type', 'dataset']
     search_fields = ['equipment_name', 'equipment_type']
+
+
+@admin.register(EquipmentTypeAggregate)
+class EquipmentTypeAggregateAdmin(admin.ModelAdmin):
+    list_display = ['equipment_type', 'dataset', 'count', 'flowrate_mean', 'pressure_mean', 'temperature_mean']
+    list_filter = ['equipment_type', 'dataset']
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'uploaded_by', 'status', 'attempts', 'rows_processed', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'uploaded_by', 'status', 'size', 'rows_processed', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'finished_at']
+
+
+@admin.register(RetentionPolicy)
+class RetentionPolicyAdmin(admin.ModelAdmin):
+    list_display = ['user', 'hot_datasets', 'max_datasets']
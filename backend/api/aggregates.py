@@ -0,0 +1,113 @@
+"""
+Per equipment type aggregates and per unit points of dataset records
+
+The aggregates are a queryable copy of the per-type figures computed by
+api.statistics, stored as rows so they can be filtered and joined across
+datasets (see api.trends). They are never computed separately. Unit points
+hold the parameters of every equipment name in a dataset; when a name
+occurs several times, its last record wins, like in dataset comparisons.
+"""
+
+import math
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from .models import EquipmentTypeAggregate, EquipmentUnitPoint
+from . import columnar
+
+
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+
+# Aggregate field suffix -> quantile
+QUANTILES = {'p25': 0.25, 'median': 0.5, 'p75': 0.75}
+
+AGGREGATE_STATISTICS = ['mean', 'min', 'max', 'std'] + list(QUANTILES)
+
+
+def type_aggregate_rows(statistics):
+    """
+    Per-type aggregate fields taken from a compute_statistics() result
+    
+    Args:
+        statistics: Dict as returned by api.statistics.compute_statistics
+    
+    Returns:
+        List of dicts with equipment_type, count and <parameter>_<stat> keys
+    """
+    rows = []
+    for eq_type, by_parameter in statistics['by_type'].items():
+        row = {'equipment_type': eq_type, 'count': statistics['type_counts'][eq_type]}
+        for param in PARAMETERS:
+            for stat in AGGREGATE_STATISTICS:
+                row[f'{param}_{stat}'] = by_parameter[param][stat]
+        rows.append(row)
+    return rows
+
+
+def store_type_aggregates(dataset, statistics):
+    """
+    Replace the per-type aggregates of a dataset
+    
+    Args:
+        dataset: EquipmentDataset instance
+        statistics: The dataset's compute_statistics() result
+    """
+    with transaction.atomic():
+        dataset.aggregates.all().delete()
+        EquipmentTypeAggregate.objects.bulk_create(
+            EquipmentTypeAggregate(dataset=dataset, **row) for row in type_aggregate_rows(statistics)
+        )
+
+
+def get_type_aggregates(dataset):
+    """Per-type aggregates of a dataset (empty until computed, see backfill_statistics)"""
+    return dataset.aggregates.all()
+
+
+def _value(value):
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def unit_point_rows(columns):
+    """
+    One row per equipment name of record columns, the last record winning
+
+    Args:
+        columns: Mapping with equipment_name, equipment_type and parameter
+            arrays in record order (as returned by columnar.read_columns)
+
+    Returns:
+        List of dicts with equipment_name, equipment_type and the parameters
+    """
+    names = pd.Index(columns['equipment_name'].astype(str))
+    kept = (~names.duplicated(keep='last')).nonzero()[0]
+    types = columns['equipment_type']
+    return [
+        {
+            'equipment_name': names[row],
+            'equipment_type': str(types[row]),
+            **{param: _value(columns[param][row]) for param in PARAMETERS},
+        }
+        for row in kept
+    ]
+
+
+def store_unit_points(dataset, columns=None):
+    """
+    Replace the unit points of a dataset
+
+    Args:
+        dataset: EquipmentDataset instance
+        columns: Record columns if already at hand (see unit_point_rows()),
+            otherwise they are read through columnar storage
+    """
+    if columns is None:
+        columns = columnar.read_columns(dataset, ['equipment_name', 'equipment_type'] + PARAMETERS)
+    rows = unit_point_rows(columns)
+    with transaction.atomic():
+        dataset.unit_points.all().delete()
+        EquipmentUnitPoint.objects.bulk_create(
+            (EquipmentUnitPoint(dataset=dataset, **row) for row in rows),
+            batch_size=settings.INGEST_BATCH_SIZE
+        )
@@ -0,0 +1,177 @@
+"""
+Per equipment type outlier detection over record parameters
+
+Every record gets a bitmask with two bits per parameter: one for a robust
+z-score (based on the median and MAD of its type) above
+ANOMALY_MAD_THRESHOLD, one for a value outside the Tukey fences
+Q1 - k * IQR / Q3 + k * IQR of its type, with k = ANOMALY_IQR_FACTOR.
+Rows are grouped by type once, with a stable argsort of the type codes
+(as in api.statistics); medians and quartiles of each type segment come
+from np.quantile and np.median.
+"""
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from .aggregates import PARAMETERS
+from .models import EquipmentRecord
+from . import columnar
+
+
+METHODS = ['mad', 'iqr']
+
+# Record ids per UPDATE ... WHERE id IN (...) statement
+UPDATE_BATCH_SIZE = 500
+
+# Scale making the MAD (or mean absolute deviation) a consistent estimator of the std
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.253314
+
+
+def flag_bit(parameter, method):
+    """Bit of the anomaly bitmask for a parameter and detection method"""
+    return 1 << (PARAMETERS.index(parameter) * len(METHODS) + METHODS.index(method))
+
+
+def decode_flags(flags):
+    """List of "<parameter>_<method>" names set in a bitmask"""
+    return [
+        f'{parameter}_{method}'
+        for parameter in PARAMETERS for method in METHODS
+        if flags & flag_bit(parameter, method)
+    ]
+
+
+def matching_flag_values(parameter=None, method=None):
+    """
+    Every non-zero bitmask with at least one of the selected bits set
+
+    Lets a bitmask filter run as a plain ``anomaly_flags__in`` lookup.
+    """
+    mask = 0
+    for p in ([parameter] if parameter else PARAMETERS):
+        for m in ([method] if method else METHODS):
+            mask |= flag_bit(p, m)
+    return [value for value in range(1, 1 << (len(PARAMETERS) * len(METHODS))) if value & mask]
+
+
+def _limits(values):
+    """Median, MAD-based scale and Tukey fences of one group, in linear time"""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75], method='linear')
+    deviations = np.abs(values - median)
+    mad = float(np.median(deviations))
+    if mad > 0:
+        scale = mad / MAD_SCALE
+    else:
+        # More than half the values equal the median; fall back to the mean deviation
+        scale = float(deviations.mean()) * MEAN_AD_SCALE
+    iqr = q3 - q1
+    return {
+        'median': float(median),
+        'mad': mad,
+        'scale': scale,
+        'lower_fence': float(q1 - settings.ANOMALY_IQR_FACTOR * iqr),
+        'upper_fence': float(q3 + settings.ANOMALY_IQR_FACTOR * iqr),
+    }
+
+
+def detect_anomalies(columns):
+    """
+    Anomaly bitmask of every record and the limits used per type
+
+    Args:
+        columns: Mapping with an equipment_type array and one float array
+            per parameter, rows in record order
+
+    Returns:
+        Tuple of an int16 array of bitmasks and a dict of limits by type
+        and parameter
+    """
+    codes, types = pd.factorize(np.asarray(columns['equipment_type'], dtype=object))
+    flags = np.zeros(len(codes), dtype=np.int16)
+    limits = {str(eq_type): {} for eq_type in types}
+    parameters = {parameter: np.asarray(columns[parameter], dtype=np.float64) for parameter in PARAMETERS}
+
+    # Row indices grouped by type, each type a contiguous segment
+    order = np.argsort(codes, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(types)))))
+
+    for code, eq_type in enumerate(types):
+        rows = order[bounds[code]:bounds[code + 1]]
+        for parameter in PARAMETERS:
+            values = parameters[parameter][rows]
+            group_limits = _limits(values)
+            limits[str(eq_type)][parameter] = group_limits
+            if group_limits is None:
+                continue
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if group_limits['scale'] > 0:
+                    z_scores = np.abs(values - group_limits['median']) / group_limits['scale']
+                    flags[rows[z_scores > settings.ANOMALY_MAD_THRESHOLD]] |= flag_bit(parameter, 'mad')
+                outside = (values < group_limits['lower_fence']) | (values > group_limits['upper_fence'])
+                flags[rows[outside]] |= flag_bit(parameter, 'iqr')
+
+    return flags, limits
+
+
+def summarize(flags, limits):
+    """Counts of flagged records, overall and per flag, with the limits used"""
+    return {
+        'mad_threshold': settings.ANOMALY_MAD_THRESHOLD,
+        'iqr_factor': settings.ANOMALY_IQR_FACTOR,
+        'anomalous_count': int(np.count_nonzero(flags)),
+        'counts': {
+            f'{parameter}_{method}': int(np.count_nonzero(flags & flag_bit(parameter, method)))
+            for parameter in PARAMETERS for method in METHODS
+        },
+        'limits': limits,
+    }
+
+
+def store_anomalies(dataset, columns=None):
+    """
+    Flag the anomalous records of a dataset and save the summary
+
+    Records are updated with one UPDATE per distinct non-zero bitmask (and
+    batch of ids), so the queries scale with the anomalies, not the records.
+    """
+    if columns is None:
+        columns = columnar.read_columns(dataset, ['equipment_type'] + PARAMETERS)
+    flags, limits = detect_anomalies(columns)
+
+    with transaction.atomic():
+        flagged = np.flatnonzero(flags)
+        if len(flagged):
+            # Columnar rows are in record id order
+            ids = np.fromiter(dataset.records.order_by('id').values_list('id', flat=True), dtype=np.int64)
+            for value in np.unique(flags[flagged]):
+                value_ids = ids[flagged[flags[flagged] == value]].tolist()
+                for start in range(0, len(value_ids), UPDATE_BATCH_SIZE):
+                    batch = value_ids[start:start + UPDATE_BATCH_SIZE]
+                    EquipmentRecord.objects.filter(id__in=batch).update(anomaly_flags=int(value))
+
+        dataset.set_anomalies_dict(summarize(flags, limits))
+        dataset.save(update_fields=['anomalies'])
+    return dataset.get_anomalies_dict()
+
+
+def get_anomalies(dataset):
+    """
+    Anomaly summary of a dataset, detecting them on first use for older datasets
+
+    Archived datasets have no records to flag; their summary is computed
+    from the cold tier without storing it.
+    """
+    anomalies = dataset.get_anomalies_dict()
+    if anomalies is None and dataset.total_count:
+        if dataset.is_archived:
+            anomalies = summarize(*detect_anomalies(columnar.read_columns(dataset, ['equipment_type'] + PARAMETERS)))
+        else:
+            anomalies = store_anomalies(dataset)
+    return anomalies
@@ -0,0 +1,185 @@
+"""
+Cold tier storage of dataset records
+
+Archiving a dataset writes its records to a compressed Arrow IPC file and
+deletes them from the records table, keeping only the dataset row, its
+type aggregates and its unit points in the database. Reading records of an archived dataset
+rehydrates it: the records are inserted again from the archive and the
+dataset is hot until the retention policy archives it once more.
+
+Without pyarrow the stored original upload serves as the archive, so only
+datasets with a raw file can be archived then.
+"""
+
+import gzip
+import os
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .aggregates import PARAMETERS
+from .anomalies import store_anomalies
+from .cache import invalidate_dataset, invalidate_history
+from .columnar import COLUMNS, CSV_COLUMNS, ColumnarWriter, archive_path, pa, read_columns
+from .ingestion import bulk_insert_records
+from .models import EquipmentDataset, EquipmentRecord
+from . import columnar
+
+
+def _compression():
+    for codec in ('zstd', 'lz4'):
+        if pa.Codec.is_available(codec):
+            return codec
+    return None
+
+
+def can_archive(dataset):
+    """Whether the records of a dataset can be restored after archiving"""
+    return pa is not None or bool(dataset.raw_file)
+
+
+def write_archive(dataset):
+    """
+    Write a dataset's records to its compressed archive file
+
+    Archives are immutable like the datasets themselves, so an existing
+    file is kept. Does nothing without pyarrow.
+    """
+    path = archive_path(dataset.id)
+    if pa is None or os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    table = pa.Table.from_pydict(read_columns(dataset, COLUMNS), schema=columnar._schema())
+
+    tmp_path = f'{path}.tmp'
+    options = pa.ipc.IpcWriteOptions(compression=_compression())
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table, max_chunksize=settings.INGEST_CHUNK_SIZE)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def delete_archive(dataset_id):
+    """Remove the archive file of a dataset, if any"""
+    path = archive_path(dataset_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def archive_dataset(dataset):
+    """
+    Move a dataset's records to the cold tier
+
+    Returns:
+        True if the dataset was archived
+    """
+    if dataset.is_archived or not can_archive(dataset):
+        return False
+
+    write_archive(dataset)
+
+    with transaction.atomic():
+        archived = EquipmentDataset.objects.filter(id=dataset.id, archived_at__isnull=True).update(
+            archived_at=timezone.now(), rehydrated_at=None
+        )
+        if not archived:
+            return False
+        EquipmentRecord.objects.filter(dataset_id=dataset.id).delete()
+        transaction.on_commit(lambda: _tier_changed(dataset.id))
+
+    dataset.refresh_from_db(fields=['archived_at', 'rehydrated_at'])
+    return True
+
+
+def iter_archive_chunks(dataset):
+    """
+    Yield the archived records of a dataset as DataFrames with CSV headers
+
+    Reads the Arrow archive batch by batch, or the stored original upload
+    in chunks when there is no archive file.
+    """
+    path = archive_path(dataset.id)
+    if pa is not None and os.path.exists(path):
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas().rename(columns=CSV_COLUMNS)
+        return
+
+    with dataset.raw_file.open('rb') as stored:
+        with gzip.GzipFile(fileobj=stored, mode='rb') as source:
+            yield from pd.read_csv(source, chunksize=settings.INGEST_CHUNK_SIZE)
+
+
+def iter_archived_rows(dataset):
+    """
+    Yield the archived records of a dataset in record order
+
+    Yields:
+        (equipment_name, equipment_type, flowrate, pressure, temperature) tuples
+    """
+    for chunk in iter_archive_chunks(dataset):
+        yield from zip(
+            chunk['Equipment Name'].astype(str).tolist(),
+            chunk['Type'].astype(str).tolist(),
+            *(chunk[CSV_COLUMNS[col]].astype(float).tolist() for col in columnar.NUMERIC_COLUMNS)
+        )
+
+
+def rehydrate_dataset(dataset):
+    """
+    Restore the records of an archived dataset into the database
+
+    Concurrent callers are serialized on the dataset row, so the records
+    are only inserted once.
+
+    Returns:
+        True if this call rehydrated the dataset
+    """
+    if not dataset.is_archived:
+        return False
+
+    writer = ColumnarWriter(dataset.id)
+    try:
+        with transaction.atomic():
+            rehydrated = EquipmentDataset.objects.filter(id=dataset.id, archived_at__isnull=False).update(
+                archived_at=None, rehydrated_at=timezone.now()
+            )
+            if not rehydrated:
+                dataset.refresh_from_db(fields=['archived_at', 'rehydrated_at'])
+                return False
+
+            for chunk in iter_archive_chunks(dataset):
+                bulk_insert_records(dataset, chunk)
+                writer.write(chunk)
+            writer.commit()
+            # Anomaly flags are not archived, they are derived again
+            store_anomalies(dataset, writer.read_columns(['equipment_type'] + PARAMETERS))
+            transaction.on_commit(lambda: _tier_changed(dataset.id))
+    except Exception:
+        writer.abort()
+        raise
+
+    dataset.refresh_from_db(fields=['archived_at', 'rehydrated_at'])
+    return True
+
+
+def ensure_hot(dataset):
+    """Rehydrate a dataset if it is archived, so its records can be queried"""
+    if dataset.is_archived:
+        rehydrate_dataset(dataset)
+    return dataset
+
+
+def _tier_changed(dataset_id):
+    # The hot columnar file is only kept for datasets in the database
+    if EquipmentDataset.objects.filter(id=dataset_id, archived_at__isnull=False).exists():
+        columnar.delete_dataset(dataset_id)
+    invalidate_dataset(dataset_id)
+    invalidate_history()
@@ -0,0 +1,159 @@
+"""
+Response caching with conditional GET support for read-only endpoints
+
+Datasets never change once uploaded, so responses describing them are
+cached in the configured Django cache together with a version derived from
+the database: the dataset's upload time and tier for per-dataset responses
+and the dataset count, latest id and latest tier change for the history.
+Entries are dropped explicitly on upload, archival and pruning, and the
+version check keeps a worker from serving an entry another process has
+already made stale (e.g. with the per-process local-memory cache). The
+versions double as ETag/Last-Modified headers so polling clients get
+304 Not Modified responses.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from .models import EquipmentDataset
+
+
+KEY_PREFIX = 'api'
+
+# Cached views, so their entries can be invalidated together
+DATASET_VIEWS = ['detail', 'summary', 'aggregates']
+HISTORY_VIEWS = ['history']
+
+
+def dataset_key(dataset_id, view):
+    """Cache key of a per-dataset response"""
+    return f'{KEY_PREFIX}:dataset:{dataset_id}:{view}'
+
+
+def history_key(view):
+    """Cache key of a history response"""
+    return f'{KEY_PREFIX}:history:{view}'
+
+
+def history_version():
+    """(count, latest id, latest upload time, latest tier change) of the stored datasets"""
+    state = EquipmentDataset.objects.aggregate(
+        count=Count('id'), last_id=Max('id'), last_upload=Max('uploaded_at'),
+        last_archived=Max('archived_at'), last_rehydrated=Max('rehydrated_at')
+    )
+    tier_changes = [t for t in (state['last_archived'], state['last_rehydrated']) if t is not None]
+    last_tier_change = max(tier_changes) if tier_changes else None
+    return state['count'], state['last_id'], state['last_upload'], last_tier_change
+
+
+def conditional_response(request, version, last_modified):
+    """
+    304 Not Modified response if the client already has this version
+    
+    Args:
+        request: Incoming request, checked for If-None-Match/If-Modified-Since
+        version: String identifying the current version, used as the ETag
+        last_modified: datetime the resource last changed, or None
+    
+    Returns:
+        A 304 (or 412) response, or None if the full response is needed
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=quote_etag(version), last_modified=timestamp)
+
+
+def set_validators(response, version, last_modified):
+    """Add ETag/Last-Modified headers for a version to a response"""
+    response['ETag'] = quote_etag(version)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    # Let clients keep the body but revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_response(request, key, version, last_modified, build):
+    """
+    Serve a cached API payload with ETag/Last-Modified validation
+    
+    Args:
+        request: Incoming request, checked for If-None-Match/If-Modified-Since
+        key: Cache key of the payload
+        version: String identifying the current version, used as the ETag
+        last_modified: datetime the payload last changed, or None
+        build: Callable producing the payload on a cache miss
+    
+    Returns:
+        304 Not Modified response or a Response with the payload
+    """
+    not_modified = conditional_response(request, version, last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    # Entries remember their version so one left behind by another worker is ignored
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        data = cached[1]
+    else:
+        data = build()
+        cache.set(key, (version, data), settings.API_CACHE_TIMEOUT)
+    
+    return set_validators(Response(data), version, last_modified)
+
+
+def cached_dataset_response(request, dataset, view, build):
+    """
+    Cached response for data derived from a single dataset
+    
+    Args:
+        request: Incoming request
+        dataset: EquipmentDataset, only id, uploaded_at and archived_at need to be loaded
+        view: Name of the cached view, one of DATASET_VIEWS
+        build: Callable producing the payload on a cache miss
+    """
+    tier = 'cold' if dataset.is_archived else 'hot'
+    version = f'dataset-{dataset.id}-{view}-{int(dataset.uploaded_at.timestamp() * 1e6)}-{tier}'
+    return cached_response(request, dataset_key(dataset.id, view), version, dataset.uploaded_at, build)
+
+
+def cached_comparison_response(request, dataset_a, dataset_b, view, build):
+    """
+    Cached response for data derived from a pair of datasets
+    
+    Like parametrized dataset views, comparisons are never invalidated
+    explicitly: the pair cannot change, and entries of deleted datasets
+    expire after API_CACHE_TIMEOUT.
+    """
+    stamps = '-'.join(str(int(d.uploaded_at.timestamp() * 1e6)) for d in (dataset_a, dataset_b))
+    version = f'compare-{dataset_a.id}-{dataset_b.id}-{view}-{stamps}'
+    last_modified = max(dataset_a.uploaded_at, dataset_b.uploaded_at)
+    key = f'{KEY_PREFIX}:compare:{dataset_a.id}:{dataset_b.id}:{view}'
+    return cached_response(request, key, version, last_modified, build)
+
+
+def cached_history_response(request, view, build):
+    """Cached response for data derived from the dataset history"""
+    count, last_id, last_upload, last_tier_change = history_version()
+    tier_stamp = int(last_tier_change.timestamp() * 1e6) if last_tier_change else 0
+    version = f'{view}-{count}-{last_id}-{tier_stamp}'
+    last_modified = max(filter(None, (last_upload, last_tier_change)), default=None)
+    return cached_response(request, history_key(view), version, last_modified, build)
+
+
+def invalidate_dataset(dataset_id):
+    """
+    Drop cached responses of a dataset
+    
+    Parametrized views (e.g. chart data per resolution) are not listed in
+    DATASET_VIEWS; their entries are never stale since datasets do not
+    change, and they expire after API_CACHE_TIMEOUT.
+    """
+    cache.delete_many([dataset_key(dataset_id, view) for view in DATASET_VIEWS])
+
+
+def invalidate_history():
+    """Drop cached history responses"""
+    cache.delete_many([history_key(view) for view in HISTORY_VIEWS])
@@ -0,0 +1,140 @@
+"""
+Constant-size chart payloads for datasets
+
+Histograms and per-type means come from the statistics stored with the
+dataset; parameter series are downsampled from the columnar record store
+to a client-requested number of points, so the payload size does not
+depend on the number of records.
+"""
+
+import numpy as np
+from .aggregates import PARAMETERS
+from .statistics import get_statistics
+from . import columnar
+
+
+DEFAULT_POINTS = 2000
+MIN_POINTS = 10
+MAX_POINTS = 20000
+DOWNSAMPLE_METHODS = ['lttb', 'minmax']
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket.
+
+    Args:
+        x: Sorted x values
+        y: y values
+        threshold: Number of points to keep
+
+    Returns:
+        Indices of the kept points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Mean of every bucket, for the look-ahead point of the previous one
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    means_x = np.append(sums_x / sizes, x[n - 1])
+    means_y = np.append(sums_y / sizes, y[n - 1])
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        cx, cy = means_x[bucket + 1], means_y[bucket + 1]
+        areas = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax(y, threshold):
+    """
+    Min/max downsampling
+
+    Splits the series into threshold / 2 buckets and keeps the lowest and
+    highest point of each, which preserves spikes exactly.
+
+    Returns:
+        Sorted indices of the kept points
+    """
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+
+    bucket_count = max(threshold // 2, 1)
+    buckets = np.arange(n) * bucket_count // n
+    order = np.lexsort((y, buckets))
+    ends = np.cumsum(np.bincount(buckets, minlength=bucket_count))
+    starts = ends - np.bincount(buckets, minlength=bucket_count)
+    kept = np.concatenate((order[starts], order[ends - 1]))
+    return np.unique(kept)
+
+
+def downsample_series(values, points, method):
+    """Downsample one parameter over record order, skipping missing values"""
+    index = np.flatnonzero(~np.isnan(values))
+    values = values[index]
+    if method == 'minmax':
+        kept = minmax(values, points)
+    else:
+        kept = lttb(index.astype(np.float64), values, points)
+    return {'x': index[kept].tolist(), 'y': values[kept].tolist()}
+
+
+def build_chart_data(dataset, points=DEFAULT_POINTS, method='lttb'):
+    """
+    Chart payload of a dataset
+
+    Args:
+        dataset: EquipmentDataset
+        points: Maximum points per downsampled series
+        method: One of DOWNSAMPLE_METHODS
+
+    Returns:
+        Dict with per-type counts and means, histograms (overall and per
+        type, sharing bin edges) and downsampled series per parameter,
+        where x is the record position in upload order
+    """
+    statistics = get_statistics(dataset) or {'overall': {}, 'by_type': {}, 'histogram_edges': {}}
+    types = list(statistics['by_type'])
+    by_type = statistics['by_type']
+    distribution = dataset.get_distribution_dict()
+
+    data = columnar.read_columns(dataset, PARAMETERS)
+
+    return {
+        'points': points,
+        'method': method,
+        'total_count': dataset.total_count,
+        'types': types,
+        'type_counts': [distribution.get(t, 0) for t in types],
+        'type_means': {
+            parameter: [by_type[t].get(parameter, {}).get('mean') for t in types]
+            for parameter in PARAMETERS
+        },
+        'histograms': {
+            parameter: {
+                'edges': statistics['histogram_edges'].get(parameter, []),
+                'counts': statistics['overall'].get(parameter, {}).get('histogram', []),
+                'by_type': {t: by_type[t].get(parameter, {}).get('histogram', []) for t in types},
+            }
+            for parameter in PARAMETERS
+        },
+        'series': {
+            parameter: downsample_series(np.asarray(data[parameter], dtype=np.float64), points, method)
+            for parameter in PARAMETERS
+        },
+    }
@@ -0,0 +1,231 @@
+"""
+Optional columnar storage for equipment records
+
+Each dataset's record columns are persisted as an Arrow IPC file keyed by
+dataset id, which can be memory mapped and read back as NumPy arrays
+without hydrating EquipmentRecord instances. Requires pyarrow; when it is
+not installed (or COLUMNAR_STORAGE_ENABLED is off) readers fall back to a
+single values_list query against the records table.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+COLUMNAR_DIR = 'datasets/columnar'
+ARCHIVE_DIR = 'datasets/archive'
+COLUMNS = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+NUMERIC_COLUMNS = ['flowrate', 'pressure', 'temperature']
+
+# CSV header for each stored column
+CSV_COLUMNS = {
+    'equipment_name': 'Equipment Name',
+    'equipment_type': 'Type',
+    'flowrate': 'Flowrate',
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+}
+CSV_FIELDS = {header: col for col, header in CSV_COLUMNS.items()}
+
+
+def is_enabled():
+    """Whether datasets are written to columnar storage"""
+    return pa is not None and settings.COLUMNAR_STORAGE_ENABLED
+
+
+def columnar_path(dataset_id):
+    """Filesystem path of the Arrow file for a dataset"""
+    return os.path.join(settings.MEDIA_ROOT, COLUMNAR_DIR, f'{dataset_id}.arrow')
+
+
+def archive_path(dataset_id):
+    """Filesystem path of the compressed archive of a dataset (see api.archive)"""
+    return os.path.join(settings.MEDIA_ROOT, ARCHIVE_DIR, f'{dataset_id}.arrow')
+
+
+def _schema():
+    return pa.schema([
+        ('equipment_name', pa.string()),
+        ('equipment_type', pa.string()),
+        ('flowrate', pa.float64()),
+        ('pressure', pa.float64()),
+        ('temperature', pa.float64()),
+    ])
+
+
+class ColumnarWriter:
+    """
+    Incrementally write a dataset's records to an Arrow IPC file
+
+    Chunks are appended as record batches to a temporary file. commit()
+    finishes it and moves it into place once the current transaction
+    commits, so a published file always belongs to a committed dataset and
+    readers never see a partial file. Until then read_columns() reads the
+    finished temporary file; abort() removes it.
+    When columnar storage is disabled every method is a no-op.
+    """
+
+    def __init__(self, dataset_id):
+        self.path = columnar_path(dataset_id)
+        self.tmp_path = f'{self.path}.tmp'
+        self.writer = None
+        self.sink = None
+
+    def write(self, df):
+        """Append a chunk of CSV rows"""
+        if not is_enabled():
+            return
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.sink = pa.OSFile(self.tmp_path, 'wb')
+            self.writer = pa.ipc.new_file(self.sink, _schema())
+
+        arrays = [
+            pa.array(df['Equipment Name'].astype(str).to_numpy(), pa.string()),
+            pa.array(df['Type'].astype(str).to_numpy(), pa.string()),
+        ] + [
+            pa.array(df[CSV_COLUMNS[col]].astype(float).to_numpy(), pa.float64())
+            for col in NUMERIC_COLUMNS
+        ]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=_schema()))
+
+    def _close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            self.writer = None
+
+    def commit(self):
+        """Finish the file and publish it when the current transaction commits"""
+        if self.sink is None:
+            return
+        self._close()
+        # A failed move must not fail the already committed transaction
+        transaction.on_commit(self._publish, robust=True)
+
+    def _publish(self):
+        os.replace(self.tmp_path, self.path)
+
+    def read_columns(self, columns):
+        """
+        Read columns of the committed but not yet published file
+
+        Returns:
+            Dict mapping column name to a NumPy array, or None when nothing
+            was written
+        """
+        if self.sink is None or self.writer is not None or not os.path.exists(self.tmp_path):
+            return None
+        return _table_columns(_open_table(self.tmp_path, columns), columns)
+
+    def abort(self):
+        """Discard the file if it has not been published yet"""
+        if self.sink is None:
+            return
+        self._close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def write_dataset(dataset):
+    """(Re)build the columnar file of an existing dataset from its records"""
+    writer = ColumnarWriter(dataset.id)
+    rows = dataset.records.order_by('id').values_list(*COLUMNS)
+    batch_size = settings.INGEST_CHUNK_SIZE
+    try:
+        for start in range(0, dataset.total_count, batch_size):
+            chunk = pd.DataFrame.from_records(list(rows[start:start + batch_size]), columns=COLUMNS)
+            writer.write(chunk.rename(columns=CSV_COLUMNS))
+        writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+
+
+def delete_dataset(dataset_id):
+    """Remove the columnar file of a dataset, if any"""
+    path = columnar_path(dataset_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _open_table(path, columns):
+    # Memory map the file so only the requested columns are paged in
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all().select(columns)
+
+
+def _read_table(dataset_id, columns):
+    if pa is None:
+        return None
+    for path in (columnar_path(dataset_id), archive_path(dataset_id)):
+        if os.path.exists(path):
+            return _open_table(path, columns)
+    return None
+
+
+def _table_columns(table, columns):
+    result = {}
+    for col in columns:
+        chunked = table.column(col)
+        if chunked.num_chunks == 1:
+            result[col] = chunked.chunk(0).to_numpy(zero_copy_only=False)
+        else:
+            result[col] = chunked.to_numpy()
+    return result
+
+
+def read_columns(dataset, columns=None):
+    """
+    Read record columns of a dataset as NumPy arrays
+
+    Numeric columns are returned as float64 arrays backed by the memory
+    mapped file (zero-copy when the file holds a single record batch),
+    string columns as object arrays. Rows are in record id order.
+    Archived datasets are read from their archive file when there is one
+    and from the stored original upload otherwise, never rehydrated.
+
+    Args:
+        dataset: EquipmentDataset instance
+        columns: Column names to read, defaults to all of COLUMNS
+
+    Returns:
+        Dict mapping column name to a NumPy array
+    """
+    columns = list(columns or COLUMNS)
+    table = _read_table(dataset.id, columns)
+
+    if table is not None:
+        return _table_columns(table, columns)
+
+    if dataset.is_archived:
+        # Without an archive file the stored upload is parsed, not rehydrated
+        from .archive import iter_archive_chunks
+        chunks = [chunk.rename(columns=CSV_FIELDS)[columns] for chunk in iter_archive_chunks(dataset)]
+        frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+        return {
+            col: frame[col].to_numpy(np.float64) if col in NUMERIC_COLUMNS else frame[col].astype(str).to_numpy(object)
+            for col in columns
+        }
+    
+    rows = list(dataset.records.order_by('id').values_list(*columns))
+    result = {}
+    for i, col in enumerate(columns):
+        values = [row[i] for row in rows]
+        dtype = np.float64 if col in NUMERIC_COLUMNS else object
+        result[col] = np.array(values, dtype=dtype)
+    return result
+
+
+def read_frame(dataset, columns=None):
+    """Read record columns of a dataset as a pandas DataFrame"""
+    columns = list(columns or COLUMNS)
+    return pd.DataFrame(read_columns(dataset, columns), columns=columns)
@@ -0,0 +1,184 @@
+"""
+Comparison of two datasets, unit by unit
+
+Records are matched on equipment_name through a hash index over the names
+of the first dataset (pandas Index.get_indexer), so a comparison is a
+single vectorized join over the columnar record store rather than a query
+per unit. When a name occurs several times in a dataset, its last record
+wins, like a later row of an export overriding an earlier one.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from .aggregates import PARAMETERS
+from .statistics import get_statistics
+from . import columnar
+
+
+DEFAULT_UNIT_LIMIT = 100
+MAX_UNIT_LIMIT = 1000
+
+# Parameter values closer than this (relative or absolute) are unchanged
+TOLERANCE = 1e-9
+
+
+def _value(value):
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def _units(dataset):
+    """Columns of a dataset reduced to the last record of every equipment name"""
+    columns = columnar.read_columns(dataset, ['equipment_name', 'equipment_type'] + PARAMETERS)
+    names = pd.Index(columns['equipment_name'].astype(str))
+    keep = ~names.duplicated(keep='last')
+    units = {col: values[keep] for col, values in columns.items()}
+    units['equipment_name'] = names[keep]
+    return units, int(len(names) - keep.sum())
+
+
+def _unit_rows(units, positions):
+    """Serialized units at the given positions"""
+    rows = zip(
+        units['equipment_name'][positions].tolist(),
+        units['equipment_type'][positions].tolist(),
+        *(units[parameter][positions].tolist() for parameter in PARAMETERS)
+    )
+    return [
+        {
+            'equipment_name': name,
+            'equipment_type': eq_type,
+            **{parameter: _value(value) for parameter, value in zip(PARAMETERS, values)},
+        }
+        for name, eq_type, *values in rows
+    ]
+
+
+def _type_shifts(dataset_a, dataset_b):
+    """Per equipment type record count and mean shifts, from the stored statistics"""
+    distribution_a = dataset_a.get_distribution_dict()
+    distribution_b = dataset_b.get_distribution_dict()
+    by_type_a = (get_statistics(dataset_a) or {}).get('by_type', {})
+    by_type_b = (get_statistics(dataset_b) or {}).get('by_type', {})
+
+    shifts = []
+    for eq_type in sorted(set(distribution_a) | set(distribution_b)):
+        count_a = distribution_a.get(eq_type, 0)
+        count_b = distribution_b.get(eq_type, 0)
+        shift = {
+            'equipment_type': eq_type,
+            'count_a': count_a,
+            'count_b': count_b,
+            'count_delta': count_b - count_a,
+        }
+        for parameter in PARAMETERS:
+            mean_a = by_type_a.get(eq_type, {}).get(parameter, {}).get('mean')
+            mean_b = by_type_b.get(eq_type, {}).get(parameter, {}).get('mean')
+            shift[parameter] = {
+                'mean_a': mean_a,
+                'mean_b': mean_b,
+                'delta': mean_b - mean_a if mean_a is not None and mean_b is not None else None,
+            }
+        shifts.append(shift)
+    return shifts
+
+
+def _dataset_info(dataset, units, duplicates):
+    return {
+        'id': dataset.id,
+        'filename': dataset.filename,
+        'uploaded_at': dataset.uploaded_at.isoformat(),
+        'total_count': dataset.total_count,
+        'unit_count': len(units['equipment_name']),
+        'duplicate_names': duplicates,
+    }
+
+
+def compare_datasets(dataset_a, dataset_b, limit=DEFAULT_UNIT_LIMIT):
+    """
+    Differences from dataset_a to dataset_b
+
+    Args:
+        dataset_a: Baseline EquipmentDataset
+        dataset_b: EquipmentDataset compared against the baseline
+        limit: Maximum units listed per category
+
+    Returns:
+        Dict with the counts of added, removed, changed and unchanged units,
+        up to limit units of each of the first three (changed units ordered
+        by their largest delta in baseline standard deviations), summary
+        statistics of the changed units' deltas per parameter and the
+        per-type shifts
+    """
+    units_a, duplicates_a = _units(dataset_a)
+    units_b, duplicates_b = _units(dataset_b)
+
+    # Position in dataset_a of every unit of dataset_b, -1 for new units
+    positions = units_a['equipment_name'].get_indexer(units_b['equipment_name'])
+    matched_b = np.flatnonzero(positions >= 0)
+    matched_a = positions[matched_b]
+    added = np.flatnonzero(positions < 0)
+    present = np.zeros(len(units_a['equipment_name']), dtype=bool)
+    present[matched_a] = True
+    removed = np.flatnonzero(~present)
+
+    changed = units_a['equipment_type'][matched_a] != units_b['equipment_type'][matched_b]
+    deltas = {}
+    scores = np.zeros(len(matched_b))
+    for parameter in PARAMETERS:
+        values_a = np.asarray(units_a[parameter], dtype=np.float64)[matched_a]
+        values_b = np.asarray(units_b[parameter], dtype=np.float64)[matched_b]
+        deltas[parameter] = values_b - values_a
+        changed |= ~np.isclose(values_a, values_b, rtol=TOLERANCE, atol=TOLERANCE, equal_nan=True)
+
+        std = np.nanstd(np.asarray(units_a[parameter], dtype=np.float64)) if len(units_a[parameter]) else 0.0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled = np.abs(deltas[parameter]) / (std if std > 0 else 1.0)
+        scores = np.fmax(scores, np.nan_to_num(scaled, nan=0.0))
+
+    changed_rows = np.flatnonzero(changed)
+    # Largest changes first, in upload order among equal ones
+    order = changed_rows[np.argsort(-scores[changed_rows], kind='stable')][:limit]
+
+    changed_units = []
+    for row, before, after in zip(
+        order.tolist(),
+        _unit_rows(units_a, matched_a[order]),
+        _unit_rows(units_b, matched_b[order]),
+    ):
+        changed_units.append({
+            'equipment_name': after['equipment_name'],
+            'equipment_type_a': before['equipment_type'],
+            'equipment_type_b': after['equipment_type'],
+            'a': {parameter: before[parameter] for parameter in PARAMETERS},
+            'b': {parameter: after[parameter] for parameter in PARAMETERS},
+            'delta': {parameter: _value(deltas[parameter][row]) for parameter in PARAMETERS},
+        })
+
+    delta_summary = {}
+    for parameter in PARAMETERS:
+        values = deltas[parameter][changed_rows]
+        values = values[~np.isnan(values)]
+        delta_summary[parameter] = {
+            'mean': _value(values.mean()) if len(values) else None,
+            'mean_abs': _value(np.abs(values).mean()) if len(values) else None,
+            'max_abs': _value(np.abs(values).max()) if len(values) else None,
+        }
+
+    return {
+        'a': _dataset_info(dataset_a, units_a, duplicates_a),
+        'b': _dataset_info(dataset_b, units_b, duplicates_b),
+        'limit': limit,
+        'counts': {
+            'added': len(added),
+            'removed': len(removed),
+            'changed': len(changed_rows),
+            'unchanged': len(matched_b) - len(changed_rows),
+        },
+        'added': _unit_rows(units_b, added[:limit]),
+        'removed': _unit_rows(units_a, removed[:limit]),
+        'changed': changed_units,
+        'delta_summary': delta_summary,
+        'type_shifts': _type_shifts(dataset_a, dataset_b),
+    }
@@ -0,0 +1,46 @@
+"""
+Fast JSON encoding for large record payloads
+"""
+
+import json
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data):
+    """Encode data as compact JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(HttpResponse):
+    """JSON response encoded with dumps(), bypassing DRF renderers"""
+    
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def columnar_records(queryset, fields):
+    """
+    Fetch records as column lists straight from the database
+    
+    Rows are pulled with a single values_list query and transposed, so no
+    model instances or per-row dictionaries are built.
+    
+    Args:
+        queryset: EquipmentRecord queryset, already filtered and ordered
+        fields: Field names to fetch
+    
+    Returns:
+        Dict mapping each field name to a list of values
+    """
+    rows = list(queryset.values_list(*fields))
+    if not rows:
+        return {field: [] for field in fields}
+    return {field: list(values) for field, values in zip(fields, zip(*rows))}
@@ -0,0 +1,50 @@
+from rest_framework.exceptions import ValidationError
+
+
+RANGE_FILTER_FIELDS = ['flowrate', 'pressure', 'temperature']
+
+
+def _parse_float(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be a number'})
+
+
+def filter_records(queryset, query_params):
+    """
+    Apply record filters from request query parameters
+    
+    Supported parameters:
+        type: Equipment type, or several separated by commas
+        name: Case-insensitive substring of the equipment name
+        <field>_min / <field>_max: Inclusive bounds on flowrate, pressure
+            or temperature
+    
+    Args:
+        queryset: EquipmentRecord queryset
+        query_params: Request query parameters
+    
+    Returns:
+        Filtered queryset
+    """
+    types = query_params.get('type')
+    if types:
+        queryset = queryset.filter(equipment_type__in=[t.strip() for t in types.split(',') if t.strip()])
+    
+    name = query_params.get('name')
+    if name:
+        queryset = queryset.filter(equipment_name__icontains=name)
+    
+    for field in RANGE_FILTER_FIELDS:
+        lower = _parse_float(query_params, f'{field}_min')
+        if lower is not None:
+            queryset = queryset.filter(**{f'{field}__gte': lower})
+        upper = _parse_float(query_params, f'{field}_max')
+        if upper is not None:
+            queryset = queryset.filter(**{f'{field}__lte': upper})
+    
+    return queryset
@@ -0,0 +1,159 @@
+"""
+Per-user dataset retention and post-upload bookkeeping
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import EquipmentDataset, EquipmentRecord, EquipmentUnitPoint, RetentionPolicy
+from .archive import archive_dataset, delete_archive
+from .cache import invalidate_dataset, invalidate_history
+from .reports import delete_reports, schedule_report
+from .storage import release_raw_csv
+from . import columnar
+
+
+logger = logging.getLogger(__name__)
+
+# Dataset ids per DELETE ... WHERE dataset_id IN (...) statement
+PRUNE_BATCH_SIZE = 500
+
+_sweeper = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history-sweeper')
+
+
+def owner_datasets(user):
+    """Datasets uploaded by a user (anonymous uploads for None), newest first"""
+    return EquipmentDataset.objects.filter(uploaded_by=user).order_by('-uploaded_at', '-id')
+
+
+def delete_datasets(dataset_ids):
+    """
+    Delete datasets and everything derived from them with set-based queries
+    
+    Records and unit points are removed with one DELETE per batch of
+    dataset ids before the datasets themselves, instead of one cascade per
+    dataset. Files and cache entries are cleaned up once the transaction
+    has committed.
+    """
+    dataset_ids = list(dataset_ids)
+    if not dataset_ids:
+        return
+    raw_names = set(
+        EquipmentDataset.objects.filter(id__in=dataset_ids).values_list('raw_file', flat=True)
+    )
+    
+    with transaction.atomic():
+        for start in range(0, len(dataset_ids), PRUNE_BATCH_SIZE):
+            batch = dataset_ids[start:start + PRUNE_BATCH_SIZE]
+            EquipmentRecord.objects.filter(dataset_id__in=batch).delete()
+            EquipmentUnitPoint.objects.filter(dataset_id__in=batch).delete()
+            # Aggregates and job links are few; the collector handles them
+            EquipmentDataset.objects.filter(id__in=batch).delete()
+        transaction.on_commit(lambda: _cleanup_files(dataset_ids, raw_names))
+
+
+def _cleanup_files(dataset_ids, raw_names):
+    for raw_name in raw_names:
+        release_raw_csv(raw_name)
+    for dataset_id in dataset_ids:
+        columnar.delete_dataset(dataset_id)
+        delete_archive(dataset_id)
+        delete_reports(dataset_id)
+        invalidate_dataset(dataset_id)
+    invalidate_history()
+
+
+def apply_retention(user):
+    """
+    Apply a user's retention policy to their datasets
+    
+    The newest policy.hot_datasets datasets stay in the database, older
+    ones up to policy.max_datasets are archived (unless rehydrated within
+    ARCHIVE_REHYDRATE_GRACE_HOURS) and the rest are deleted.
+    
+    Args:
+        user: User whose datasets to process, or None for anonymous uploads
+    
+    Returns:
+        Tuple of the number of datasets archived and deleted
+    """
+    policy = RetentionPolicy.for_user(user)
+    keep = max(policy.max_datasets, policy.hot_datasets)
+    rows = list(owner_datasets(user).values_list('id', 'archived_at', 'rehydrated_at'))
+    
+    expired_ids = [dataset_id for dataset_id, archived_at, rehydrated_at in rows[keep:]]
+    delete_datasets(expired_ids)
+    
+    grace = timezone.now() - timedelta(hours=settings.ARCHIVE_REHYDRATE_GRACE_HOURS)
+    cold_ids = [
+        dataset_id for dataset_id, archived_at, rehydrated_at in rows[policy.hot_datasets:keep]
+        if archived_at is None and (rehydrated_at is None or rehydrated_at < grace)
+    ]
+    archived = 0
+    for dataset in EquipmentDataset.objects.filter(id__in=cold_ids):
+        archived += archive_dataset(dataset)
+    
+    return archived, len(expired_ids)
+
+
+def maintain_dataset_history(users=None):
+    """
+    Apply retention policies to the datasets of some or all users
+    
+    Args:
+        users: Users (None for anonymous uploads) to process, defaults to
+            every user with datasets
+    
+    Returns:
+        Tuple of the number of datasets archived and deleted
+    """
+    if users is None:
+        owner_ids = set(EquipmentDataset.objects.order_by().values_list('uploaded_by', flat=True).distinct())
+        users = list(User.objects.filter(id__in=owner_ids - {None}))
+        if None in owner_ids:
+            users.append(None)
+    
+    archived = deleted = 0
+    for user in users:
+        user_archived, user_deleted = apply_retention(user)
+        archived += user_archived
+        deleted += user_deleted
+    return archived, deleted
+
+
+def _sweep_in_background(users):
+    try:
+        maintain_dataset_history(users)
+    except Exception:
+        logger.exception('Pruning dataset history failed')
+    finally:
+        # Worker threads get their own connection, which must not leak
+        connection.close()
+
+
+def schedule_history_sweep(users=None):
+    """Apply retention policies on a background thread"""
+    return _sweeper.submit(_sweep_in_background, users)
+
+
+def publish_dataset(dataset):
+    """Apply the uploader's retention policy and warm caches after an ingest"""
+    
+    owners = [dataset.uploaded_by]
+    if settings.HISTORY_PRUNE_DEFERRED:
+        transaction.on_commit(lambda: schedule_history_sweep(owners))
+    else:
+        maintain_dataset_history(owners)
+    invalidate_history()
+    
+    # Extend the uploader's trend series once the dataset is visible
+    from .trends import record_trend_point
+    transaction.on_commit(lambda: record_trend_point(dataset))
+    
+    # Render the PDF report ahead of the first download
+    if settings.REPORT_PRERENDER:
+        transaction.on_commit(lambda: schedule_report(dataset.id))
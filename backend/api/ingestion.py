@@ -0,0 +1,269 @@
+"""
+CSV ingestion engine for equipment datasets
+"""
+
+from collections import Counter
+import io
+import math
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from .models import EquipmentDataset, EquipmentRecord
+from .aggregates import PARAMETERS, store_unit_points
+from .anomalies import store_anomalies
+from .statistics import store_statistics
+from .columnar import ColumnarWriter
+from .storage import STREAM_BLOCK_SIZE, RawCSVWriter, TeeReader, release_raw_csv, store_raw_csv
+
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+PARAMETER_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+
+
+class CSVValidationError(ValueError):
+    """Raised when an uploaded CSV does not match the expected format"""
+
+
+def validate_columns(columns):
+    """Raise CSVValidationError if any required column is missing"""
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing_columns:
+        raise CSVValidationError(f'Missing required columns: {", ".join(missing_columns)}')
+
+
+class RunningStats:
+    """Dataset statistics accumulated chunk by chunk"""
+
+    def __init__(self):
+        self.total_count = 0
+        self.sums = {col: 0.0 for col in PARAMETER_COLUMNS}
+        self.counts = {col: 0 for col in PARAMETER_COLUMNS}
+        self.distribution = Counter()
+
+    def update(self, df):
+        """Fold one chunk of rows into the running totals"""
+        self.total_count += len(df)
+        for col in PARAMETER_COLUMNS:
+            # Like DataFrame.mean(), missing values are skipped
+            self.sums[col] += float(df[col].sum())
+            self.counts[col] += int(df[col].count())
+        self.distribution.update(df['Type'].value_counts().to_dict())
+
+    def mean(self, col):
+        """Running mean of a parameter column"""
+        if not self.counts[col]:
+            return math.nan
+        return self.sums[col] / self.counts[col]
+
+    def apply(self, dataset):
+        """Copy the accumulated statistics onto a dataset"""
+        dataset.total_count = self.total_count
+        dataset.avg_flowrate = self.mean('Flowrate')
+        dataset.avg_pressure = self.mean('Pressure')
+        dataset.avg_temperature = self.mean('Temperature')
+        dataset.set_distribution_dict(dict(self.distribution.most_common()))
+
+
+def build_records(dataset, df):
+    """
+    Build unsaved EquipmentRecord instances column-wise from a DataFrame
+
+    Args:
+        dataset: EquipmentDataset the records belong to
+        df: DataFrame with the required columns
+
+    Returns:
+        List of EquipmentRecord instances
+    """
+    # tolist() converts numpy scalars to native Python values in one pass
+    columns = zip(
+        df['Equipment Name'].astype(str).tolist(),
+        df['Type'].astype(str).tolist(),
+        df['Flowrate'].astype(float).tolist(),
+        df['Pressure'].astype(float).tolist(),
+        df['Temperature'].astype(float).tolist(),
+    )
+    return [
+        EquipmentRecord(
+            dataset_id=dataset.id,
+            equipment_name=name,
+            equipment_type=eq_type,
+            flowrate=flowrate,
+            pressure=pressure,
+            temperature=temperature,
+        )
+        for name, eq_type, flowrate, pressure, temperature in columns
+    ]
+
+
+def bulk_insert_records(dataset, df, batch_size=None):
+    """Insert the rows of a DataFrame as records using chunked bulk inserts"""
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start:start + batch_size]
+        EquipmentRecord.objects.bulk_create(build_records(dataset, chunk), batch_size=batch_size)
+
+
+def _create_dataset(filename, uploaded_by, raw=None):
+    """Dataset row whose statistics are filled in once every chunk is read"""
+    return EquipmentDataset.objects.create(
+        uploaded_by=uploaded_by,
+        filename=filename,
+        total_count=0,
+        avg_flowrate=0.0,
+        avg_pressure=0.0,
+        avg_temperature=0.0,
+        equipment_distribution='{}',
+        raw_file=raw.name if raw else '',
+        raw_sha256=raw.sha256 if raw else '',
+        raw_size=raw.size if raw else 0,
+    )
+
+
+def _load_chunks(dataset, columnar, chunks, batch_size=None, progress=None, finish=None):
+    """
+    Store parsed chunks of rows as the records of a new dataset
+
+    Must run inside the transaction that created the dataset; the caller
+    aborts the columnar writer if that transaction does not commit. finish,
+    if given, is called with the complete dataset before the commit.
+    """
+    stats = RunningStats()
+    for chunk in chunks:
+        stats.update(chunk)
+        bulk_insert_records(dataset, chunk, batch_size)
+        columnar.write(chunk)
+        if progress is not None:
+            progress(stats.total_count)
+
+    if not stats.total_count:
+        raise CSVValidationError('CSV file contains no data rows')
+
+    stats.apply(dataset)
+    dataset.save()
+
+    # The columnar file is published on commit; until then derived data is
+    # read from the finished file (or the records, without columnar storage)
+    columnar.commit()
+    columns = columnar.read_columns(['equipment_name', 'equipment_type'] + PARAMETERS)
+    store_statistics(dataset, columns)
+    store_unit_points(dataset, columns)
+    store_anomalies(dataset, columns)
+    if finish is not None:
+        finish(dataset)
+
+
+def ingest_csv(csv_file, filename, uploaded_by=None, chunk_size=None, batch_size=None, progress=None,
+               before_commit=None):
+    """
+    Stream a CSV file into a new dataset without loading it whole
+
+    The header is validated first and the original bytes are kept as a
+    compressed file, then the upload is parsed in chunks of chunk_size rows.
+    Each chunk is folded into running statistics and flushed as records
+    (and to columnar storage, if enabled) before the next one is read, so
+    memory use is bounded by the chunk size rather than the file size.
+
+    Args:
+        csv_file: Seekable file-like object containing the CSV
+        filename: Original upload filename
+        uploaded_by: User who uploaded the file, or None
+        chunk_size: Rows parsed per chunk, defaults to settings.INGEST_CHUNK_SIZE
+        batch_size: Records per INSERT, defaults to settings.INGEST_BATCH_SIZE
+        progress: Optional callable, passed the number of rows stored so far
+            after every chunk
+        before_commit: Optional callable, passed the dataset once it is
+            complete; raising from it rolls the ingestion back
+
+    Returns:
+        The created EquipmentDataset
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+
+    # Read only the header row to validate the format up front
+    validate_columns(pd.read_csv(csv_file, nrows=0).columns)
+    csv_file.seek(0)
+
+    raw = store_raw_csv(csv_file)
+
+    columnar = None
+    try:
+        with transaction.atomic():
+            dataset = _create_dataset(filename, uploaded_by, raw)
+            columnar = ColumnarWriter(dataset.id)
+            chunks = pd.read_csv(csv_file, chunksize=chunk_size)
+            _load_chunks(dataset, columnar, chunks, batch_size, progress, before_commit)
+    except Exception:
+        if columnar is not None:
+            columnar.abort()
+        release_raw_csv(raw.name)
+        raise
+    return dataset
+
+
+def _validated(chunks):
+    """Check the columns of the first chunk before passing chunks on"""
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            validate_columns(chunk.columns)
+        yield chunk
+
+
+def ingest_stream(stream, filename, uploaded_by=None, chunk_size=None, batch_size=None, progress=None,
+                  before_commit=None):
+    """
+    Ingest a CSV that can only be read once, front to back
+
+    Like ingest_csv, but the compressed copy of the original bytes is
+    written from the same pass that parses them, so the stream is never
+    rewound. Reads may block until more of the file is available (see
+    api.uploads), letting ingestion run while the upload is still arriving.
+
+    Args:
+        stream: Readable binary file-like object
+        filename: Original upload filename
+        uploaded_by: User who uploaded the file, or None
+        chunk_size: Rows parsed per chunk, defaults to settings.INGEST_CHUNK_SIZE
+        batch_size: Records per INSERT, defaults to settings.INGEST_BATCH_SIZE
+        progress: Optional callable, passed the number of rows stored so far
+            after every chunk
+        before_commit: Optional callable, passed the dataset once it is
+            complete; raising from it rolls the ingestion back
+
+    Returns:
+        The created EquipmentDataset
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+
+    writer = RawCSVWriter()
+    source = io.BufferedReader(TeeReader(stream, writer.write), STREAM_BLOCK_SIZE)
+    raw = None
+    columnar = None
+
+    def finish(dataset):
+        nonlocal raw
+        # The stored copy must hold every byte, even past the last row
+        while source.read(STREAM_BLOCK_SIZE):
+            pass
+        raw = writer.save()
+        dataset.raw_file = raw.name
+        dataset.raw_sha256 = raw.sha256
+        dataset.raw_size = raw.size
+        dataset.save(update_fields=['raw_file', 'raw_sha256', 'raw_size'])
+        if before_commit is not None:
+            before_commit(dataset)
+
+    try:
+        with transaction.atomic():
+            dataset = _create_dataset(filename, uploaded_by)
+            columnar = ColumnarWriter(dataset.id)
+            chunks = _validated(pd.read_csv(source, chunksize=chunk_size))
+            _load_chunks(dataset, columnar, chunks, batch_size, progress, finish)
+    except Exception:
+        if columnar is not None:
+            columnar.abort()
+        writer.discard()
+        if raw is not None:
+            release_raw_csv(raw.name)
+        raise
+    return dataset
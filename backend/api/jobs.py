@@ -0,0 +1,216 @@
+"""
+Database-backed queue of asynchronous CSV uploads
+
+Uploads accepted with ?async=1 are stored as UploadJob rows and ingested
+outside the request, either by the in-process worker threads
+(UPLOAD_JOB_WORKERS > 0) or by the process_upload_jobs management command.
+Jobs are claimed with a conditional UPDATE, so any number of workers can
+share the queue. A job still running after UPLOAD_JOB_STALE_TIMEOUT is
+assumed to have lost its worker and is queued again; its outcome is
+recorded in the ingest transaction only while the claim still holds, so
+a requeued job never produces two datasets.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .cache import KEY_PREFIX
+from .history import publish_dataset
+from .ingestion import CSVValidationError, ingest_csv
+from .models import UploadJob
+
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(settings.UPLOAD_JOB_WORKERS, 1), thread_name_prefix='upload-job'
+)
+
+
+class JobReclaimed(Exception):
+    """Raised when a job was requeued and claimed again while it ran"""
+
+
+def progress_key(job_id):
+    """Cache key holding the rows processed so far by a running job"""
+    return f'{KEY_PREFIX}:upload-job:{job_id}:rows'
+
+
+def job_progress(job):
+    """Rows processed by a job, including progress of a running one"""
+    if job.status == UploadJob.RUNNING:
+        return cache.get(progress_key(job.id), job.rows_processed)
+    return job.rows_processed
+
+
+def job_throughput(job):
+    """Rows ingested per second, or None before the job has started"""
+    if job.started_at is None:
+        return None
+    elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+    if elapsed <= 0:
+        return None
+    return job_progress(job) / elapsed
+
+
+def enqueue_upload(csv_file, filename, uploaded_by=None):
+    """
+    Store an uploaded CSV and queue it for ingestion
+    
+    Args:
+        csv_file: Uploaded file
+        filename: Original upload filename
+        uploaded_by: User who uploaded the file, or None
+    
+    Returns:
+        The queued UploadJob
+    """
+    job = UploadJob(uploaded_by=uploaded_by, filename=filename, size=csv_file.size)
+    job.upload.save(filename, csv_file, save=False)
+    job.save()
+    
+    if settings.UPLOAD_JOB_WORKERS:
+        transaction.on_commit(lambda: _executor.submit(_drain_in_background))
+    return job
+
+
+def claim_next_job():
+    """Mark the oldest queued job as running and return it, or None"""
+    
+    queued = UploadJob.objects.filter(status=UploadJob.QUEUED).order_by('created_at')
+    for job_id in queued.values_list('id', flat=True)[:10]:
+        # Only one worker can win the transition from queued to running
+        claimed = UploadJob.objects.filter(id=job_id, status=UploadJob.QUEUED).update(
+            status=UploadJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            return UploadJob.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs():
+    """
+    Queue running jobs whose worker has presumably died again
+    
+    Jobs that have used up UPLOAD_JOB_MAX_ATTEMPTS are failed instead, so
+    an upload that keeps killing its worker is not retried forever.
+    
+    Returns:
+        Tuple of the number of jobs requeued and failed
+    """
+    stale = UploadJob.objects.filter(
+        status=UploadJob.RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=settings.UPLOAD_JOB_STALE_TIMEOUT),
+    )
+    failed = stale.filter(attempts__gte=settings.UPLOAD_JOB_MAX_ATTEMPTS).update(
+        status=UploadJob.FAILED,
+        error='Ingestion did not finish; the worker stopped or timed out',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.update(status=UploadJob.QUEUED)
+    if failed or requeued:
+        logger.warning('Requeued %s and failed %s stale upload job(s)', requeued, failed)
+    return requeued, failed
+
+
+def _record_outcome(job, **fields):
+    """Update a job if this worker's claim on it still holds"""
+    return UploadJob.objects.filter(id=job.id, status=UploadJob.RUNNING, started_at=job.started_at).update(
+        finished_at=timezone.now(), upload='', **fields
+    )
+
+
+def run_job(job):
+    """
+    Ingest the upload of a claimed job and record the outcome
+    
+    Progress is published to the cache rather than the job row, because
+    ingestion runs in a single transaction that other connections cannot
+    see into until it commits. Success is recorded in that transaction,
+    so the dataset and the job status commit together; publishing the
+    dataset afterwards cannot turn a stored dataset into a failed job.
+    """
+    key = progress_key(job.id)
+    upload_name = job.upload.name
+    
+    def progress(rows):
+        cache.set(key, rows, settings.API_CACHE_TIMEOUT)
+    
+    def record_success(dataset):
+        if not _record_outcome(
+            job, status=UploadJob.SUCCEEDED, dataset=dataset, rows_processed=dataset.total_count
+        ):
+            raise JobReclaimed(f'Upload job {job.id} was claimed by another worker')
+    
+    dataset = None
+    try:
+        with job.upload.open('rb') as csv_file:
+            dataset = ingest_csv(
+                csv_file,
+                filename=job.filename,
+                uploaded_by=job.uploaded_by,
+                progress=progress,
+                before_commit=record_success
+            )
+    except JobReclaimed:
+        logger.warning('Upload job %s was requeued while running; leaving it to its new worker', job.id)
+        return job
+    except CSVValidationError as e:
+        recorded = _record_outcome(job, status=UploadJob.FAILED, error=str(e))
+    except Exception as e:
+        logger.exception('Upload job %s failed', job.id)
+        recorded = _record_outcome(job, status=UploadJob.FAILED, error=f'Error processing CSV: {str(e)}')
+    else:
+        recorded = True
+    
+    if recorded:
+        # The stored upload is only needed until it has been ingested
+        if upload_name:
+            job.upload.storage.delete(upload_name)
+        cache.delete(key)
+    job.refresh_from_db()
+    
+    if dataset is not None:
+        try:
+            publish_dataset(dataset)
+        except Exception:
+            # The dataset is committed and the job succeeded; only the
+            # follow-up work (history pruning, report warm-up) is lost
+            logger.exception('Publishing dataset %s of upload job %s failed', dataset.id, job.id)
+    return job
+
+
+def process_jobs(limit=None):
+    """Run queued jobs until the queue is empty, returning how many ran"""
+    requeue_stale_jobs()
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def _drain_in_background():
+    try:
+        process_jobs()
+    except Exception:
+        logger.exception('Processing upload jobs failed')
+    finally:
+        # Worker threads get their own connection, which must not leak
+        connection.close()
+
+
+def wait_for_jobs(poll_interval=2.0):
+    """Process jobs forever, polling the queue when it is empty"""
+    while True:
+        if not process_jobs():
+            time.sleep(poll_interval)
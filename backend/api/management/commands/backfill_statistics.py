@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from api.aggregates import PARAMETERS, store_unit_points
+from api.columnar import read_columns
+from api.models import EquipmentDataset
+from api.statistics import store_statistics
+
+
+class Command(BaseCommand):
+    """Compute statistics of datasets stored before they were computed at ingest"""
+
+    help = 'Compute descriptive statistics, per-type aggregates and unit points for every dataset missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompute existing statistics too')
+
+    def handle(self, *args, **options):
+        datasets = EquipmentDataset.objects.filter(total_count__gt=0)
+        if not options['force']:
+            datasets = (
+                datasets.filter(statistics='')
+                | datasets.filter(aggregates__isnull=True)
+                | datasets.filter(unit_points__isnull=True)
+            )
+
+        computed = 0
+        for dataset in datasets.distinct().iterator():
+            # Archived datasets are read from the cold tier, not rehydrated
+            columns = read_columns(dataset, ['equipment_name', 'equipment_type'] + PARAMETERS)
+            store_statistics(dataset, columns)
+            store_unit_points(dataset, columns)
+            computed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Computed statistics of {computed} dataset(s)'))
@@ -0,0 +1,69 @@
+import time
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from api.aggregates import PARAMETERS, QUANTILES
+from api.statistics import HISTOGRAM_BINS, compute_statistics
+
+
+def pandas_per_column(frame, bins=HISTOGRAM_BINS):
+    """The same statistics computed the straightforward way, one pandas call per column and type"""
+    result = {'overall': {}, 'by_type': {}}
+    groups = [('overall', frame)] + list(frame.groupby('equipment_type'))
+    for name, group in groups:
+        target = result['overall'] if name == 'overall' else result['by_type'].setdefault(name, {})
+        for parameter in PARAMETERS:
+            column = group[parameter]
+            stats = {
+                'count': int(column.count()),
+                'mean': column.mean(),
+                'std': column.std(),
+                'min': column.min(),
+                'max': column.max(),
+            }
+            for key, q in QUANTILES.items():
+                stats[key] = column.quantile(q)
+            edges = np.linspace(frame[parameter].min(), frame[parameter].max(), bins + 1)
+            stats['histogram'] = np.histogram(column.dropna(), bins=edges)[0].tolist()
+            target[parameter] = stats
+    return result
+
+
+class Command(BaseCommand):
+    """Compare the vectorized statistics engine with per-column pandas calls"""
+
+    help = 'Time api.statistics.compute_statistics against a pandas-per-column baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic records to generate')
+        parser.add_argument('--types', type=int, default=8, help='Distinct equipment types')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation, best is reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        rng = np.random.default_rng(0)
+        type_names = np.array([f'Type {i}' for i in range(options['types'])], dtype=object)
+        columns = {
+            'equipment_type': type_names[rng.integers(0, len(type_names), rows)],
+            'flowrate': rng.normal(120, 30, rows),
+            'pressure': rng.normal(6, 1.5, rows),
+            'temperature': rng.normal(110, 25, rows),
+        }
+        frame = pd.DataFrame(columns)
+
+        vectorized = self.best_time(lambda: compute_statistics(columns), options['repeat'])
+        baseline = self.best_time(lambda: pandas_per_column(frame), options['repeat'])
+
+        self.stdout.write(f'{rows} rows, {len(type_names)} types')
+        self.stdout.write(f'  pandas per column: {baseline * 1000:.1f} ms')
+        self.stdout.write(f'  vectorized:        {vectorized * 1000:.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'  speedup:           {baseline / vectorized:.1f}x'))
+
+    def best_time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
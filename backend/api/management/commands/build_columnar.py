@@ -0,0 +1,26 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from api import columnar
+from api.models import EquipmentDataset
+
+
+class Command(BaseCommand):
+    """Build columnar files for datasets stored before they were enabled"""
+
+    help = 'Write the Arrow columnar file for every dataset that is missing one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild existing files too')
+
+    def handle(self, *args, **options):
+        if not columnar.is_enabled():
+            raise CommandError('Columnar storage is disabled or pyarrow is not installed')
+
+        built = 0
+        for dataset in EquipmentDataset.objects.all():
+            if not options['force'] and os.path.exists(columnar.columnar_path(dataset.id)):
+                continue
+            columnar.write_dataset(dataset)
+            built += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Built {built} columnar file(s)'))
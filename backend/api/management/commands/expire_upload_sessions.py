@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.uploads import expire_sessions
+
+
+class Command(BaseCommand):
+    """Abort resumable uploads that have been abandoned"""
+
+    help = "Abort upload sessions that received no chunk for UPLOAD_SESSION_TTL seconds and delete their chunks"
+
+    def handle(self, *args, **options):
+        expired = expire_sessions()
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} upload session(s)'))
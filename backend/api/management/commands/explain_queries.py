@@ -0,0 +1,87 @@
+import re
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.models import EquipmentDataset, EquipmentRecord, EquipmentTypeAggregate
+
+
+# Plan lines that mean a table is read in full rather than through an index
+FULL_SCAN_PATTERNS = [
+    re.compile(r'\bSCAN (?:TABLE )?\w+$'),  # SQLite
+    re.compile(r'\bSeq Scan\b'),  # PostgreSQL
+    re.compile(r'\btype: ALL\b|\bALL\b.*\bNULL\b'),  # MySQL
+]
+
+
+class Command(BaseCommand):
+    """Show query plans and timings for the hot API queries"""
+
+    help = 'EXPLAIN the history, record and aggregate queries against a dataset and time them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', type=int, help='Dataset id, defaults to the newest one')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query for the timing')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Fail if any plan reads a table without an index'
+        )
+
+    def get_queries(self, dataset):
+        records = EquipmentRecord.objects.filter(dataset=dataset)
+        return {
+            'history': EquipmentDataset.objects.select_related('uploaded_by')[:settings.MAX_DATASET_HISTORY],
+            'user history': EquipmentDataset.objects.filter(
+                uploaded_by_id=dataset.uploaded_by_id
+            )[:settings.MAX_DATASET_HISTORY],
+            'retention candidates': EquipmentDataset.objects.filter(
+                uploaded_by_id=dataset.uploaded_by_id
+            ).order_by('-uploaded_at', '-id').values_list('id', 'archived_at', 'rehydrated_at'),
+            'records page': records.order_by('id')[:100],
+            'records by type': records.filter(equipment_type=self.sample_type(dataset)).order_by('id')[:100],
+            'records by flowrate': records.filter(flowrate__gte=dataset.avg_flowrate).order_by('flowrate', 'id')[:100],
+            'records by pressure': records.filter(pressure__lte=dataset.avg_pressure).order_by('-pressure', '-id')[:100],
+            'records by temperature': records.filter(
+                temperature__gte=dataset.avg_temperature
+            ).order_by('temperature', 'id')[:100],
+            'type aggregates': EquipmentTypeAggregate.objects.filter(dataset=dataset),
+        }
+
+    def sample_type(self, dataset):
+        distribution = dataset.get_distribution_dict()
+        return next(iter(distribution), '')
+
+    def handle(self, *args, **options):
+        if options['dataset']:
+            dataset = EquipmentDataset.objects.filter(id=options['dataset']).first()
+        else:
+            dataset = EquipmentDataset.objects.first()
+        if dataset is None:
+            raise CommandError('No dataset to run the queries against')
+
+        self.stdout.write(f'Dataset {dataset.id} ({dataset.total_count} records)\n')
+
+        full_scans = []
+        for name, queryset in self.get_queries(dataset).items():
+            plan = queryset.explain()
+            elapsed = self.time_query(queryset, options['repeat'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: {elapsed * 1000:.2f} ms'))
+            for line in plan.splitlines():
+                self.stdout.write(f'  {line}')
+
+            if any(pattern.search(line) for line in plan.splitlines() for pattern in FULL_SCAN_PATTERNS):
+                full_scans.append(name)
+
+        if full_scans:
+            message = f'Full table scans in: {", ".join(full_scans)}'
+            if options['check']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('All queries use an index'))
+
+    def time_query(self, queryset, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(queryset.all())
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from api.jobs import process_jobs, wait_for_jobs
+
+
+class Command(BaseCommand):
+    """Worker for uploads queued with ?async=1"""
+
+    help = 'Ingest queued CSV uploads, polling for new ones unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait between polls of an empty queue'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = process_jobs()
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} upload job(s)'))
+            return
+
+        self.stdout.write('Waiting for upload jobs...')
+        wait_for_jobs(options['poll_interval'])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.history import maintain_dataset_history
+from api.storage import sweep_raw_csv
+
+
+class Command(BaseCommand):
+    """Apply dataset retention policies outside of upload requests"""
+
+    help = "Archive and delete datasets according to each user's retention policy and remove unused upload files"
+
+    def handle(self, *args, **options):
+        archived, deleted = maintain_dataset_history()
+        swept = sweep_raw_csv()
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} and deleted {deleted} dataset(s), removed {swept} unused upload file(s)'
+        ))
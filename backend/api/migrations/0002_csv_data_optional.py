@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipmentdataset',
+            name='csv_data',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:04
+
+import gzip
+import hashlib
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+# Frozen copy of the storage layout of api.storage at the time of this migration
+RAW_CSV_DIR = 'datasets/raw'
+
+
+def move_csv_data_to_storage(apps, schema_editor):
+    """Compress the inline csv_data of existing datasets into raw files"""
+    EquipmentDataset = apps.get_model('api', 'EquipmentDataset')
+    for dataset in EquipmentDataset.objects.exclude(csv_data='').iterator():
+        data = dataset.csv_data.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        name = f'{RAW_CSV_DIR}/{digest[:2]}/{digest}.csv.gz'
+        if not default_storage.exists(name):
+            # mtime=0 keeps the compressed bytes identical for identical uploads
+            name = default_storage.save(name, ContentFile(gzip.compress(data, mtime=0)))
+        dataset.raw_file = name
+        dataset.raw_sha256 = digest
+        dataset.raw_size = len(data)
+        dataset.save(update_fields=['raw_file', 'raw_sha256', 'raw_size'])
+
+
+def restore_csv_data(apps, schema_editor):
+    """Inline the stored uploads again; the shared raw files are left in place"""
+    EquipmentDataset = apps.get_model('api', 'EquipmentDataset')
+    for dataset in EquipmentDataset.objects.exclude(raw_file='').iterator():
+        with default_storage.open(dataset.raw_file.name, 'rb') as stored:
+            dataset.csv_data = gzip.decompress(stored.read()).decode('utf-8')
+        dataset.save(update_fields=['csv_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_csv_data_optional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='raw_file',
+            field=models.FileField(blank=True, max_length=255, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='raw_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='raw_size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(move_csv_data_to_storage, restore_csv_data),
+        migrations.RemoveField(
+            model_name='equipmentdataset',
+            name='csv_data',
+        ),
+    ]
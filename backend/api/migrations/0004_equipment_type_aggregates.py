@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_raw_csv_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentTypeAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(max_length=100)),
+                ('count', models.IntegerField()),
+                ('flowrate_mean', models.FloatField()),
+                ('flowrate_min', models.FloatField()),
+                ('flowrate_max', models.FloatField()),
+                ('flowrate_std', models.FloatField(null=True)),
+                ('flowrate_p25', models.FloatField()),
+                ('flowrate_median', models.FloatField()),
+                ('flowrate_p75', models.FloatField()),
+                ('pressure_mean', models.FloatField()),
+                ('pressure_min', models.FloatField()),
+                ('pressure_max', models.FloatField()),
+                ('pressure_std', models.FloatField(null=True)),
+                ('pressure_p25', models.FloatField()),
+                ('pressure_median', models.FloatField()),
+                ('pressure_p75', models.FloatField()),
+                ('temperature_mean', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_std', models.FloatField(null=True)),
+                ('temperature_p25', models.FloatField()),
+                ('temperature_median', models.FloatField()),
+                ('temperature_p75', models.FloatField()),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aggregates', to='api.equipmentdataset')),
+            ],
+            options={
+                'ordering': ['-count', 'equipment_type'],
+                'unique_together': {('dataset', 'equipment_type')},
+            },
+        ),
+    ]
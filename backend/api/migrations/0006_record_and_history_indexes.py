@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_upload_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentdataset',
+            index=models.Index(fields=['uploaded_at', 'id'], name='dataset_uploaded_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdataset',
+            index=models.Index(fields=['uploaded_by', 'uploaded_at'], name='dataset_user_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'equipment_type', 'id'], name='record_dataset_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'flowrate', 'id'], name='record_dataset_flowrate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'pressure', 'id'], name='record_dataset_pressure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'temperature', 'id'], name='record_dataset_temp_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_retention_policies_and_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='statistics',
+            field=models.TextField(blank=True),
+        ),
+    ]
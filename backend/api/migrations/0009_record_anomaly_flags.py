@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_dataset_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='anomalies',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentrecord',
+            name='anomaly_flags',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'anomaly_flags', 'id'], name='record_dataset_anomaly_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_record_anomaly_flags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['equipment_name', 'dataset'], name='record_name_dataset_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_upload_job_attempts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='equipmentrecord',
+            name='record_name_dataset_idx',
+        ),
+    ]
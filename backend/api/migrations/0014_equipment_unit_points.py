@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_drop_record_name_dataset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentUnitPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_name', models.CharField(max_length=255)),
+                ('equipment_type', models.CharField(max_length=100)),
+                ('flowrate', models.FloatField(null=True)),
+                ('pressure', models.FloatField(null=True)),
+                ('temperature', models.FloatField(null=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unit_points', to='api.equipmentdataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['equipment_name', 'dataset'], name='unit_point_name_dataset_idx')],
+                'unique_together': {('dataset', 'equipment_name')},
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import User
 import json
 
@@ -14,14 +15,30 @@ class EquipmentDataset(models.Model):
     avg_pressure = models.FloatField()
     avg_temperature = models.FloatField()
     equipment_distribution = models.TextField()  # JSON string
-    csv_data = models.TextField()  # Store CSV content
+    statistics = models.TextField(blank=True)  # JSON string, see api.statistics
+    anomalies = models.TextField(blank=True)  # JSON string, see api.anomalies
+    raw_file = models.FileField(max_length=255, blank=True)  # Gzipped original upload
+    raw_sha256 = models.CharField(max_length=64, blank=True)
+    raw_size = models.BigIntegerField(default=0)  # Uncompressed size in bytes
+    archived_at = models.DateTimeField(null=True, blank=True)  # Set while records live only in the archive
+    rehydrated_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # History listing, pruning and per-user history
+            models.Index(fields=['uploaded_at', 'id'], name='dataset_uploaded_at_idx'),
+            models.Index(fields=['uploaded_by', 'uploaded_at'], name='dataset_user_uploaded_idx'),
+        ]
     
     def __str__(self):
         return f"{self.filename} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
     
+    @property
+    def is_archived(self):
+        """Whether the records are in the cold tier instead of the database"""
+        return self.archived_at is not None
+    
     def get_distribution_dict(self):
         """Get equipment distribution as dictionary"""
         return json.loads(self.equipment_distribution)
@@ -29,6 +46,49 @@ class EquipmentDataset(models.Model):
     def set_distribution_dict(self, dist_dict):
         """Set equipment distribution from dictionary"""
         self.equipment_distribution = json.dumps(dist_dict)
+    
+    def get_statistics_dict(self):
+        """Get descriptive statistics as dictionary, or None if not computed yet"""
+        return json.loads(self.statistics) if self.statistics else None
+    
+    def set_statistics_dict(self, stats_dict):
+        """Set descriptive statistics from dictionary"""
+        self.statistics = json.dumps(stats_dict)
+    
+    def get_anomalies_dict(self):
+        """Get anomaly summary as dictionary, or None if not detected yet"""
+        return json.loads(self.anomalies) if self.anomalies else None
+    
+    def set_anomalies_dict(self, anomalies_dict):
+        """Set anomaly summary from dictionary"""
+        self.anomalies = json.dumps(anomalies_dict)
+
+
+class RetentionPolicy(models.Model):
+    """How many of a user's datasets are kept, and how many of those stay hot"""
+    
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='retention_policy')
+    hot_datasets = models.PositiveIntegerField()  # Newest datasets with records in the database
+    max_datasets = models.PositiveIntegerField()  # Older ones are archived, beyond this deleted
+    
+    class Meta:
+        verbose_name_plural = 'retention policies'
+    
+    def __str__(self):
+        return f"{self.user}: {self.hot_datasets} hot / {self.max_datasets} total"
+    
+    @classmethod
+    def for_user(cls, user):
+        """Policy of a user, or an unsaved one with the configured defaults"""
+        if user is not None:
+            policy = cls.objects.filter(user=user).first()
+            if policy is not None:
+                return policy
+        return cls(
+            user=user,
+            hot_datasets=settings.MAX_DATASET_HISTORY,
+            max_datasets=settings.DATASET_RETENTION_LIMIT,
+        )
 
 
 class EquipmentRecord(models.Model):
@@ -40,6 +100,157 @@ class EquipmentRecord(models.Model):
     flowrate = models.FloatField()
     pressure = models.FloatField()
     temperature = models.FloatField()
+    anomaly_flags = models.PositiveSmallIntegerField(default=0)  # Bitmask, see api.anomalies
+    
+    class Meta:
+        # Each index ends in id so cursor pages ordered by (value, id)
+        # within a dataset are read straight from the index
+        indexes = [
+            models.Index(fields=['dataset', 'anomaly_flags', 'id'], name='record_dataset_anomaly_idx'),
+            models.Index(fields=['dataset', 'equipment_type', 'id'], name='record_dataset_type_idx'),
+            models.Index(fields=['dataset', 'flowrate', 'id'], name='record_dataset_flowrate_idx'),
+            models.Index(fields=['dataset', 'pressure', 'id'], name='record_dataset_pressure_idx'),
+            models.Index(fields=['dataset', 'temperature', 'id'], name='record_dataset_temp_idx'),
+        ]
     
     def __str__(self):
         return f"{self.equipment_name} ({self.equipment_type})"
+
+
+class EquipmentTypeAggregate(models.Model):
+    """Per equipment type parameter statistics of a dataset, computed at ingest"""
+    
+    dataset = models.ForeignKey(EquipmentDataset, on_delete=models.CASCADE, related_name='aggregates')
+    equipment_type = models.CharField(max_length=100)
+    count = models.IntegerField()
+    
+    flowrate_mean = models.FloatField()
+    flowrate_min = models.FloatField()
+    flowrate_max = models.FloatField()
+    flowrate_std = models.FloatField(null=True)  # Undefined for a single record
+    flowrate_p25 = models.FloatField()
+    flowrate_median = models.FloatField()
+    flowrate_p75 = models.FloatField()
+    
+    pressure_mean = models.FloatField()
+    pressure_min = models.FloatField()
+    pressure_max = models.FloatField()
+    pressure_std = models.FloatField(null=True)
+    pressure_p25 = models.FloatField()
+    pressure_median = models.FloatField()
+    pressure_p75 = models.FloatField()
+    
+    temperature_mean = models.FloatField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+    temperature_std = models.FloatField(null=True)
+    temperature_p25 = models.FloatField()
+    temperature_median = models.FloatField()
+    temperature_p75 = models.FloatField()
+    
+    class Meta:
+        ordering = ['-count', 'equipment_type']
+        unique_together = [('dataset', 'equipment_type')]
+    
+    def __str__(self):
+        return f"{self.equipment_type} ({self.count}) in dataset {self.dataset_id}"
+
+
+class EquipmentUnitPoint(models.Model):
+    """Parameters of one equipment unit in a dataset, computed at ingest for trends"""
+    
+    dataset = models.ForeignKey(EquipmentDataset, on_delete=models.CASCADE, related_name='unit_points')
+    equipment_name = models.CharField(max_length=255)
+    equipment_type = models.CharField(max_length=100)
+    flowrate = models.FloatField(null=True)
+    pressure = models.FloatField(null=True)
+    temperature = models.FloatField(null=True)
+    
+    class Meta:
+        unique_together = [('dataset', 'equipment_name')]
+        indexes = [
+            # Series of one unit across datasets (see api.trends)
+            models.Index(fields=['equipment_name', 'dataset'], name='unit_point_name_dataset_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.equipment_name} in dataset {self.dataset_id}"
+
+
+class UploadJob(models.Model):
+    """CSV upload queued for ingestion by a background worker"""
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    upload = models.FileField(upload_to='uploads/pending', max_length=255, blank=True)
+    size = models.BigIntegerField(default=0)  # Upload size in bytes
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    attempts = models.IntegerField(default=0)  # Times a worker has claimed the job
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    dataset = models.ForeignKey(EquipmentDataset, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """Resumable CSV upload sent as checksummed chunks, see api.uploads"""
+    
+    UPLOADING = 'uploading'
+    INGESTING = 'ingesting'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    ABORTED = 'aborted'
+    STATUS_CHOICES = [
+        (UPLOADING, 'Uploading'),
+        (INGESTING, 'Ingesting'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (ABORTED, 'Aborted'),
+    ]
+    
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()  # Upload size in bytes
+    chunk_size = models.PositiveIntegerField()  # Every chunk but the last has this many bytes
+    sha256 = models.CharField(max_length=64, blank=True)  # Digest of the whole file, if the client sent one
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=UPLOADING, db_index=True)
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    dataset = models.ForeignKey(EquipmentDataset, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+    
+    @property
+    def chunk_count(self):
+        """Number of chunks the upload is split into"""
+        return -(-self.size // self.chunk_size)
+    
+    def chunk_range(self, index):
+        """First and last byte offset of a chunk"""
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.size) - 1
@@ -0,0 +1,136 @@
+import json
+from django.db import connection
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+RECORD_ORDERING_FIELDS = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+
+
+class RecordCursorPagination(CursorPagination):
+    """
+    Keyset pagination for equipment records
+
+    Pages are addressed by an opaque cursor over the sort key instead of an
+    offset, so fetching deep pages of a large dataset stays cheap. The sort
+    key is taken from the ``ordering`` query parameter (prefix with ``-``
+    for descending) and always falls back to the record id.
+
+    DRF positions a cursor on the first sort field only and steps over ties
+    with an offset, which degrades to offset scans on low-cardinality fields
+    such as equipment_type. Here the position is the (field, id) pair and
+    pages start with a row-value comparison that the (dataset, field, id)
+    indexes serve directly.
+    """
+    
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 5000
+    ordering = 'id'
+    
+    def get_ordering(self, request, queryset, view):
+        """Use the requested sort field, with id as a tie-breaker"""
+        requested = request.query_params.get('ordering', self.ordering)
+        field = requested.lstrip('-')
+        if field not in RECORD_ORDERING_FIELDS:
+            field, requested = 'id', self.ordering
+        
+        descending = requested.startswith('-')
+        prefix = '-' if descending else ''
+        if field == 'id':
+            return (f'{prefix}id',)
+        return (f'{prefix}{field}', f'{prefix}id')
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        # Same flow as CursorPagination.paginate_queryset, filtering on the
+        # composite position instead of the first sort field
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+        
+        if reverse:
+            queryset = queryset.order_by(*[self._reversed(order) for order in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        
+        if current_position is not None:
+            descending = reverse != self.ordering[0].startswith('-')
+            queryset = self._after_position(queryset, current_position, descending)
+        
+        # One extra record tells whether there is a following page
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+        
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+        
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+        
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        
+        return self.page
+    
+    @staticmethod
+    def _reversed(order):
+        return order[1:] if order.startswith('-') else f'-{order}'
+    
+    def _after_position(self, queryset, position, descending):
+        """Records strictly after a cursor position in the direction of the page"""
+        operator = '<' if descending else '>'
+        field = self.ordering[0].lstrip('-')
+        if len(self.ordering) == 1:
+            return queryset.filter(**{f'{field}__{"lt" if descending else "gt"}': position})
+        
+        try:
+            value, record_id = json.loads(position)
+            record_id = int(record_id)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        
+        quote = connection.ops.quote_name
+        table = quote(queryset.model._meta.db_table)
+        column = quote(queryset.model._meta.get_field(field).column)
+        return queryset.extra(
+            where=[f'({table}.{column}, {table}.{quote("id")}) {operator} (%s, %s)'],
+            params=[value, record_id],
+        )
+    
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        
+        field = ordering[0].lstrip('-')
+        if isinstance(instance, dict):
+            value, record_id = instance[field], instance['id']
+        else:
+            value, record_id = getattr(instance, field), instance.id
+        # Every record has a distinct position, so cursors never need an offset
+        return json.dumps([value, record_id])
@@ -0,0 +1,96 @@
+"""
+On-disk cache and background rendering of dataset PDF reports
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import logging
+import os
+import tempfile
+from django.conf import settings
+from django.db import connection
+from .models import EquipmentDataset
+from .utils import generate_pdf_report
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever generate_pdf_report changes so cached reports are re-rendered
+REPORT_TEMPLATE_VERSION = 3
+REPORTS_DIR = 'reports'
+
+# Report variant -> include every record instead of the preview table
+REPORT_VARIANTS = {'summary': False, 'full': True}
+
+_executor = ThreadPoolExecutor(max_workers=settings.REPORT_RENDER_WORKERS, thread_name_prefix='report')
+
+
+def report_path(dataset_id, variant='summary'):
+    """Filesystem path of a cached report of a dataset"""
+    return os.path.join(
+        settings.MEDIA_ROOT, REPORTS_DIR, f'{dataset_id}-v{REPORT_TEMPLATE_VERSION}-{variant}.pdf'
+    )
+
+
+def report_version(dataset, variant='summary'):
+    """Version string of a dataset's report, used as its ETag"""
+    return f'report-{dataset.id}-v{REPORT_TEMPLATE_VERSION}-{variant}'
+
+
+def render_report(dataset, variant='summary'):
+    """
+    Render the report of a dataset into the cache
+    
+    The PDF is written to a temporary file next to its final location and
+    moved into place, so concurrent readers never see a partial file.
+    Archived datasets are rendered from the cold tier as they are.
+    
+    Returns:
+        Path of the cached report
+    """
+    path = report_path(dataset.id, variant)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    fd, tmp_path = tempfile.mkstemp(suffix='.pdf.tmp', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        generate_pdf_report(dataset, output=tmp_path, include_all_records=REPORT_VARIANTS[variant])
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def get_report(dataset, variant='summary'):
+    """Path of a cached report of a dataset, rendering it if necessary"""
+    path = report_path(dataset.id, variant)
+    if not os.path.exists(path):
+        path = render_report(dataset, variant)
+    return path
+
+
+def _render_in_background(dataset_id):
+    try:
+        dataset = EquipmentDataset.objects.get(id=dataset_id)
+        if not os.path.exists(report_path(dataset_id)):
+            render_report(dataset)
+    except EquipmentDataset.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception('Rendering report for dataset %s failed', dataset_id)
+    finally:
+        # Worker threads get their own connection, which must not leak
+        connection.close()
+
+
+def schedule_report(dataset_id):
+    """Render a dataset's report on a background thread"""
+    return _executor.submit(_render_in_background, dataset_id)
+
+
+def delete_reports(dataset_id):
+    """Remove every cached report version of a dataset"""
+    pattern = os.path.join(settings.MEDIA_ROOT, REPORTS_DIR, f'{dataset_id}-v*.pdf')
+    for path in glob.glob(pattern):
+        os.remove(path)
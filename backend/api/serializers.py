@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django.contrib.auth.models import User
-from .models import EquipmentDataset, EquipmentRecord
+from .models import EquipmentDataset, EquipmentRecord, EquipmentTypeAggregate, RetentionPolicy, UploadJob, UploadSession
+from .anomalies import decode_flags
+from .jobs import job_progress, job_throughput
+from .statistics import get_statistics, summarize_statistics
+from .uploads import received_chunks, session_progress
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -16,43 +21,176 @@ class EquipmentRecordSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = EquipmentRecord
-        fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+        fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'anomaly_flags']
+    
+    def __init__(self, *args, **kwargs):
+        """Optionally restrict output to a subset of fields"""
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
 
 
-class EquipmentDatasetSerializer(serializers.ModelSerializer):
-    """Serializer for equipment datasets"""
+class AnomalousRecordSerializer(EquipmentRecordSerializer):
+    """Serializer for flagged records, with their anomaly bitmask decoded"""
+    
+    flags = serializers.SerializerMethodField()
+    
+    class Meta(EquipmentRecordSerializer.Meta):
+        fields = EquipmentRecordSerializer.Meta.fields + ['flags']
+    
+    def get_flags(self, obj):
+        """Names of the anomaly flags set on the record"""
+        return decode_flags(obj.anomaly_flags)
+
+
+class EquipmentTypeAggregateSerializer(serializers.ModelSerializer):
+    """Serializer for per equipment type aggregates"""
+    
+    class Meta:
+        model = EquipmentTypeAggregate
+        exclude = ['id', 'dataset']
+
+
+class EquipmentDatasetSummarySerializer(serializers.ModelSerializer):
+    """Lightweight serializer for dataset summaries (without full records)"""
     
     uploaded_by = UserSerializer(read_only=True)
-    records = EquipmentRecordSerializer(many=True, read_only=True)
     equipment_distribution = serializers.SerializerMethodField()
+    statistics = serializers.SerializerMethodField()
+    anomaly_count = serializers.SerializerMethodField()
     
     class Meta:
         model = EquipmentDataset
         fields = [
             'id', 'uploaded_by', 'uploaded_at', 'filename', 
             'total_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature',
-            'equipment_distribution', 'records'
+            'equipment_distribution', 'statistics', 'anomaly_count', 'archived_at'
         ]
     
     def get_equipment_distribution(self, obj):
         """Convert JSON string to dictionary"""
         return obj.get_distribution_dict()
+    
+    def get_statistics(self, obj):
+        """Stored overall statistics per parameter, without histograms"""
+        return summarize_statistics(get_statistics(obj))
+    
+    def get_anomaly_count(self, obj):
+        """Number of flagged records, or None if not detected yet"""
+        anomalies = obj.get_anomalies_dict()
+        return anomalies['anomalous_count'] if anomalies else None
 
 
-class EquipmentDatasetSummarySerializer(serializers.ModelSerializer):
-    """Lightweight serializer for dataset summaries (without full records)"""
+class EquipmentDatasetSerializer(EquipmentDatasetSummarySerializer):
+    """Serializer for equipment datasets, linking to the paginated records endpoint"""
     
-    uploaded_by = UserSerializer(read_only=True)
-    equipment_distribution = serializers.SerializerMethodField()
+    records_url = serializers.SerializerMethodField()
+    aggregates_url = serializers.SerializerMethodField()
+    anomalies_url = serializers.SerializerMethodField()
+    
+    class Meta(EquipmentDatasetSummarySerializer.Meta):
+        fields = EquipmentDatasetSummarySerializer.Meta.fields + [
+            'records_url', 'aggregates_url', 'anomalies_url'
+        ]
+    
+    def get_statistics(self, obj):
+        """Stored descriptive statistics overall and per equipment type"""
+        return get_statistics(obj)
+    
+    def get_records_url(self, obj):
+        """URL of the records endpoint for this dataset"""
+        return reverse('dataset-records', kwargs={'pk': obj.pk}, request=self.context.get('request'))
+    
+    def get_aggregates_url(self, obj):
+        """URL of the per-type aggregates endpoint for this dataset"""
+        return reverse('dataset-aggregates', kwargs={'pk': obj.pk}, request=self.context.get('request'))
+    
+    def get_anomalies_url(self, obj):
+        """URL of the flagged records endpoint for this dataset"""
+        return reverse('dataset-anomalies', kwargs={'pk': obj.pk}, request=self.context.get('request'))
+
+
+class RetentionPolicySerializer(serializers.ModelSerializer):
+    """Serializer for a user's dataset retention policy"""
     
     class Meta:
-        model = EquipmentDataset
+        model = RetentionPolicy
+        fields = ['hot_datasets', 'max_datasets']
+    
+    def validate(self, attrs):
+        """Require at least one hot dataset and no more hot than kept datasets"""
+        hot = attrs.get('hot_datasets', getattr(self.instance, 'hot_datasets', None))
+        total = attrs.get('max_datasets', getattr(self.instance, 'max_datasets', None))
+        if hot is not None and hot < 1:
+            raise serializers.ValidationError({'hot_datasets': 'Must keep at least one dataset hot'})
+        if hot is not None and total is not None and total < hot:
+            raise serializers.ValidationError({'max_datasets': 'Must be at least hot_datasets'})
+        return attrs
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    """Serializer for asynchronous upload jobs and their progress"""
+    
+    rows_processed = serializers.SerializerMethodField()
+    throughput = serializers.SerializerMethodField()
+    dataset_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UploadJob
         fields = [
-            'id', 'uploaded_by', 'uploaded_at', 'filename', 
-            'total_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature',
-            'equipment_distribution'
+            'id', 'filename', 'size', 'status', 'attempts', 'rows_processed', 'throughput',
+            'error', 'dataset', 'dataset_url', 'created_at', 'started_at', 'finished_at'
         ]
     
-    def get_equipment_distribution(self, obj):
-        """Convert JSON string to dictionary"""
-        return obj.get_distribution_dict()
+    def get_rows_processed(self, obj):
+        """Rows stored so far, live while the job is running"""
+        return job_progress(obj)
+    
+    def get_throughput(self, obj):
+        """Rows ingested per second"""
+        return job_throughput(obj)
+    
+    def get_dataset_url(self, obj):
+        """URL of the created dataset, once the job has succeeded"""
+        if obj.dataset_id is None:
+            return None
+        return reverse('dataset-detail', kwargs={'pk': obj.dataset_id}, request=self.context.get('request'))
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for resumable upload sessions"""
+    
+    chunk_count = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+    rows_processed = serializers.SerializerMethodField()
+    url = serializers.SerializerMethodField()
+    dataset_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'url', 'filename', 'size', 'chunk_size', 'chunk_count', 'sha256', 'status',
+            'received_chunks', 'rows_processed', 'error', 'dataset', 'dataset_url',
+            'created_at', 'finished_at'
+        ]
+    
+    def get_received_chunks(self, obj):
+        """Indexes of the chunks stored so far; the client sends the others"""
+        return received_chunks(obj)
+    
+    def get_rows_processed(self, obj):
+        """Rows ingested so far, live while ingestion is running"""
+        return session_progress(obj)
+    
+    def get_url(self, obj):
+        """URL the chunks are PUT to"""
+        return reverse('upload-session', kwargs={'session_id': obj.id}, request=self.context.get('request'))
+    
+    def get_dataset_url(self, obj):
+        """URL of the created dataset, once ingestion has succeeded"""
+        if obj.dataset_id is None:
+            return None
+        return reverse('dataset-detail', kwargs={'pk': obj.dataset_id}, request=self.context.get('request'))
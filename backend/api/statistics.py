@@ -0,0 +1,196 @@
+"""
+Vectorized descriptive statistics of dataset parameters
+
+Each parameter column is sorted by (equipment type, value) once, so every
+type is a contiguous sorted segment; min, max, quantiles and histograms are
+read off the segment boundaries and count, mean and std come from weighted
+bincounts. Python only loops over types, never over records.
+
+This is the only place statistics of records are computed: the per-type
+aggregate rows of api.aggregates are derived from its results.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from .aggregates import PARAMETERS, QUANTILES, store_type_aggregates
+from . import columnar
+
+
+HISTOGRAM_BINS = 20
+
+
+def _quantiles(sorted_values, counts, starts):
+    """Linearly interpolated quantiles (like pandas) of sorted segments"""
+    result = {}
+    for name, q in QUANTILES.items():
+        position = (counts - 1).clip(min=0) * q
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        low_values = sorted_values[(starts + lower).clip(max=len(sorted_values) - 1)]
+        high_values = sorted_values[(starts + upper).clip(max=len(sorted_values) - 1)]
+        result[name] = low_values + (high_values - low_values) * fraction
+    return result
+
+
+def _histogram(sorted_values, start, count, edges):
+    """Bin counts of a sorted segment, the last bin including its right edge"""
+    segment = sorted_values[start:start + count]
+    positions = np.searchsorted(segment, edges[:-1], side='left')
+    positions = np.append(positions, np.searchsorted(segment, edges[-1], side='right'))
+    return np.diff(positions)
+
+
+def _value(value):
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def _column_statistics(values, codes, type_order, sizes, bins):
+    """
+    Statistics of one parameter overall (group 0) and per type (groups 1..n)
+
+    Rows are gathered by type and each type segment is sorted, missing
+    values last, so every group is a contiguous sorted segment.
+    """
+    group_count = len(sizes)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    # Group 0 is the whole dataset, groups 1..n the equipment types
+    counts = np.concatenate(([valid.sum()], np.bincount(codes, weights=valid, minlength=group_count)))
+    sums = np.concatenate(([filled.sum()], np.bincount(codes, weights=filled, minlength=group_count)))
+    counts = counts.astype(np.int64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        # Squared deviations from each group's own mean, for a stable std
+        overall_dev = np.where(valid, values - means[0], 0.0)
+        type_dev = np.where(valid, values - means[1:][codes], 0.0)
+        squares = np.concatenate((
+            [np.dot(overall_dev, overall_dev)],
+            np.bincount(codes, weights=type_dev * type_dev, minlength=group_count),
+        ))
+        variances = squares / (counts - 1)
+    stds = np.sqrt(np.where(counts > 1, variances, np.nan))
+
+    # Overall segment first, followed by the per-type segments
+    type_starts = np.concatenate(([0], np.cumsum(sizes)[:-1])) + len(values)
+    sorted_values = np.concatenate((np.sort(values), values[type_order]))
+    starts = np.concatenate(([0], type_starts))
+    for start, size in zip(type_starts, sizes):
+        sorted_values[start:start + size].sort()
+
+    # Empty groups read a valid index; their result is masked out
+    end = len(sorted_values) - 1
+    mins = np.where(counts > 0, sorted_values[starts.clip(max=end)], np.nan)
+    maxs = np.where(counts > 0, sorted_values[(starts + counts - 1).clip(min=0, max=end)], np.nan)
+    quantiles = _quantiles(sorted_values, counts, starts)
+
+    if counts[0]:
+        low, high = mins[0], maxs[0]
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+    else:
+        edges = None
+
+    groups = []
+    for group in range(len(counts)):
+        count = int(counts[group])
+        stats = {
+            'count': count,
+            'mean': _value(means[group]) if count else None,
+            'std': _value(stds[group]),
+            'min': _value(mins[group]),
+            'max': _value(maxs[group]),
+        }
+        for name in QUANTILES:
+            stats[name] = _value(quantiles[name][group]) if count else None
+        stats['histogram'] = (
+            _histogram(sorted_values, starts[group], count, edges).tolist() if edges is not None else []
+        )
+        groups.append(stats)
+    return groups, edges
+
+
+def compute_statistics(columns, bins=HISTOGRAM_BINS):
+    """
+    Descriptive statistics of parameter columns, overall and per equipment type
+
+    Histograms of every type share the overall bin edges, so they can be
+    compared or stacked directly.
+
+    Args:
+        columns: Mapping with an equipment_type array and one float array
+            per parameter (as returned by columnar.read_columns)
+        bins: Number of histogram bins
+
+    Returns:
+        Dict with "overall" and "by_type" statistics per parameter, the
+        number of records per type under "type_counts" and the histogram
+        bin edges per parameter under "histogram_edges"
+    """
+    result = {'overall': {}, 'by_type': {}, 'type_counts': {}, 'histogram_edges': {}}
+    if not len(columns['equipment_type']):
+        return result
+
+    # Rows grouped by type once, shared by every parameter
+    codes, types = pd.factorize(np.asarray(columns['equipment_type'], dtype=object), sort=True)
+    type_order = np.argsort(codes, kind='stable')
+    sizes = np.bincount(codes, minlength=len(types))
+
+    result['by_type'] = {str(eq_type): {} for eq_type in types}
+    result['type_counts'] = {str(eq_type): int(size) for eq_type, size in zip(types, sizes)}
+    for parameter in PARAMETERS:
+        values = np.asarray(columns[parameter], dtype=np.float64)
+        groups, edges = _column_statistics(values, codes, type_order, sizes, bins)
+        result['overall'][parameter] = groups[0]
+        for eq_type, stats in zip(types, groups[1:]):
+            result['by_type'][str(eq_type)][parameter] = stats
+        result['histogram_edges'][parameter] = edges.tolist() if edges is not None else []
+    return result
+
+
+def store_statistics(dataset, columns=None):
+    """
+    Compute and save the statistics of a dataset and its per-type aggregates
+
+    Args:
+        dataset: EquipmentDataset instance
+        columns: Record columns if already at hand, otherwise they are read
+            through columnar storage
+    """
+    if columns is None:
+        columns = columnar.read_columns(dataset, ['equipment_type'] + PARAMETERS)
+    statistics = compute_statistics(columns)
+    dataset.set_statistics_dict(statistics)
+    dataset.save(update_fields=['statistics'])
+    store_type_aggregates(dataset, statistics)
+    return statistics
+
+
+def summarize_statistics(statistics):
+    """
+    Overall figures of a compute_statistics() result
+
+    Drops the histograms and the per-type breakdown, which make up most of
+    the stored statistics, for listings of many datasets.
+    """
+    if statistics is None:
+        return None
+    return {
+        parameter: {stat: value for stat, value in stats.items() if stat != 'histogram'}
+        for parameter, stats in statistics['overall'].items()
+    }
+
+
+def get_statistics(dataset):
+    """
+    Stored statistics of a dataset, or None
+
+    Statistics are computed at ingest; datasets from before that get them
+    from the backfill_statistics command, never while serving a read.
+    """
+    return dataset.get_statistics_dict()
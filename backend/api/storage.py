@@ -0,0 +1,213 @@
+"""
+Compressed, content-addressed storage for original CSV uploads
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+
+RAW_CSV_DIR = 'datasets/raw'
+STREAM_BLOCK_SIZE = 64 * 1024
+
+RawCSV = namedtuple('RawCSV', ['name', 'sha256', 'size'])
+
+
+def raw_csv_name(digest):
+    """Storage path for a compressed upload with the given SHA-256 digest"""
+    return f'{RAW_CSV_DIR}/{digest[:2]}/{digest}.csv.gz'
+
+
+class RawCSVWriter:
+    """
+    Hashes and gzips an upload block by block into a temporary file
+
+    Lets the original bytes be stored while they are being read for
+    another purpose, e.g. parsed from a stream that cannot be rewound.
+    """
+
+    def __init__(self):
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self._tmp = tempfile.NamedTemporaryFile(suffix='.csv.gz', delete=False)
+        # mtime=0 keeps the compressed bytes identical for identical uploads
+        self._gz = gzip.GzipFile(fileobj=self._tmp, mode='wb', mtime=0)
+
+    def write(self, block):
+        """Append a block of the original upload"""
+        self.hasher.update(block)
+        self.size += len(block)
+        self._gz.write(block)
+
+    def save(self):
+        """
+        Move the compressed upload into storage under its content hash
+
+        Identical uploads share a single stored file.
+
+        Returns:
+            RawCSV with the storage name, SHA-256 hex digest and original size
+        """
+        try:
+            self._close()
+            digest = self.hasher.hexdigest()
+            name = raw_csv_name(digest)
+            if default_storage.exists(name):
+                _touch(name)
+            else:
+                with open(self._tmp.name, 'rb') as compressed:
+                    name = default_storage.save(name, File(compressed))
+        finally:
+            self.discard()
+        return RawCSV(name=name, sha256=digest, size=self.size)
+
+    def discard(self):
+        """Remove the temporary file; safe to call more than once"""
+        self._close()
+        if os.path.exists(self._tmp.name):
+            os.unlink(self._tmp.name)
+
+    def _close(self):
+        if not self._gz.closed:
+            self._gz.close()
+        if not self._tmp.closed:
+            self._tmp.close()
+
+
+class TeeReader(io.RawIOBase):
+    """Readable stream passing every block read from another one to a callback"""
+
+    def __init__(self, source, sink):
+        super().__init__()
+        self.source = source
+        self.sink = sink
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        block = self.source.read(len(buffer))
+        if not block:
+            return 0
+        self.sink(block)
+        buffer[:len(block)] = block
+        return len(block)
+
+
+def store_raw_csv(csv_file):
+    """
+    Gzip an uploaded CSV into storage under its content hash
+
+    The upload is read once in blocks, hashed and compressed to a temporary
+    file, so memory use does not depend on the file size. Identical uploads
+    share a single stored file.
+
+    Args:
+        csv_file: File-like object containing the original upload
+
+    Returns:
+        RawCSV with the storage name, SHA-256 hex digest and original size
+    """
+    writer = RawCSVWriter()
+    try:
+        for block in File(csv_file).chunks(STREAM_BLOCK_SIZE):
+            writer.write(block)
+        raw = writer.save()
+    finally:
+        writer.discard()
+
+    csv_file.seek(0)
+    return raw
+
+
+def _touch(name):
+    """Mark a stored upload as in use by another upload"""
+    try:
+        os.utime(default_storage.path(name))
+    except (NotImplementedError, OSError):
+        pass
+
+
+def _recently_used(name):
+    """Whether a stored upload was saved or reused within the grace period"""
+    grace = timedelta(hours=settings.RAW_CSV_GRACE_HOURS)
+    try:
+        return default_storage.get_modified_time(name) > timezone.now() - grace
+    except (NotImplementedError, OSError):
+        return False
+
+
+def release_raw_csv(name):
+    """
+    Delete a stored upload once no dataset references it any more
+
+    Identical uploads share a file, and the dataset of one still being
+    ingested is not visible to this check until its transaction commits.
+    Such an upload saved or touched the file when it started, so a file
+    used within RAW_CSV_GRACE_HOURS is kept and left to sweep_raw_csv().
+    """
+    from .models import EquipmentDataset
+
+    if not name or not default_storage.exists(name):
+        return
+    if EquipmentDataset.objects.filter(raw_file=name).exists() or _recently_used(name):
+        return
+    default_storage.delete(name)
+
+
+def sweep_raw_csv():
+    """
+    Delete stored uploads that no dataset references and are past the grace period
+
+    Returns:
+        Number of files deleted
+    """
+    from .models import EquipmentDataset
+
+    try:
+        directories, _ = default_storage.listdir(RAW_CSV_DIR)
+    except FileNotFoundError:
+        return 0
+
+    referenced = set(EquipmentDataset.objects.exclude(raw_file='').values_list('raw_file', flat=True))
+    deleted = 0
+    for directory in directories:
+        _, files = default_storage.listdir(f'{RAW_CSV_DIR}/{directory}')
+        for filename in files:
+            name = f'{RAW_CSV_DIR}/{directory}/{filename}'
+            if name in referenced or _recently_used(name):
+                continue
+            # Re-check in case a dataset was committed after the listing
+            if EquipmentDataset.objects.filter(raw_file=name).exists():
+                continue
+            default_storage.delete(name)
+            deleted += 1
+    return deleted
+
+
+def iter_raw_csv(dataset, decompress=True):
+    """
+    Stream the stored upload of a dataset in blocks
+
+    Args:
+        dataset: EquipmentDataset with a stored raw_file
+        decompress: Yield the original CSV bytes instead of the gzip stream
+
+    Yields:
+        Byte strings of at most STREAM_BLOCK_SIZE
+    """
+    with dataset.raw_file.open('rb') as stored:
+        source = gzip.GzipFile(fileobj=stored, mode='rb') if decompress else stored
+        while True:
+            block = source.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
@@ -0,0 +1,216 @@
+"""
+Parameter trends across the dataset history of a user
+
+Series are assembled from the rows computed at ingest (dataset averages,
+per-type aggregates and unit points), never from the records. The
+per-dataset points are kept in the cache for each user, and for each unit
+a user asked about, and extended as datasets are published, so a request
+only queries the rows of datasets it has not seen yet.
+"""
+
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from .aggregates import PARAMETERS, QUANTILES
+from .cache import KEY_PREFIX
+from .history import owner_datasets
+from .models import EquipmentTypeAggregate, EquipmentUnitPoint
+
+
+TYPE_STATISTICS = ['mean', 'min', 'max', 'std'] + list(QUANTILES)
+
+# Units per request with a per-equipment series
+MAX_TREND_UNITS = 20
+
+# Units per user whose cached series are extended on publish
+TRACKED_TREND_UNITS = 100
+
+DATASET_FIELDS = [
+    'id', 'filename', 'uploaded_at', 'total_count',
+    'avg_flowrate', 'avg_pressure', 'avg_temperature', 'archived_at',
+]
+
+
+def trend_key(user):
+    """Cache key of a user's per-dataset trend points"""
+    return f'{KEY_PREFIX}:trends:{user.id if user else "anonymous"}'
+
+
+def _type_points(dataset_ids):
+    """Per-type aggregates of some datasets, by dataset id and type"""
+    fields = ['dataset_id', 'equipment_type', 'count'] + [
+        f'{parameter}_{stat}' for parameter in PARAMETERS for stat in TYPE_STATISTICS
+    ]
+    points = {dataset_id: {} for dataset_id in dataset_ids}
+    for row in EquipmentTypeAggregate.objects.filter(dataset_id__in=dataset_ids).values(*fields):
+        points[row['dataset_id']][row['equipment_type']] = {
+            'count': row['count'],
+            **{
+                parameter: {stat: row[f'{parameter}_{stat}'] for stat in TYPE_STATISTICS}
+                for parameter in PARAMETERS
+            },
+        }
+    return points
+
+
+def update_trend_points(user, dataset_ids):
+    """
+    Add the per-type points of datasets to a user's cached trend points
+
+    Only the aggregates of datasets without a cached point are queried;
+    points of datasets no longer in dataset_ids are dropped.
+
+    Returns:
+        Dict of per-type points by dataset id
+    """
+    cached = cache.get(trend_key(user)) or {}
+    points = {dataset_id: cached[dataset_id] for dataset_id in dataset_ids if dataset_id in cached}
+
+    new_ids = [dataset_id for dataset_id in dataset_ids if dataset_id not in points]
+    if new_ids:
+        points.update(_type_points(new_ids))
+
+    if new_ids or len(points) != len(cached):
+        cache.set(trend_key(user), points, settings.API_CACHE_TIMEOUT)
+    return points
+
+
+def unit_trend_key(user, name):
+    """Cache key of a user's per-dataset points of one unit"""
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    return f'{trend_key(user)}:unit:{digest}'
+
+
+def tracked_units_key(user):
+    """Cache key of the units a user asked for a series of"""
+    return f'{trend_key(user)}:units'
+
+
+def update_unit_points(user, dataset_ids, names):
+    """
+    Add the points of units in datasets to a user's cached unit points
+
+    Like update_trend_points(), only the unit points of datasets not cached
+    yet for a unit are queried, through the (equipment_name, dataset)
+    index.
+
+    Returns:
+        Dict by name of dicts of points by dataset id, None where a dataset
+        lacks the unit
+    """
+    keys = {name: unit_trend_key(user, name) for name in names}
+    cached = cache.get_many(keys.values())
+
+    points = {}
+    missing = {}
+    for name, key in keys.items():
+        unit_cached = cached.get(key) or {}
+        points[name] = {dataset_id: unit_cached[dataset_id] for dataset_id in dataset_ids if dataset_id in unit_cached}
+        new_ids = [dataset_id for dataset_id in dataset_ids if dataset_id not in points[name]]
+        if new_ids or len(points[name]) != len(unit_cached):
+            missing[name] = new_ids
+
+    new_ids = {dataset_id for ids in missing.values() for dataset_id in ids}
+    if new_ids:
+        rows = EquipmentUnitPoint.objects.filter(equipment_name__in=list(missing), dataset_id__in=new_ids)
+        found = {
+            (row['dataset_id'], row['equipment_name']): row
+            for row in rows.values('dataset_id', 'equipment_name', 'equipment_type', *PARAMETERS)
+        }
+        for name, ids in missing.items():
+            for dataset_id in ids:
+                row = found.get((dataset_id, name))
+                points[name][dataset_id] = (
+                    {field: row[field] for field in ['equipment_type'] + PARAMETERS} if row else None
+                )
+
+    if missing:
+        cache.set_many({keys[name]: points[name] for name in missing}, settings.API_CACHE_TIMEOUT)
+    return points
+
+
+def track_units(user, names):
+    """Remember units a user asked about, so publishing extends their series"""
+    tracked = cache.get(tracked_units_key(user)) or []
+    updated = [name for name in tracked if name not in names] + list(names)
+    if updated != tracked:
+        cache.set(tracked_units_key(user), updated[-TRACKED_TREND_UNITS:], settings.API_CACHE_TIMEOUT)
+
+
+def record_trend_point(dataset):
+    """Extend the uploader's cached trend points with a newly published dataset"""
+    user = dataset.uploaded_by
+    dataset_ids = list(owner_datasets(user).values_list('id', flat=True))
+    update_trend_points(user, dataset_ids)
+    names = cache.get(tracked_units_key(user))
+    if names:
+        update_unit_points(user, dataset_ids, names)
+
+
+def _unit_series(dataset_ids, unit_points):
+    """Parameter series of units by name, None where a dataset lacks the unit"""
+    series = {}
+    for name, by_dataset in unit_points.items():
+        points = [by_dataset.get(dataset_id) or {} for dataset_id in dataset_ids]
+        series[name] = {
+            field: [point.get(field) for point in points]
+            for field in ['equipment_type'] + PARAMETERS
+        }
+    return series
+
+
+def build_trends(user, units=()):
+    """
+    Parameter series over a user's datasets, oldest upload first
+
+    Args:
+        user: User whose datasets to include, or None for anonymous uploads
+        units: Equipment names to include a series for, at most MAX_TREND_UNITS
+
+    Returns:
+        Dict with the datasets, the dataset averages per parameter, the
+        count and aggregate statistics per type and parameter, and the
+        series of the requested units; every series is aligned with
+        "datasets" and holds None where a dataset has no value
+    """
+    datasets = list(reversed(owner_datasets(user).values(*DATASET_FIELDS)))
+    dataset_ids = [dataset['id'] for dataset in datasets]
+    points = update_trend_points(user, dataset_ids)
+    unit_points = update_unit_points(user, dataset_ids, list(units)) if units else {}
+    if units:
+        track_units(user, units)
+
+    types = sorted({eq_type for point in points.values() for eq_type in point})
+    by_type = {}
+    for eq_type in types:
+        type_points = [points[dataset_id].get(eq_type) for dataset_id in dataset_ids]
+        by_type[eq_type] = {
+            'count': [point['count'] if point else 0 for point in type_points],
+            **{
+                parameter: {
+                    stat: [point[parameter][stat] if point else None for point in type_points]
+                    for stat in TYPE_STATISTICS
+                }
+                for parameter in PARAMETERS
+            },
+        }
+
+    return {
+        'datasets': [
+            {
+                'id': dataset['id'],
+                'filename': dataset['filename'],
+                'uploaded_at': dataset['uploaded_at'].isoformat(),
+                'total_count': dataset['total_count'],
+                'archived': dataset['archived_at'] is not None,
+            }
+            for dataset in datasets
+        ],
+        'overall': {
+            parameter: [dataset[f'avg_{parameter}'] for dataset in datasets]
+            for parameter in PARAMETERS
+        },
+        'types': types,
+        'by_type': by_type,
+        'units': _unit_series(dataset_ids, unit_points),
+    }
@@ -0,0 +1,504 @@
+"""
+Resumable CSV uploads sent as checksummed chunks
+
+A client creates an UploadSession, PUTs the chunks of its file in any order
+(and in parallel) with a Content-Range header and the SHA-256 of each chunk,
+and finalizes the session once every chunk has arrived. A verified chunk is
+kept as its own part file under MEDIA_ROOT, so receiving one needs no
+database write, and an interrupted upload resumes by sending only the
+chunks the session does not list as received yet.
+
+Ingestion reads the parts in order through ChunkStream, which can wait for
+parts still in flight. With UPLOAD_EARLY_INGEST it starts with the first
+chunk, so the received prefix is parsed and stored while later chunks are
+still uploading and finalizing only waits for the tail. Early ingestion
+runs on worker threads of the process that received the chunk; should
+several processes start one for the same session, only one of them can
+attach its dataset to the session and the others roll back.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from .cache import KEY_PREFIX
+from .history import publish_dataset
+from .ingestion import CSVValidationError, ingest_stream
+from .models import UploadSession
+from .storage import STREAM_BLOCK_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+SESSION_DIR = 'uploads/sessions'
+
+# Seconds between checks for a part that has not arrived yet
+POLL_INTERVAL = 0.2
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+CHECKSUM_MISMATCH = 'Uploaded file does not match its SHA-256 checksum'
+
+_executor = ThreadPoolExecutor(
+    max_workers=max(settings.UPLOAD_INGEST_WORKERS, 1), thread_name_prefix='upload-ingest'
+)
+# Ingestions running in this process, by session id
+_ingests = {}
+_ingests_lock = threading.Lock()
+
+
+class UploadError(ValueError):
+    """Raised when a request about an upload session cannot be accepted"""
+
+
+class UploadConflict(UploadError):
+    """Raised when a session is not in a state that allows the request"""
+
+    def __init__(self, message, missing_chunks=None):
+        super().__init__(message)
+        self.missing_chunks = missing_chunks
+
+
+class UploadInterrupted(Exception):
+    """Raised when ingestion stops before the upload is complete; it can be restarted"""
+
+
+def session_dir(session_id):
+    """Directory holding the received parts of a session"""
+    return os.path.join(settings.MEDIA_ROOT, SESSION_DIR, str(session_id))
+
+
+def part_path(session_id, index):
+    """File of one received chunk"""
+    return os.path.join(session_dir(session_id), f'{index:06d}.part')
+
+
+def progress_key(session_id):
+    """Cache key holding the rows ingested so far from a session"""
+    return f'{KEY_PREFIX}:upload-session:{session_id}:rows'
+
+
+def received_chunks(session):
+    """Sorted indexes of the chunks received so far"""
+    if session.status == UploadSession.SUCCEEDED:
+        return list(range(session.chunk_count))
+    try:
+        names = os.listdir(session_dir(session.id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-5]) for name in names if name.endswith('.part'))
+
+
+def session_progress(session):
+    """Rows ingested from a session, including progress of a running ingestion"""
+    if session.status in (UploadSession.UPLOADING, UploadSession.INGESTING):
+        return cache.get(progress_key(session.id), session.rows_processed)
+    return session.rows_processed
+
+
+def create_session(filename, size, uploaded_by=None, chunk_size=None, sha256=''):
+    """
+    Start a resumable upload
+
+    Args:
+        filename: Name of the CSV file
+        size: File size in bytes
+        uploaded_by: User who uploads the file, or None
+        chunk_size: Bytes per chunk, defaults to settings.UPLOAD_CHUNK_SIZE
+        sha256: Optional hex digest of the whole file, checked before the
+            dataset is committed
+
+    Returns:
+        The new UploadSession
+    """
+    if not filename or not filename.endswith('.csv'):
+        raise UploadError('File must be a CSV')
+    try:
+        size = int(size)
+        chunk_size = int(chunk_size or settings.UPLOAD_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        raise UploadError('size and chunk_size must be integers')
+    if size <= 0:
+        raise UploadError('File is empty')
+    if size > settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f'File must be at most {settings.UPLOAD_MAX_SIZE} bytes')
+    if not settings.UPLOAD_MIN_CHUNK_SIZE <= chunk_size <= settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(
+            f'chunk_size must be between {settings.UPLOAD_MIN_CHUNK_SIZE} '
+            f'and {settings.UPLOAD_MAX_CHUNK_SIZE} bytes'
+        )
+    sha256 = (sha256 or '').lower()
+    if sha256 and not SHA256_HEX.match(sha256):
+        raise UploadError('sha256 must be a hex SHA-256 digest')
+
+    expire_sessions()
+
+    session = UploadSession.objects.create(
+        uploaded_by=uploaded_by,
+        filename=filename,
+        size=size,
+        chunk_size=chunk_size,
+        sha256=sha256,
+    )
+    os.makedirs(session_dir(session.id), exist_ok=True)
+    return session
+
+
+def parse_content_range(header, session):
+    """
+    Index of the chunk a Content-Range header describes
+
+    The range must cover exactly one chunk of the session.
+    """
+    match = CONTENT_RANGE.match(header or '')
+    if match is None:
+        raise UploadError('Content-Range header must be "bytes <first>-<last>/<size>"')
+    first, last, total = (int(value) for value in match.groups())
+    if total != session.size:
+        raise UploadError(f'Content-Range size {total} does not match the upload size {session.size}')
+    index, offset = divmod(first, session.chunk_size)
+    if offset or index >= session.chunk_count or session.chunk_range(index) != (first, last):
+        raise UploadError(f'Content-Range must cover one chunk of {session.chunk_size} bytes')
+    return index
+
+
+def receive_chunk(session, index, stream, sha256):
+    """
+    Store one chunk of an upload after checking its length and checksum
+
+    The chunk is written to a temporary file and moved into place, so a
+    part file always holds a complete, verified chunk. Receiving a chunk
+    again replaces it, which makes retries safe.
+
+    Args:
+        session: UploadSession being uploaded
+        index: Chunk index, see parse_content_range()
+        stream: Request body
+        sha256: Hex SHA-256 digest of the chunk sent by the client
+
+    Returns:
+        Number of chunks received so far
+    """
+    if session.status != UploadSession.UPLOADING:
+        raise UploadConflict(_state_message(session))
+    sha256 = (sha256 or '').lower()
+    if not SHA256_HEX.match(sha256):
+        raise UploadError('X-Chunk-SHA256 header must be the hex SHA-256 digest of the chunk')
+
+    first, last = session.chunk_range(index)
+    expected = last - first + 1
+    path = part_path(session.id, index)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+
+    hasher = hashlib.sha256()
+    received = 0
+    try:
+        with open(tmp_path, 'wb') as part:
+            # Read one byte more than expected to detect an oversized body
+            while received <= expected:
+                block = stream.read(min(STREAM_BLOCK_SIZE, expected + 1 - received))
+                if not block:
+                    break
+                hasher.update(block)
+                part.write(block)
+                received += len(block)
+        if received != expected:
+            raise UploadError(f'Chunk {index} must be {expected} bytes')
+        if hasher.hexdigest() != sha256:
+            raise UploadError(f'Checksum of chunk {index} does not match')
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if settings.UPLOAD_EARLY_INGEST:
+        start_ingest(session, wait=True)
+    return len(received_chunks(session))
+
+
+class ChunkStream(io.RawIOBase):
+    """
+    The received parts of a session read back in order as one stream
+
+    With wait set, reaching a part that has not arrived yet blocks until it
+    does; UploadInterrupted is raised once the session is aborted or no
+    part arrives for UPLOAD_STALL_TIMEOUT seconds.
+    """
+
+    def __init__(self, session, wait=False):
+        super().__init__()
+        self.session_id = session.id
+        self.chunk_count = session.chunk_count
+        self.wait = wait
+        self.index = 0
+        self._part = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            if self._part is None:
+                if self.index >= self.chunk_count:
+                    return 0
+                self._part = self._open_part(self.index)
+            count = self._part.readinto(buffer)
+            if count:
+                return count
+            self._part.close()
+            self._part = None
+            self.index += 1
+
+    def _open_part(self, index):
+        deadline = time.monotonic() + settings.UPLOAD_STALL_TIMEOUT
+        while True:
+            try:
+                return open(part_path(self.session_id, index), 'rb')
+            except FileNotFoundError:
+                if not self.wait:
+                    raise UploadInterrupted(f'Chunk {index} has not been received')
+            if not os.path.isdir(session_dir(self.session_id)):
+                raise UploadInterrupted('Upload session was aborted')
+            if time.monotonic() > deadline:
+                raise UploadInterrupted(f'Timed out waiting for chunk {index}')
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        if self._part is not None:
+            self._part.close()
+            self._part = None
+        super().close()
+
+
+def ingest_session(session, wait=False):
+    """
+    Ingest the parts of a session into a dataset and attach it to the session
+
+    Args:
+        session: UploadSession to ingest
+        wait: Wait for chunks that have not arrived yet instead of failing
+
+    Returns:
+        The created EquipmentDataset
+    """
+    key = progress_key(session.id)
+
+    def progress(rows):
+        cache.set(key, rows, settings.API_CACHE_TIMEOUT)
+
+    def attach(dataset):
+        # The checksum may have been sent on finalize, after this ingestion
+        # started, so it is matched in the same UPDATE that attaches
+        checksum_matches = Q(sha256='') | Q(sha256=dataset.raw_sha256)
+        # Only one ingestion of a session can attach its dataset
+        attached = UploadSession.objects.filter(
+            checksum_matches,
+            id=session.id,
+            status__in=[UploadSession.UPLOADING, UploadSession.INGESTING],
+            dataset__isnull=True,
+        ).update(
+            status=UploadSession.SUCCEEDED,
+            dataset=dataset,
+            rows_processed=dataset.total_count,
+            finished_at=timezone.now(),
+        )
+        if not attached:
+            if UploadSession.objects.filter(id=session.id).exclude(checksum_matches).exists():
+                raise CSVValidationError(CHECKSUM_MISMATCH)
+            raise UploadInterrupted('Upload session was finished by another ingestion')
+
+    with ChunkStream(session, wait=wait) as stream:
+        dataset = ingest_stream(
+            stream,
+            filename=session.filename,
+            uploaded_by=session.uploaded_by,
+            progress=progress,
+            before_commit=attach
+        )
+    cache.delete(key)
+    shutil.rmtree(session_dir(session.id), ignore_errors=True)
+    publish_dataset(dataset)
+    return dataset
+
+
+def run_ingest(session_id, wait=False):
+    """
+    Ingest a session and record a failure on it
+
+    An interrupted ingestion leaves the session as it was, so it can be
+    started again once more chunks arrive or the session is finalized.
+
+    Returns:
+        The created EquipmentDataset, or None
+    """
+    session = UploadSession.objects.select_related('uploaded_by').get(id=session_id)
+    if session.status not in (UploadSession.UPLOADING, UploadSession.INGESTING):
+        return None
+    try:
+        return ingest_session(session, wait=wait)
+    except UploadInterrupted as e:
+        logger.info('Ingestion of upload session %s interrupted: %s', session_id, e)
+    except CSVValidationError as e:
+        fail_session(session, str(e))
+    except Exception as e:
+        logger.exception('Ingestion of upload session %s failed', session_id)
+        fail_session(session, f'Error processing CSV: {str(e)}')
+    return None
+
+
+def fail_session(session, error):
+    """Mark an unfinished session as failed and drop its parts"""
+    UploadSession.objects.filter(
+        id=session.id, status__in=[UploadSession.UPLOADING, UploadSession.INGESTING]
+    ).update(status=UploadSession.FAILED, error=error, finished_at=timezone.now())
+    cache.delete(progress_key(session.id))
+    shutil.rmtree(session_dir(session.id), ignore_errors=True)
+
+
+def start_ingest(session, wait=False):
+    """Ingest a session on a worker thread unless this process already is"""
+    with _ingests_lock:
+        future = _ingests.get(session.id)
+        if future is None:
+            future = _executor.submit(_ingest_in_background, session.id, wait)
+            _ingests[session.id] = future
+    return future
+
+
+def _ingest_in_background(session_id, wait):
+    try:
+        return run_ingest(session_id, wait)
+    finally:
+        with _ingests_lock:
+            _ingests.pop(session_id, None)
+        # Worker threads get their own connection, which must not leak
+        connection.close()
+
+
+def _set_checksum(session, sha256):
+    """Record the whole-file digest sent on finalize and check it if ingested"""
+    sha256 = sha256.lower()
+    if not SHA256_HEX.match(sha256):
+        raise UploadError('sha256 must be a hex SHA-256 digest')
+    if session.sha256 and session.sha256 != sha256:
+        raise UploadError('sha256 differs from the one the session was created with')
+
+    UploadSession.objects.filter(id=session.id, sha256='', dataset__isnull=True).update(sha256=sha256)
+    session.refresh_from_db()
+    # An early ingestion may have attached its dataset before the digest
+    # arrived
+    if session.dataset_id is not None and session.dataset.raw_sha256 != sha256:
+        raise UploadError(CHECKSUM_MISMATCH)
+
+
+def finalize_session(session, run_async=False, sha256=''):
+    """
+    Turn a completely uploaded session into a dataset
+
+    An ingestion already running in this process (see UPLOAD_EARLY_INGEST)
+    is waited for rather than repeated.
+
+    Args:
+        session: UploadSession with every chunk received
+        run_async: Return right away and ingest on a worker thread
+        sha256: Optional hex digest of the whole file, checked against the
+            reassembled upload before the dataset is committed
+
+    Returns:
+        The session, refreshed; its dataset is set once ingestion succeeded
+    """
+    if session.status not in (UploadSession.UPLOADING, UploadSession.INGESTING, UploadSession.SUCCEEDED):
+        raise UploadConflict(_state_message(session))
+    if sha256:
+        _set_checksum(session, sha256)
+    if session.status in (UploadSession.INGESTING, UploadSession.SUCCEEDED) and run_async:
+        return session
+
+    if session.status == UploadSession.UPLOADING:
+        received = set(received_chunks(session))
+        missing = [index for index in range(session.chunk_count) if index not in received]
+        if missing:
+            raise UploadConflict(f'{len(missing)} chunk(s) have not been received', missing_chunks=missing)
+
+    with _ingests_lock:
+        running = _ingests.get(session.id)
+    if running is not None and not run_async:
+        running.result()
+        session.refresh_from_db()
+
+    if session.status == UploadSession.UPLOADING:
+        # No more chunks are accepted from here on
+        UploadSession.objects.filter(id=session.id, status=UploadSession.UPLOADING).update(
+            status=UploadSession.INGESTING
+        )
+        session.refresh_from_db()
+
+    # Still ingesting if there was no early ingestion or it was interrupted
+    if session.status == UploadSession.INGESTING:
+        if run_async:
+            start_ingest(session)
+        else:
+            run_ingest(session.id)
+            session.refresh_from_db()
+    return session
+
+
+def abort_session(session):
+    """Cancel an unfinished upload and delete its parts"""
+    if session.status not in (UploadSession.UPLOADING, UploadSession.INGESTING):
+        raise UploadConflict(_state_message(session))
+    UploadSession.objects.filter(
+        id=session.id, status__in=[UploadSession.UPLOADING, UploadSession.INGESTING]
+    ).update(status=UploadSession.ABORTED, finished_at=timezone.now())
+    # A running ingestion notices the missing directory and rolls back
+    shutil.rmtree(session_dir(session.id), ignore_errors=True)
+
+
+def expire_sessions():
+    """
+    Abort uploads that received no chunk for UPLOAD_SESSION_TTL seconds
+
+    Sessions left ingesting by a worker that died are expired the same
+    way; ingestions still running in this process are left alone.
+
+    Returns:
+        Number of sessions expired
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    expired = 0
+    stale = UploadSession.objects.filter(
+        status__in=[UploadSession.UPLOADING, UploadSession.INGESTING], created_at__lt=cutoff
+    )
+    for session in stale:
+        with _ingests_lock:
+            if session.id in _ingests:
+                continue
+        # Every stored part touches the directory, so its mtime is the last activity
+        try:
+            last_activity = os.path.getmtime(session_dir(session.id))
+        except FileNotFoundError:
+            last_activity = 0
+        if last_activity < cutoff.timestamp():
+            abort_session(session)
+            expired += 1
+    return expired
+
+
+def _state_message(session):
+    if session.status == UploadSession.FAILED:
+        return f'Upload session failed: {session.error}'
+    return f'Upload session is {session.status}'
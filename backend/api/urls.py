@@ -8,8 +8,14 @@ router.register(r'datasets', views.EquipmentDatasetViewSet, basename='dataset')
 urlpatterns = [
     path('', include(router.urls)),
     path('upload/', views.upload_csv, name='upload-csv'),
+    path('jobs/<int:job_id>/', views.get_upload_job, name='upload-job'),
+    path('uploads/', views.create_upload_session, name='upload-sessions'),
+    path('uploads/<int:session_id>/', views.upload_session, name='upload-session'),
+    path('uploads/<int:session_id>/finalize/', views.finalize_upload_session, name='upload-session-finalize'),
     path('summary/<int:dataset_id>/', views.get_summary, name='get-summary'),
     path('history/', views.get_history, name='get-history'),
+    path('trends/', views.get_trends, name='get-trends'),
+    path('retention/', views.retention_policy, name='retention-policy'),
     path('auth/register/', views.register_user, name='register'),
     path('auth/login/', views.login_user, name='login'),
     path('auth/logout/', views.logout_user, name='logout'),
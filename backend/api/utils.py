@@ -5,20 +5,137 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import io
+import itertools
 from datetime import datetime
+import numpy as np
+from .aggregates import get_type_aggregates
+from .anomalies import detect_anomalies, get_anomalies
+from .archive import iter_archived_rows
+from .columnar import read_columns
+from .statistics import get_statistics
 
 
-def generate_pdf_report(dataset):
+PREVIEW_RECORD_COUNT = 20
+RECORDS_PER_TABLE = 40
+RECORD_FIELDS = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+
+RECORDS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3f51b5')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+])
+
+
+class FlowableStream(list):
+    """
+    Flowable list that is refilled from an iterator as it is consumed
+    
+    ReportLab builds a document by repeatedly taking the first item off the
+    flowable list, so appending from a generator on demand keeps only a few
+    pending flowables in memory instead of the whole document.
+    """
+    
+    def __init__(self, flowables, source, lookahead=4):
+        super().__init__(flowables)
+        self._source = iter(source)
+        self._lookahead = lookahead
+    
+    def _fill(self, minimum):
+        while self._source is not None and list.__len__(self) < minimum:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+    
+    def __len__(self):
+        self._fill(self._lookahead)
+        return list.__len__(self)
+    
+    def __getitem__(self, index):
+        if isinstance(index, int) and index >= 0:
+            self._fill(max(index + 1, self._lookahead))
+        return list.__getitem__(self, index)
+
+
+def iter_record_tables(rows, rows_per_table=RECORDS_PER_TABLE):
+    """
+    Yield record tables of at most rows_per_table rows each
+    
+    Every table repeats the header row, so a table split across pages
+    still shows its column names.
+    """
+    header = ['Equipment Name', 'Type', 'Flow', 'Press.', 'Temp.']
+    chunk = []
+    
+    def make_table():
+        table = Table([header] + chunk, colWidths=[2 * inch, 1.5 * inch, 1 * inch, 1 * inch, 1 * inch], repeatRows=1)
+        table.setStyle(RECORDS_TABLE_STYLE)
+        return table
+    
+    for name, eq_type, flowrate, pressure, temperature in rows:
+        chunk.append([
+            name[:20],  # Truncate if too long
+            eq_type[:15],
+            f'{flowrate:.1f}',
+            f'{pressure:.1f}',
+            f'{temperature:.1f}',
+        ])
+        if len(chunk) == rows_per_table:
+            yield make_table()
+            chunk = []
+    
+    if chunk:
+        yield make_table()
+
+
+def record_rows(dataset, limit=None):
+    """
+    Records of a dataset in id order as report table rows
+    
+    Rows of archived datasets are read from the cold tier, so rendering a
+    report never rehydrates a dataset.
+    """
+    if dataset.is_archived:
+        return itertools.islice(iter_archived_rows(dataset), limit)
+    records = dataset.records.order_by('id').values_list(*RECORD_FIELDS)
+    if limit is not None:
+        return records[:limit]
+    # Rows are streamed from the database as ReportLab lays out pages
+    return records.iterator(chunk_size=2000)
+
+
+def flagged_record_rows(dataset, limit):
+    """First anomalous records of a dataset as report table rows"""
+    if not dataset.is_archived:
+        return dataset.records.exclude(anomaly_flags=0).order_by('id').values_list(*RECORD_FIELDS)[:limit]
+    
+    # Flags are not archived; detect them again over the archived columns
+    columns = read_columns(dataset, RECORD_FIELDS)
+    flags, _ = detect_anomalies(columns)
+    rows = np.flatnonzero(flags)[:limit]
+    return list(zip(*(columns[field][rows].tolist() for field in RECORD_FIELDS)))
+
+
+def generate_pdf_report(dataset, output=None, include_all_records=False):
     """
     Generate a PDF report for an equipment dataset
     
     Args:
         dataset: EquipmentDataset instance
+        output: File path to write the PDF to instead of a buffer
+        include_all_records: List every record instead of the first
+            PREVIEW_RECORD_COUNT, as page-sized tables
     
     Returns:
-        BytesIO buffer containing the PDF
+        BytesIO buffer containing the PDF, or output if it was given
     """
-    buffer = io.BytesIO()
+    buffer = output or io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     
     # Container for the 'Flowable' objects
@@ -79,20 +196,31 @@ def generate_pdf_report(dataset):
     summary_heading = Paragraph("Summary Statistics", heading_style)
     elements.append(summary_heading)
     
-    summary_data = [
-        ['Parameter', 'Average Value', 'Unit'],
-        ['Flowrate', f'{dataset.avg_flowrate:.2f}', 'm³/h'],
-        ['Pressure', f'{dataset.avg_pressure:.2f}', 'bar'],
-        ['Temperature', f'{dataset.avg_temperature:.2f}', '°C'],
-    ]
+    statistics = get_statistics(dataset) or {}
+    overall = statistics.get('overall', {})
+    
+    def stat(parameter, name):
+        value = overall.get(parameter, {}).get(name)
+        return '-' if value is None else f'{value:.2f}'
+    
+    summary_data = [['Parameter', 'Mean', 'Std', 'Min', 'Median', 'Max', 'Unit']]
+    for label, parameter, average, unit in [
+        ('Flowrate', 'flowrate', dataset.avg_flowrate, 'm³/h'),
+        ('Pressure', 'pressure', dataset.avg_pressure, 'bar'),
+        ('Temperature', 'temperature', dataset.avg_temperature, '°C'),
+    ]:
+        summary_data.append([
+            label, f'{average:.2f}', stat(parameter, 'std'), stat(parameter, 'min'),
+            stat(parameter, 'median'), stat(parameter, 'max'), unit,
+        ])
     
-    summary_table = Table(summary_data, colWidths=[2 * inch, 2 * inch, 1.5 * inch])
+    summary_table = Table(summary_data, colWidths=[1.3 * inch, 0.9 * inch, 0.9 * inch, 0.9 * inch, 0.9 * inch, 0.9 * inch, 0.7 * inch])
     summary_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3f51b5')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
         ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
@@ -105,20 +233,27 @@ def generate_pdf_report(dataset):
     distribution_heading = Paragraph("Equipment Type Distribution", heading_style)
     elements.append(distribution_heading)
     
-    distribution = dataset.get_distribution_dict()
-    dist_data = [['Equipment Type', 'Count', 'Percentage']]
+    # Counts and per-type averages come from the aggregates computed at ingest
+    dist_data = [['Equipment Type', 'Count', 'Share', 'Avg Flow', 'Avg Press.', 'Avg Temp.']]
     
-    for eq_type, count in distribution.items():
-        percentage = (count / dataset.total_count) * 100
-        dist_data.append([eq_type, str(count), f'{percentage:.1f}%'])
+    for aggregate in get_type_aggregates(dataset):
+        percentage = (aggregate.count / dataset.total_count) * 100
+        dist_data.append([
+            aggregate.equipment_type[:20],
+            str(aggregate.count),
+            f'{percentage:.1f}%',
+            f'{aggregate.flowrate_mean:.1f}',
+            f'{aggregate.pressure_mean:.1f}',
+            f'{aggregate.temperature_mean:.1f}',
+        ])
     
-    dist_table = Table(dist_data, colWidths=[2.5 * inch, 1.5 * inch, 1.5 * inch])
+    dist_table = Table(dist_data, colWidths=[1.8 * inch, 0.9 * inch, 0.9 * inch, 1 * inch, 1 * inch, 1 * inch])
     dist_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3f51b5')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
         ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#e8eaf6')),
         ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#e8eaf6'), colors.white]),
@@ -128,55 +263,67 @@ def generate_pdf_report(dataset):
     elements.append(dist_table)
     elements.append(Spacer(1, 0.3 * inch))
     
+    # Anomalies
+    anomalies = get_anomalies(dataset)
+    if anomalies is not None:
+        elements.append(Paragraph("Anomalies", heading_style))
+        elements.append(Paragraph(
+            f"{anomalies['anomalous_count']} of {dataset.total_count} records flagged per equipment type: "
+            f"robust z-score above {anomalies['mad_threshold']:g} (MAD) or outside "
+            f"Q1/Q3 ± {anomalies['iqr_factor']:g} × IQR (IQR).",
+            styles['Normal']
+        ))
+        elements.append(Spacer(1, 0.1 * inch))
+        
+        counts = anomalies['counts']
+        anomaly_data = [['Parameter', 'MAD', 'IQR']] + [
+            [label, str(counts[f'{parameter}_mad']), str(counts[f'{parameter}_iqr'])]
+            for label, parameter in [('Flowrate', 'flowrate'), ('Pressure', 'pressure'), ('Temperature', 'temperature')]
+        ]
+        anomaly_table = Table(anomaly_data, colWidths=[2 * inch, 1.5 * inch, 1.5 * inch])
+        anomaly_table.setStyle(RECORDS_TABLE_STYLE)
+        elements.append(anomaly_table)
+        
+        if anomalies['anomalous_count']:
+            elements.append(Spacer(1, 0.2 * inch))
+            elements.extend(iter_record_tables(flagged_record_rows(dataset, PREVIEW_RECORD_COUNT)))
+            if anomalies['anomalous_count'] > PREVIEW_RECORD_COUNT:
+                elements.append(Paragraph(
+                    f"<i>Showing first {PREVIEW_RECORD_COUNT} of {anomalies['anomalous_count']} flagged records</i>",
+                    styles['Normal']
+                ))
+        elements.append(Spacer(1, 0.3 * inch))
+    
     # Equipment Records
     records_heading = Paragraph("Equipment Records", heading_style)
     elements.append(records_heading)
     
-    # Limit to first 20 records for readability
-    records = dataset.records.all()[:20]
-    records_data = [['Equipment Name', 'Type', 'Flow', 'Press.', 'Temp.']]
-    
-    for record in records:
-        records_data.append([
-            record.equipment_name[:20],  # Truncate if too long
-            record.equipment_type[:15],
-            f'{record.flowrate:.1f}',
-            f'{record.pressure:.1f}',
-            f'{record.temperature:.1f}',
-        ])
-    
-    records_table = Table(records_data, colWidths=[2 * inch, 1.5 * inch, 1 * inch, 1 * inch, 1 * inch])
-    records_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3f51b5')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-    ]))
-    
-    elements.append(records_table)
+    if include_all_records:
+        record_tables = iter_record_tables(record_rows(dataset))
+    else:
+        # Limit to first 20 records for readability
+        record_tables = iter_record_tables(record_rows(dataset, PREVIEW_RECORD_COUNT))
     
-    if dataset.total_count > 20:
+    trailing = []
+    if not include_all_records and dataset.total_count > PREVIEW_RECORD_COUNT:
         note = Paragraph(
-            f"<i>Note: Showing first 20 of {dataset.total_count} records</i>",
+            f"<i>Note: Showing first {PREVIEW_RECORD_COUNT} of {dataset.total_count} records</i>",
             styles['Normal']
         )
-        elements.append(Spacer(1, 0.1 * inch))
-        elements.append(note)
+        trailing.append(Spacer(1, 0.1 * inch))
+        trailing.append(note)
     
     # Footer
-    elements.append(Spacer(1, 0.4 * inch))
+    trailing.append(Spacer(1, 0.4 * inch))
     footer = Paragraph(
         f"<i>Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</i>",
         ParagraphStyle('Footer', parent=styles['Normal'], alignment=TA_CENTER, fontSize=8)
     )
-    elements.append(footer)
+    trailing.append(footer)
     
-    # Build PDF
-    doc.build(elements)
+    # Build PDF, generating the record tables only as they are laid out
+    doc.build(FlowableStream(elements, itertools.chain(record_tables, trailing)))
+    if output:
+        return output
     buffer.seek(0)
     return buffer
@@ -1,21 +1,57 @@
+import hashlib
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.http import HttpResponse
-import pandas as pd
-import io
-from .models import EquipmentDataset, EquipmentRecord
+from django.http import FileResponse, StreamingHttpResponse
+from .models import EquipmentDataset, EquipmentRecord, RetentionPolicy, UploadJob, UploadSession
 from .serializers import (
+    AnomalousRecordSerializer,
     EquipmentDatasetSerializer, 
     EquipmentDatasetSummarySerializer,
+    EquipmentRecordSerializer,
+    EquipmentTypeAggregateSerializer,
+    RetentionPolicySerializer,
+    UploadJobSerializer,
+    UploadSessionSerializer,
     UserSerializer
 )
-from .utils import generate_pdf_report
+from .filters import filter_records
+from .pagination import RecordCursorPagination
+from .aggregates import PARAMETERS, get_type_aggregates
+from .anomalies import METHODS as ANOMALY_METHODS, get_anomalies, matching_flag_values
+from .compare import DEFAULT_UNIT_LIMIT, MAX_UNIT_LIMIT, compare_datasets
+from .charts import DEFAULT_POINTS, DOWNSAMPLE_METHODS, MAX_POINTS, MIN_POINTS, build_chart_data
+from .cache import (
+    cached_comparison_response,
+    cached_dataset_response,
+    cached_history_response,
+    conditional_response,
+    set_validators
+)
+from .encoding import FastJSONResponse, columnar_records
+from .reports import get_report, report_version
+from .ingestion import CSVValidationError, ingest_csv
+from .archive import ensure_hot
+from .history import maintain_dataset_history, owner_datasets, publish_dataset
+from .jobs import enqueue_upload
+from .trends import MAX_TREND_UNITS, build_trends
+from .storage import iter_raw_csv
+from .uploads import (
+    UploadConflict,
+    UploadError,
+    abort_session,
+    create_session,
+    finalize_session,
+    parse_content_range,
+    receive_chunk
+)
 
 
 class EquipmentDatasetViewSet(viewsets.ModelViewSet):
@@ -31,21 +67,249 @@ class EquipmentDatasetViewSet(viewsets.ModelViewSet):
             return EquipmentDatasetSummarySerializer
         return EquipmentDatasetSerializer
     
+    def retrieve(self, request, *args, **kwargs):
+        """Dataset detail, served from the response cache"""
+        dataset = self.get_object()
+        return cached_dataset_response(
+            request, dataset, 'detail',
+            lambda: self.get_serializer(dataset).data
+        )
+    
+    @action(detail=True, methods=['get'])
+    def records(self, request, pk=None):
+        """
+        Paginated, filterable records of a dataset
+        
+        With ?shape=columnar the records are returned as one list per field
+        instead of one object per record (see columnar_records_response).
+        Archived datasets are rehydrated first.
+        """
+        dataset = ensure_hot(self.get_object())
+        queryset = filter_records(dataset.records.all(), request.query_params)
+        
+        fields = None
+        if request.query_params.get('fields'):
+            fields = [f.strip() for f in request.query_params['fields'].split(',')]
+            invalid = set(fields) - set(EquipmentRecordSerializer.Meta.fields)
+            if invalid:
+                return Response(
+                    {'error': f'Unknown fields: {", ".join(sorted(invalid))}'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        if request.query_params.get('shape') == 'columnar':
+            return self.columnar_records_response(request, queryset, fields)
+        
+        paginator = RecordCursorPagination()
+        if fields:
+            # The cursor is built from the sort key, so it is always loaded
+            ordering = paginator.get_ordering(request, queryset, self)
+            queryset = queryset.only(*fields, *[field.lstrip('-') for field in ordering])
+        
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = EquipmentRecordSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
+    
+    def columnar_records_response(self, request, queryset, fields):
+        """
+        High-throughput records response in a columnar JSON shape
+        
+        Records are ordered by id and paged with ?after=<id>&limit=<n>
+        (no limit returns every matching record). The body looks like
+        {"count": n, "next": url, "columns": {"equipment_name": [...], ...}}.
+        """
+        fields = fields or EquipmentRecordSerializer.Meta.fields
+        queryset = queryset.order_by('id')
+        
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = int(request.query_params.get('limit', 0))
+        except ValueError:
+            return Response(
+                {'error': 'after and limit must be integers'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if after:
+            queryset = queryset.filter(id__gt=after)
+        
+        next_url = None
+        if limit > 0:
+            # Look up the last id of this page and whether another row follows
+            boundary = list(queryset.values_list('id', flat=True)[limit - 1:limit + 1])
+            if boundary:
+                queryset = queryset.filter(id__lte=boundary[0])
+            if len(boundary) > 1:
+                next_url = replace_query_param(request.build_absolute_uri(), 'after', boundary[0])
+        
+        columns = columnar_records(queryset, fields)
+        count = len(columns[fields[0]])
+        return FastJSONResponse({'count': count, 'next': next_url, 'columns': columns})
+    
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """
+        Unit by unit differences between two datasets
+        
+        ?a=<id> is the baseline and ?b=<id> the dataset compared with it;
+        ?limit=<n> caps the units listed as added, removed and changed
+        (default 100).
+        """
+        try:
+            ids = [int(request.query_params[name]) for name in ('a', 'b')]
+            limit = int(request.query_params.get('limit', DEFAULT_UNIT_LIMIT))
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'a and b must be dataset ids and limit an integer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = min(max(limit, 0), MAX_UNIT_LIMIT)
+        
+        datasets = EquipmentDataset.objects.in_bulk(ids)
+        missing = [str(dataset_id) for dataset_id in ids if dataset_id not in datasets]
+        if missing:
+            return Response(
+                {'error': f'Dataset not found: {", ".join(missing)}'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        dataset_a, dataset_b = (datasets[dataset_id] for dataset_id in ids)
+        
+        return cached_comparison_response(
+            request, dataset_a, dataset_b, f'compare-{limit}',
+            lambda: compare_datasets(dataset_a, dataset_b, limit)
+        )
+    
+    @action(detail=True, methods=['get'])
+    def aggregates(self, request, pk=None):
+        """Per equipment type statistics of a dataset"""
+        dataset = self.get_object()
+        return cached_dataset_response(
+            request, dataset, 'aggregates',
+            lambda: EquipmentTypeAggregateSerializer(get_type_aggregates(dataset), many=True).data
+        )
+    
+    @action(detail=True, methods=['get'])
+    def anomalies(self, request, pk=None):
+        """
+        Records flagged as outliers at ingest, with the detection summary
+        
+        ?parameter=flowrate|pressure|temperature and ?method=mad|iqr narrow
+        the flags; the record filters and cursor pagination of the records
+        endpoint apply as well.
+        """
+        dataset = ensure_hot(self.get_object())
+        
+        parameter = request.query_params.get('parameter') or None
+        method = request.query_params.get('method') or None
+        if parameter is not None and parameter not in PARAMETERS:
+            return Response(
+                {'error': f'parameter must be one of: {", ".join(PARAMETERS)}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if method is not None and method not in ANOMALY_METHODS:
+            return Response(
+                {'error': f'method must be one of: {", ".join(ANOMALY_METHODS)}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        summary = get_anomalies(dataset)
+        queryset = dataset.records.filter(anomaly_flags__in=matching_flag_values(parameter, method))
+        queryset = filter_records(queryset, request.query_params)
+        
+        paginator = RecordCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        response = paginator.get_paginated_response(AnomalousRecordSerializer(page, many=True).data)
+        response.data['summary'] = summary
+        return response
+    
+    @action(detail=True, methods=['get'], url_path='chart-data')
+    def chart_data(self, request, pk=None):
+        """
+        Constant-size chart data of a dataset
+        
+        ?points=<n> caps each downsampled series (default 2000) and
+        ?method=lttb|minmax picks the downsampling algorithm.
+        """
+        dataset = self.get_object()
+        
+        try:
+            points = int(request.query_params.get('points', DEFAULT_POINTS))
+        except ValueError:
+            return Response(
+                {'error': 'points must be an integer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        points = min(max(points, MIN_POINTS), MAX_POINTS)
+        
+        method = request.query_params.get('method', DOWNSAMPLE_METHODS[0])
+        if method not in DOWNSAMPLE_METHODS:
+            return Response(
+                {'error': f'method must be one of: {", ".join(DOWNSAMPLE_METHODS)}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return cached_dataset_response(
+            request, dataset, f'chart-data-{method}-{points}',
+            lambda: build_chart_data(dataset, points, method)
+        )
+    
     @action(detail=True, methods=['get'])
     def download_pdf(self, request, pk=None):
-        """Generate and download PDF report for a dataset"""
+        """
+        Download the PDF report of a dataset
+        
+        ?records=all lists every record instead of the first 20.
+        """
         dataset = self.get_object()
-        pdf_buffer = generate_pdf_report(dataset)
+        variant = 'full' if request.query_params.get('records') == 'all' else 'summary'
+        version = report_version(dataset, variant)
+        not_modified = conditional_response(request, version, dataset.uploaded_at)
+        if not_modified is not None:
+            return not_modified
         
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{dataset.filename}_report.pdf"'
+        # Reports are rendered once and streamed from the on-disk cache
+        response = FileResponse(
+            open(get_report(dataset, variant), 'rb'),
+            as_attachment=True,
+            filename=f'{dataset.filename}_{"full_" if variant == "full" else ""}report.pdf',
+            content_type='application/pdf'
+        )
+        return set_validators(response, version, dataset.uploaded_at)
+    
+    @action(detail=True, methods=['get'])
+    def download_csv(self, request, pk=None):
+        """Stream the original uploaded CSV for a dataset"""
+        dataset = self.get_object()
+        if not dataset.raw_file:
+            return Response(
+                {'error': 'Original CSV is not available for this dataset'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Clients that accept gzip get the stored bytes without recompression
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = StreamingHttpResponse(iter_raw_csv(dataset, decompress=False), content_type='text/csv')
+            response['Content-Encoding'] = 'gzip'
+            response['Content-Length'] = dataset.raw_file.size
+        else:
+            response = StreamingHttpResponse(iter_raw_csv(dataset), content_type='text/csv')
+            response['Content-Length'] = dataset.raw_size
+        
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = f'attachment; filename="{dataset.filename}"'
         return response
 
 
 @csrf_exempt
 @api_view(['POST'])
 def upload_csv(request):
-    """Handle CSV file upload and processing"""
+    """
+    Handle CSV file upload and processing
+    
+    With ?async=1 the file is only stored and queued; the response is
+    202 Accepted with the upload job, whose progress can be polled at
+    /api/jobs/<id>/.
+    """
     
     if 'file' not in request.FILES:
         return Response(
@@ -62,65 +326,32 @@ def upload_csv(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    uploaded_by = request.user if request.user.is_authenticated else None
+    
+    if request.query_params.get('async') in ('1', 'true'):
+        job = enqueue_upload(csv_file, filename=csv_file.name, uploaded_by=uploaded_by)
+        serializer = UploadJobSerializer(job, context={'request': request})
+        response = Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('upload-job', kwargs={'job_id': job.id}, request=request)
+        return response
+    
     try:
-        # Read CSV file
-        df = pd.read_csv(csv_file)
+        # Stream the CSV into a dataset and its records in one transaction
+        dataset = ingest_csv(csv_file, filename=csv_file.name, uploaded_by=uploaded_by)
         
-        # Validate required columns
-        required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            return Response(
-                {'error': f'Missing required columns: {", ".join(missing_columns)}'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Calculate statistics
-        total_count = len(df)
-        avg_flowrate = df['Flowrate'].mean()
-        avg_pressure = df['Pressure'].mean()
-        avg_temperature = df['Temperature'].mean()
-        
-        # Get equipment type distribution
-        equipment_distribution = df['Type'].value_counts().to_dict()
-        
-        # Store CSV content as string
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_content = csv_buffer.getvalue()
-        
-        # Create dataset
-        dataset = EquipmentDataset.objects.create(
-            uploaded_by=request.user if request.user.is_authenticated else None,
-            filename=csv_file.name,
-            total_count=total_count,
-            avg_flowrate=avg_flowrate,
-            avg_pressure=avg_pressure,
-            avg_temperature=avg_temperature,
-            csv_data=csv_content
-        )
-        dataset.set_distribution_dict(equipment_distribution)
-        dataset.save()
-        
-        # Create individual records
-        for _, row in df.iterrows():
-            EquipmentRecord.objects.create(
-                dataset=dataset,
-                equipment_name=row['Equipment Name'],
-                equipment_type=row['Type'],
-                flowrate=row['Flowrate'],
-                pressure=row['Pressure'],
-                temperature=row['Temperature']
-            )
-        
-        # Maintain history limit
-        maintain_dataset_history()
+        # Maintain history limit and warm the report cache
+        publish_dataset(dataset)
         
         # Return created dataset
-        serializer = EquipmentDatasetSerializer(dataset)
+        serializer = EquipmentDatasetSerializer(dataset, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    except CSVValidationError as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     except Exception as e:
         return Response(
             {'error': f'Error processing CSV: {str(e)}'}, 
@@ -128,14 +359,172 @@ def upload_csv(request):
         )
 
 
+@api_view(['GET'])
+def get_upload_job(request, job_id):
+    """Get the status and progress of an asynchronous upload"""
+    
+    try:
+        job = UploadJob.objects.get(id=job_id)
+    except UploadJob.DoesNotExist:
+        job = None
+    
+    # Jobs are only visible to the user who queued them
+    if job is None or (job.uploaded_by_id is not None and job.uploaded_by_id != request.user.id):
+        return Response(
+            {'error': 'Upload job not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    serializer = UploadJobSerializer(job, context={'request': request})
+    return Response(serializer.data)
+
+
+@api_view(['POST'])
+def create_upload_session(request):
+    """
+    Start a resumable upload
+    
+    Expects {"filename", "size"} and optionally "chunk_size" and the
+    "sha256" of the whole file. Chunks are then PUT to the session URL and
+    the upload is completed at <session URL>/finalize/.
+    """
+    
+    uploaded_by = request.user if request.user.is_authenticated else None
+    
+    try:
+        session = create_session(
+            filename=request.data.get('filename', ''),
+            size=request.data.get('size'),
+            uploaded_by=uploaded_by,
+            chunk_size=request.data.get('chunk_size'),
+            sha256=request.data.get('sha256', '')
+        )
+    except UploadError as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = UploadSessionSerializer(session, context={'request': request})
+    response = Response(serializer.data, status=status.HTTP_201_CREATED)
+    response['Location'] = serializer.data['url']
+    return response
+
+
+def get_own_session(request, session_id):
+    """Upload session of the current user, or None"""
+    
+    session = UploadSession.objects.filter(id=session_id).first()
+    # Sessions are only visible to the user who started them
+    if session is None or (session.uploaded_by_id is not None and session.uploaded_by_id != request.user.id):
+        return None
+    return session
+
+
+def upload_error_response(error):
+    """Response for a rejected upload session request"""
+    
+    if isinstance(error, UploadConflict):
+        data = {'error': str(error)}
+        if error.missing_chunks is not None:
+            data['missing_chunks'] = error.missing_chunks
+        return Response(data, status=status.HTTP_409_CONFLICT)
+    return Response(
+        {'error': str(error)}, 
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+def upload_session(request, session_id):
+    """
+    Get, upload a chunk to, or abort a resumable upload
+    
+    GET lists the chunks received so far, so an interrupted upload can
+    resume with the missing ones. PUT stores one chunk: the raw bytes as
+    the body, a Content-Range header of exactly one chunk and the hex
+    SHA-256 of the chunk in X-Chunk-SHA256. Chunks may be sent in any
+    order and in parallel, and resent. DELETE aborts the upload.
+    """
+    
+    session = get_own_session(request, session_id)
+    if session is None:
+        return Response(
+            {'error': 'Upload session not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        if request.method == 'PUT':
+            index = parse_content_range(request.headers.get('Content-Range'), session)
+            received = receive_chunk(session, index, request.stream, request.headers.get('X-Chunk-SHA256'))
+            return Response({'index': index, 'received': received, 'chunk_count': session.chunk_count})
+        
+        if request.method == 'DELETE':
+            abort_session(session)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    serializer = UploadSessionSerializer(session, context={'request': request})
+    return Response(serializer.data)
+
+
+@api_view(['POST'])
+def finalize_upload_session(request, session_id):
+    """
+    Complete a resumable upload once every chunk has been received
+    
+    Optionally expects the "sha256" of the whole file, which the
+    reassembled upload must match. Responds like /api/upload/ with the
+    created dataset. With ?async=1 the response is 202 Accepted with the
+    session, whose status and progress can be polled at the session URL.
+    Missing chunks are listed in a 409 response.
+    """
+    
+    session = get_own_session(request, session_id)
+    if session is None:
+        return Response(
+            {'error': 'Upload session not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    run_async = request.query_params.get('async') in ('1', 'true')
+    try:
+        session = finalize_session(
+            session,
+            run_async=run_async,
+            sha256=request.data.get('sha256', '')
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    if run_async:
+        serializer = UploadSessionSerializer(session, context={'request': request})
+        response = Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = serializer.data['url']
+        return response
+    
+    if session.status != UploadSession.SUCCEEDED:
+        return Response(
+            {'error': session.error or f'Upload session is {session.status}'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = EquipmentDatasetSerializer(session.dataset, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 @api_view(['GET'])
 def get_summary(request, dataset_id):
     """Get summary statistics for a specific dataset"""
     
     try:
         dataset = EquipmentDataset.objects.get(id=dataset_id)
-        serializer = EquipmentDatasetSerializer(dataset)
-        return Response(serializer.data)
+        return cached_dataset_response(
+            request, dataset, 'summary',
+            lambda: EquipmentDatasetSerializer(dataset, context={'request': request}).data
+        )
     except EquipmentDataset.DoesNotExist:
         return Response(
             {'error': 'Dataset not found'}, 
@@ -145,10 +534,69 @@ def get_summary(request, dataset_id):
 
 @api_view(['GET'])
 def get_history(request):
-    """Get list of last 5 uploaded datasets"""
+    """
+    Get the uploaded datasets of the current user, hot and archived
+    
+    Anonymous requests get the last MAX_DATASET_HISTORY uploads of everyone.
+    """
+    
+    if not request.user.is_authenticated:
+        def build():
+            datasets = EquipmentDataset.objects.select_related('uploaded_by')[:settings.MAX_DATASET_HISTORY]
+            return EquipmentDatasetSummarySerializer(datasets, many=True).data
+        
+        return cached_history_response(request, 'history', build)
+    
+    def build_user_history():
+        datasets = owner_datasets(request.user).select_related('uploaded_by')
+        return EquipmentDatasetSummarySerializer(datasets, many=True).data
     
-    datasets = EquipmentDataset.objects.all()[:settings.MAX_DATASET_HISTORY]
-    serializer = EquipmentDatasetSummarySerializer(datasets, many=True)
+    return cached_history_response(request, f'history-user-{request.user.id}', build_user_history)
+
+
+@api_view(['GET'])
+def get_trends(request):
+    """
+    Parameter series across the datasets of the current user
+    
+    ?equipment=<name>,<name> adds series of individual units, at most
+    MAX_TREND_UNITS of them.
+    """
+    
+    if not request.user.is_authenticated:
+        return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    units = sorted({name.strip() for name in request.query_params.get('equipment', '').split(',') if name.strip()})
+    if len(units) > MAX_TREND_UNITS:
+        return Response(
+            {'error': f'At most {MAX_TREND_UNITS} equipment names can be requested'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    view = f'trends-user-{request.user.id}'
+    if units:
+        view += '-' + hashlib.sha1('\n'.join(units).encode()).hexdigest()
+    return cached_history_response(request, view, lambda: build_trends(request.user, units))
+
+
+@api_view(['GET', 'PUT'])
+def retention_policy(request):
+    """Get or update the dataset retention policy of the current user"""
+    
+    if not request.user.is_authenticated:
+        return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    policy = RetentionPolicy.for_user(request.user)
+    if request.method == 'GET':
+        return Response(RetentionPolicySerializer(policy).data)
+    
+    serializer = RetentionPolicySerializer(policy, data=request.data, partial=True)
+    if not serializer.is_valid():
+        return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    serializer.save(user=request.user)
+    
+    # Apply the new limits right away
+    maintain_dataset_history([request.user])
     return Response(serializer.data)
 
 
@@ -230,14 +678,3 @@ def current_user(request):
         return Response(serializer.data)
     else:
         return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
-
-
-def maintain_dataset_history():
-    """Keep only the last MAX_DATASET_HISTORY datasets"""
-    
-    datasets = EquipmentDataset.objects.all()
-    if datasets.count() > settings.MAX_DATASET_HISTORY:
-        # Delete oldest datasets beyond the limit
-        to_delete = datasets[settings.MAX_DATASET_HISTORY:]
-        for dataset in to_delete:
-            dataset.delete()
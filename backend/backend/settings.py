@@ -86,6 +86,29 @@ DATABASES = {
 }
 
 
+# Cache
+# CACHE_BACKEND selects local memory (default, per process), a shared
+# file-based cache or a Redis-compatible server at CACHE_LOCATION
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'api-cache',
+    'file': str(BASE_DIR / 'cache'),
+    'redis': 'redis://127.0.0.1:6379/1',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_DEFAULT_LOCATIONS[CACHE_BACKEND]),
+    }
+}
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -145,5 +168,73 @@ REST_FRAMEWORK = {
     ],
 }
 
-# Maximum number of datasets to keep in history
-MAX_DATASET_HISTORY = 5
+# Default retention per user (see api.models.RetentionPolicy): the newest
+# MAX_DATASET_HISTORY datasets keep their records in the database, older ones
+# up to DATASET_RETENTION_LIMIT are archived to compressed files and deleted
+# beyond that
+MAX_DATASET_HISTORY = int(os.environ.get('MAX_DATASET_HISTORY', '5'))
+DATASET_RETENTION_LIMIT = int(os.environ.get('DATASET_RETENTION_LIMIT', '100'))
+
+# Hours a rehydrated archived dataset stays hot before it may be archived again
+ARCHIVE_REHYDRATE_GRACE_HOURS = int(os.environ.get('ARCHIVE_REHYDRATE_GRACE_HOURS', '24'))
+
+# Number of equipment records written per bulk INSERT during CSV ingestion
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', '2000'))
+
+# Number of CSV rows parsed per chunk when streaming an upload
+INGEST_CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', '50000'))
+
+# Hours an unreferenced original upload is kept after it was last stored or
+# reused, so an identical upload still being ingested never loses its file
+RAW_CSV_GRACE_HOURS = int(os.environ.get('RAW_CSV_GRACE_HOURS', '24'))
+
+# Persist each dataset's records as an Arrow file under MEDIA_ROOT for
+# vectorized reads (needs the optional pyarrow package)
+COLUMNAR_STORAGE_ENABLED = os.environ.get('COLUMNAR_STORAGE_ENABLED', 'True') == 'True'
+
+# Seconds a cached API response is kept (entries are also invalidated on upload/pruning)
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', '3600'))
+
+# Render each dataset's PDF report in the background right after upload
+REPORT_PRERENDER = os.environ.get('REPORT_PRERENDER', 'True') == 'True'
+REPORT_RENDER_WORKERS = int(os.environ.get('REPORT_RENDER_WORKERS', '1'))
+
+# Threads per server process that ingest uploads queued with ?async=1.
+# Set to 0 when running `manage.py process_upload_jobs` instead; live progress
+# of jobs run by that command needs a cache backend shared between processes.
+UPLOAD_JOB_WORKERS = int(os.environ.get('UPLOAD_JOB_WORKERS', '1'))
+
+# Seconds after which a running job is assumed to have lost its worker and
+# is queued again (must exceed the longest ingestion), and how many times
+# a job is started before it is failed instead
+UPLOAD_JOB_STALE_TIMEOUT = int(os.environ.get('UPLOAD_JOB_STALE_TIMEOUT', str(2 * 3600)))
+UPLOAD_JOB_MAX_ATTEMPTS = int(os.environ.get('UPLOAD_JOB_MAX_ATTEMPTS', '3'))
+
+# Resumable uploads (see api.uploads): default and allowed chunk sizes in
+# bytes, largest accepted file, and seconds an unfinished upload is kept
+# after its last chunk arrived
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+UPLOAD_MIN_CHUNK_SIZE = int(os.environ.get('UPLOAD_MIN_CHUNK_SIZE', str(256 * 1024)))
+UPLOAD_MAX_CHUNK_SIZE = int(os.environ.get('UPLOAD_MAX_CHUNK_SIZE', str(64 * 1024 * 1024)))
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', str(10 * 1024 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', str(24 * 3600)))
+
+# Start ingesting a resumable upload from its first chunks while the rest is
+# still arriving. This holds a write transaction open for the length of the
+# upload, which SQLite (a single writer) cannot afford, so it is off there
+# unless enabled explicitly. An ingestion that waits UPLOAD_STALL_TIMEOUT
+# seconds for the next chunk is rolled back and restarted by later chunks.
+UPLOAD_EARLY_INGEST = os.environ.get(
+    'UPLOAD_EARLY_INGEST', 'False' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'True'
+) == 'True'
+UPLOAD_INGEST_WORKERS = int(os.environ.get('UPLOAD_INGEST_WORKERS', '2'))
+UPLOAD_STALL_TIMEOUT = int(os.environ.get('UPLOAD_STALL_TIMEOUT', '60'))
+
+# Apply retention (archive and prune the uploader's datasets) on a background
+# thread after an upload instead of inside the upload request
+HISTORY_PRUNE_DEFERRED = os.environ.get('HISTORY_PRUNE_DEFERRED', 'False') == 'True'
+
+# Outlier detection at ingest (see api.anomalies): robust z-score threshold
+# and the IQR multiple of the Tukey fences
+ANOMALY_MAD_THRESHOLD = float(os.environ.get('ANOMALY_MAD_THRESHOLD', '3.5'))
+ANOMALY_IQR_FACTOR = float(os.environ.get('ANOMALY_IQR_FACTOR', '1.5'))
@@ -0,0 +1,87 @@
+"""
+Synthetic equipment CSV generator for benchmarks
+
+Writes files in the upload format (see sample_equipment_data.csv) with a
+fixed seed, so runs on different commits upload identical data.
+
+Usage:
+    python benchmarks/generate_data.py 100000 -o equipment_100k.csv
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+
+
+# Type -> (share of units, mean flowrate, mean pressure, mean temperature)
+EQUIPMENT_TYPES = {
+    'Pump': (0.20, 95.0, 12.0, 85.0),
+    'Valve': (0.15, 60.0, 6.0, 70.0),
+    'Reactor': (0.10, 150.0, 8.0, 320.0),
+    'Heat Exchanger': (0.12, 200.0, 5.5, 280.0),
+    'Column': (0.08, 180.0, 3.8, 180.0),
+    'Compressor': (0.10, 250.0, 15.0, 110.0),
+    'Mixer': (0.08, 75.0, 4.0, 60.0),
+    'Separator': (0.07, 120.0, 7.0, 140.0),
+    'Tank': (0.06, 40.0, 1.5, 35.0),
+    'Furnace': (0.04, 110.0, 2.5, 650.0),
+}
+
+CHUNK_ROWS = 100_000
+
+
+def generate_frame(rows, start=0, seed=0):
+    """
+    DataFrame of synthetic equipment records
+
+    Args:
+        rows: Number of records
+        start: Index of the first unit, for unique names across chunks
+        seed: Random seed
+
+    Returns:
+        DataFrame with the columns of an upload
+    """
+    rng = np.random.default_rng((seed, start))
+    names = list(EQUIPMENT_TYPES)
+    shares = np.array([EQUIPMENT_TYPES[name][0] for name in names])
+    means = np.array([EQUIPMENT_TYPES[name][1:] for name in names])
+
+    codes = rng.choice(len(names), size=rows, p=shares / shares.sum())
+    # Values spread by 10% of the type mean, a few percent of them outliers
+    values = means[codes] * rng.normal(1.0, 0.1, size=(rows, 3))
+    outliers = rng.random((rows, 3)) < 0.005
+    values[outliers] *= rng.uniform(1.5, 3.0, size=outliers.sum())
+
+    types = np.array(names, dtype=object)[codes]
+    return pd.DataFrame({
+        'Equipment Name': [f'{eq_type}-{start + i:07d}' for i, eq_type in enumerate(types)],
+        'Type': types,
+        'Flowrate': values[:, 0].round(2),
+        'Pressure': values[:, 1].round(2),
+        'Temperature': values[:, 2].round(2),
+    })
+
+
+def write_csv(path, rows, seed=0):
+    """Write a synthetic CSV of the given number of rows in bounded memory"""
+    with open(path, 'w', newline='') as file:
+        for start in range(0, rows, CHUNK_ROWS):
+            frame = generate_frame(min(CHUNK_ROWS, rows - start), start, seed)
+            frame.to_csv(file, index=False, header=start == 0)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic equipment CSV')
+    parser.add_argument('rows', type=int, help='Number of records')
+    parser.add_argument('-o', '--output', help='Output file (default: equipment_<rows>.csv)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    path = write_csv(args.output or f'equipment_{args.rows}.csv', args.rows, args.seed)
+    print(f'Wrote {args.rows} rows to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""
+Load test of the backend API
+
+Drives concurrent requests against a running server (manage.py runserver,
+gunicorn, ...) and reports latency percentiles, throughput and the peak
+resident memory of the server per endpoint. Results are written as JSON,
+tagged with the current git commit, so runs on different commits can be
+compared with --compare.
+
+Usage:
+    python benchmarks/load_test.py --sizes 1000,100000 --concurrency 8 \\
+        --server-pid $(pgrep -f "manage.py runserver" | tail -1)
+    python benchmarks/load_test.py --compare benchmarks/results/<earlier>.json
+
+Memory is only reported with --server-pid (the server and its child
+processes are sampled, so pass the gunicorn master); psutil is used when
+installed, /proc otherwise.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+from generate_data import write_csv
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+READ_ENDPOINTS = ['history', 'detail', 'summary', 'chart-data', 'pdf']
+
+
+def _process_rss(pid):
+    """Resident memory in bytes of a process and its descendants"""
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return 0
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as children:
+                    pending.extend(int(child) for child in children.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return total
+
+
+class MemoryMonitor:
+    """Samples the server's resident memory on a thread, tracking the peak per phase"""
+
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = _process_rss(self.pid)
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._stop.clear()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _process_rss(self.pid))
+
+
+def percentile(sorted_values, q):
+    """Linearly interpolated percentile of sorted values"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class Client:
+    """
+    API client with a session per worker thread
+
+    The user logs in once; worker sessions share its session cookie, so no
+    login (and password hashing) is timed as part of a request.
+    """
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+        self._cookies = self._login(username, password)
+
+    def _login(self, username, password):
+        session = requests.Session()
+        credentials = {'username': username, 'password': password}
+        response = session.post(f'{self.base_url}/auth/login/', json=credentials)
+        if response.status_code != 200:
+            session.post(f'{self.base_url}/auth/register/', json=credentials).raise_for_status()
+            session.post(f'{self.base_url}/auth/login/', json=credentials).raise_for_status()
+        return session.cookies
+
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.cookies.update(self._cookies)
+            self._local.session = session
+        return session
+
+    def get(self, path, **kwargs):
+        return self.session().get(f'{self.base_url}{path}', **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.session().post(f'{self.base_url}{path}', **kwargs)
+
+
+def run_phase(name, request, count, concurrency, server_pid=None):
+    """
+    Send count requests from concurrency threads and summarize them
+
+    Args:
+        name: Endpoint label, for progress output
+        request: Callable taking the request number and returning
+            (status code, response bytes)
+        count: Number of requests
+        concurrency: Number of concurrent threads
+        server_pid: Server process to sample memory of, or None
+
+    Returns:
+        Dict of request, error and status counts, latency percentiles in
+        milliseconds, throughput in requests per second, response bytes
+        and peak server memory in MiB
+    """
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            status, size = request(i)
+        except requests.RequestException:
+            status, size = 'error', 0
+        return time.perf_counter() - start, status, size
+
+    print(f'{name}: {count} requests, {concurrency} concurrent...', flush=True)
+    monitor = MemoryMonitor(server_pid) if server_pid else None
+    started = time.perf_counter()
+    with monitor or contextlib.nullcontext():
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(timed, range(count)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(duration * 1000 for duration, _, _ in outcomes)
+    statuses = {}
+    for _, status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 400)
+
+    result = {
+        'requests': count,
+        'concurrency': concurrency,
+        'errors': errors,
+        'status_codes': statuses,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'max_ms': latencies[-1] if latencies else None,
+        'throughput_rps': count / wall if wall else None,
+        'response_bytes': sum(size for _, _, size in outcomes),
+        'peak_rss_mb': monitor.peak / 2 ** 20 if monitor else None,
+    }
+    print(
+        f'  p50 {result["p50_ms"]:.1f} ms, p95 {result["p95_ms"]:.1f} ms, p99 {result["p99_ms"]:.1f} ms, '
+        f'{result["throughput_rps"]:.1f} req/s, {errors} errors'
+        + (f', peak RSS {result["peak_rss_mb"]:.0f} MiB' if monitor else ''),
+        flush=True
+    )
+    return result
+
+
+def upload_request(client, path, wait_async, poll_interval=0.2):
+    """Request callable uploading a file, optionally as a background job run to completion"""
+    def request(i):
+        with open(path, 'rb') as file:
+            params = {'async': 1} if wait_async else None
+            response = client.post('/upload/', params=params, files={'file': (os.path.basename(path), file)})
+        if not wait_async or response.status_code != 202:
+            return response.status_code, len(response.content)
+
+        job_url = response.headers['Location']
+        while True:
+            job = client.session().get(job_url).json()
+            if job['status'] in ('succeeded', 'failed'):
+                return (201 if job['status'] == 'succeeded' else 'job_failed'), len(response.content)
+            time.sleep(poll_interval)
+    return request
+
+
+def read_request(client, endpoint, dataset_ids):
+    """Request callable for a read endpoint, cycling through the datasets"""
+    paths = {
+        'history': lambda dataset_id: '/history/',
+        'detail': lambda dataset_id: f'/datasets/{dataset_id}/',
+        'summary': lambda dataset_id: f'/summary/{dataset_id}/',
+        'chart-data': lambda dataset_id: f'/datasets/{dataset_id}/chart-data/',
+        'pdf': lambda dataset_id: f'/datasets/{dataset_id}/download_pdf/',
+    }
+
+    def request(i):
+        path = paths[endpoint](dataset_ids[i % len(dataset_ids)])
+        with client.get(path, stream=True) as response:
+            size = sum(len(chunk) for chunk in response.iter_content(64 * 1024))
+        return response.status_code, size
+    return request
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(previous, current):
+    """Print latency and throughput changes per endpoint between two runs"""
+    print(f'\nCompared with {previous["meta"].get("commit")} ({previous["meta"].get("timestamp")}):')
+    print(f'{"endpoint":<16}' + ''.join(f'{label:>28}' for label in ('p50 ms', 'p95 ms', 'req/s')))
+    for endpoint, result in current['results'].items():
+        before = previous['results'].get(endpoint)
+        if before is None:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'throughput_rps'):
+            old, new = before.get(key), result.get(key)
+            if old and new:
+                cells.append(f'{old:.1f} -> {new:.1f} ({(new - old) / old:+.0%})')
+            else:
+                cells.append('-')
+        print(f'{endpoint:<16}' + ''.join(f'{cell:>28}' for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the equipment API')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000/api')
+    parser.add_argument('--username', default='benchmark')
+    parser.add_argument('--password', default='benchmark-password')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='Comma separated CSV sizes in rows to upload')
+    parser.add_argument('--uploads', type=int, default=3, help='Uploads per CSV size')
+    parser.add_argument('--async-upload', action='store_true',
+                        help='Upload with ?async=1 and time until the job has finished')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per read endpoint')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--endpoints', default=','.join(['upload'] + READ_ENDPOINTS),
+                        help='Comma separated endpoints to run')
+    parser.add_argument('--server-pid', type=int, help='Server process to sample memory of')
+    parser.add_argument('--data-dir', help='Directory to keep generated CSVs in (default: temporary)')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare with')
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    unknown = set(endpoints) - set(['upload'] + READ_ENDPOINTS)
+    if unknown:
+        parser.error(f'unknown endpoints: {", ".join(sorted(unknown))}')
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    client = Client(args.base_url, args.username, args.password)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        os.makedirs(data_dir, exist_ok=True)
+
+        if 'upload' in endpoints:
+            for size in sizes:
+                path = os.path.join(data_dir, f'equipment_{size}.csv')
+                if not os.path.exists(path):
+                    print(f'Generating {size} rows...', flush=True)
+                    write_csv(path, size)
+                results[f'upload-{size}'] = run_phase(
+                    f'upload-{size}', upload_request(client, path, args.async_upload),
+                    args.uploads, min(args.concurrency, args.uploads), args.server_pid
+                )
+
+    history = client.get('/history/')
+    history.raise_for_status()
+    dataset_ids = [dataset['id'] for dataset in history.json()]
+    read_endpoints = [endpoint for endpoint in endpoints if endpoint in READ_ENDPOINTS]
+    if read_endpoints and not dataset_ids:
+        sys.exit('No datasets to read; run with the upload endpoint first')
+
+    for endpoint in read_endpoints:
+        results[endpoint] = run_phase(
+            endpoint, read_request(client, endpoint, dataset_ids),
+            args.requests, args.concurrency, args.server_pid
+        )
+
+    timestamp = datetime.now(timezone.utc)
+    commit = git_commit()
+    report = {
+        'meta': {
+            'timestamp': timestamp.isoformat(),
+            'commit': commit,
+            'base_url': args.base_url,
+            'sizes': sizes,
+            'concurrency': args.concurrency,
+            'async_upload': args.async_upload,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{timestamp:%Y%m%d-%H%M%S}-{commit or "unknown"}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare_results(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
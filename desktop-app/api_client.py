@@ -2,17 +2,82 @@
 API Client for communicating with Django backend
 """
 
+import sqlite3
+import threading
 import requests
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from chunked_upload import ChunkedUploader
+from response_cache import ResponseCache
 
 
 class APIClient:
     """Client for making requests to the Django backend API"""
     
-    def __init__(self, base_url: str = "http://localhost:8000/api"):
+    def __init__(self, base_url: str = "http://localhost:8000/api", cache: Optional[ResponseCache] = None):
         self.base_url = base_url
-        self.session = requests.Session()
+        # Shared by the sessions of all threads, so they share the login
+        self.cookies = requests.cookies.RequestsCookieJar()
+        self._local = threading.local()
         self.user = None
+        self.cache = cache if cache is not None else self._open_default_cache()
+    
+    @property
+    def session(self) -> requests.Session:
+        """
+        HTTP session of the calling thread
+        
+        requests.Session is not thread-safe and the client is used from the
+        request executor's workers and upload threads at once, so each
+        thread gets its own session on the shared cookie jar.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.cookies = self.cookies
+            self._local.session = session
+        return session
+    
+    @staticmethod
+    def _open_default_cache() -> Optional[ResponseCache]:
+        try:
+            return ResponseCache()
+        except (OSError, sqlite3.Error):
+            # Work uncached rather than not at all
+            return None
+    
+    def _get_json(self, url: str, params: Optional[Dict] = None):
+        """
+        GET a JSON resource through the persistent response cache
+        
+        Cached bodies are revalidated with their ETag, so an unchanged
+        resource costs a 304 without a body; when the server cannot be
+        reached the cached body is returned as is. Datasets never change,
+        so their responses stay valid until evicted.
+        """
+        prepared = requests.Request('GET', url, params=params).prepare()
+        # History responses differ per user, so entries are per user too
+        key = f"{(self.user or {}).get('id')}:{prepared.url}"
+        cached = self.cache.get(key) if self.cache else None
+        headers = {'If-None-Match': cached[0]} if cached else None
+        
+        try:
+            response = self.session.get(prepared.url, headers=headers)
+        except requests.ConnectionError:
+            if cached:
+                return cached[1]
+            raise
+        
+        if response.status_code == 304 and cached:
+            self.cache.touch(key)
+            return cached[1]
+        if response.status_code == 404 and cached:
+            self.cache.delete(key)
+        response.raise_for_status()
+        
+        etag = response.headers.get('ETag')
+        if etag and self.cache:
+            self.cache.put(key, etag, response.content)
+        return response.json()
     
     def login(self, username: str, password: str) -> Dict:
         """Login user and store session"""
@@ -53,35 +118,167 @@ class APIClient:
         except:
             return None
     
-    def upload_csv(self, file_path: str) -> Dict:
-        """Upload CSV file and get processed data"""
+    def upload_csv(self, file_path: str, progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Upload CSV file in resumable chunks and get processed data
+        
+        An upload of the same file that was interrupted earlier continues
+        with the chunks the server is missing. progress is called with
+        (bytes uploaded, file size) from worker threads.
+        """
+        uploader = ChunkedUploader(self)
+        session = uploader.upload(file_path, progress)
+        dataset = self.finalize_upload_session(session['id'], sha256=session['sha256'])
+        uploader.forget(file_path)
+        return dataset
+    
+    def create_upload_session(self, filename: str, size: int, chunk_size: Optional[int] = None) -> Dict:
+        """Start a resumable upload and get the upload session"""
+        url = f"{self.base_url}/uploads/"
+        payload = {'filename': filename, 'size': size}
+        if chunk_size:
+            payload['chunk_size'] = chunk_size
+        response = self.session.post(url, json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    def get_upload_session(self, session_id: int) -> Dict:
+        """Get received chunks, status and ingestion progress of an upload session"""
+        url = f"{self.base_url}/uploads/{session_id}/"
+        response = self.session.get(url)
+        response.raise_for_status()
+        return response.json()
+    
+    def finalize_upload_session(self, session_id: int, run_async: bool = False, sha256: str = "") -> Dict:
+        """
+        Complete an upload session
+        
+        sha256 is the digest of the whole file, which the server checks the
+        reassembled upload against. Returns the created dataset, or with
+        run_async the session, whose ingestion progress can then be polled
+        with get_upload_session().
+        """
+        url = f"{self.base_url}/uploads/{session_id}/finalize/"
+        params = {'async': 1} if run_async else None
+        payload = {'sha256': sha256} if sha256 else {}
+        response = self.session.post(url, params=params, json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    def abort_upload_session(self, session_id: int) -> None:
+        """Cancel an upload session and discard its chunks"""
+        url = f"{self.base_url}/uploads/{session_id}/"
+        response = self.session.delete(url)
+        response.raise_for_status()
+    
+    def start_upload(self, file_path: str) -> Dict:
+        """Queue CSV file for background processing and get the upload job"""
         url = f"{self.base_url}/upload/"
         
         with open(file_path, 'rb') as file:
             files = {'file': file}
-            response = self.session.post(url, files=files)
+            response = self.session.post(url, params={'async': 1}, files=files)
             response.raise_for_status()
             return response.json()
     
+    def get_upload_job(self, job_id: int) -> Dict:
+        """Get status and progress of an upload job"""
+        url = f"{self.base_url}/jobs/{job_id}/"
+        response = self.session.get(url)
+        response.raise_for_status()
+        return response.json()
+    
     def get_dataset(self, dataset_id: int) -> Dict:
         """Get dataset by ID"""
-        url = f"{self.base_url}/datasets/{dataset_id}/"
-        response = self.session.get(url)
+        return self._get_json(f"{self.base_url}/datasets/{dataset_id}/")
+    
+    def get_records(self, dataset_id: int, **params) -> List[Dict]:
+        """Get all records of a dataset, following the paginated records endpoint"""
+        url = f"{self.base_url}/datasets/{dataset_id}/records/"
+        params.setdefault('limit', 5000)
+        records = []
+        
+        while url:
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+            page = response.json()
+            records.extend(page['results'])
+            # The next link already carries the cursor and all query parameters
+            url = page['next']
+            params = None
+        
+        return records
+    
+    def get_record_page(self, dataset_id: int, url: Optional[str] = None, **params) -> Dict:
+        """
+        Get one page of records of a dataset
+        
+        Pass the "next" URL of a page to get the following one; otherwise
+        params (ordering, limit, filters) select the first page.
+        """
+        if url is None:
+            url = f"{self.base_url}/datasets/{dataset_id}/records/"
+            params.setdefault('fields', 'equipment_name,equipment_type,flowrate,pressure,temperature')
+        else:
+            params = None
+        response = self.session.get(url, params=params)
         response.raise_for_status()
         return response.json()
     
+    def get_record_columns(self, dataset_id: int, **params) -> Dict[str, List]:
+        """Get records of a dataset as one list per field (columnar fast path)"""
+        url = f"{self.base_url}/datasets/{dataset_id}/records/"
+        params = {'shape': 'columnar', **params}
+        columns = {}
+        
+        while url:
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+            page = response.json()
+            for name, values in page['columns'].items():
+                columns.setdefault(name, []).extend(values)
+            url = page['next']
+            params = None
+        
+        return columns
+    
+    def get_aggregates(self, dataset_id: int) -> List[Dict]:
+        """Get per equipment type statistics of a dataset"""
+        return self._get_json(f"{self.base_url}/datasets/{dataset_id}/aggregates/")
+    
+    def get_chart_data(self, dataset_id: int, points: int = 2000) -> Dict:
+        """Get histograms, per-type means and downsampled series of a dataset"""
+        return self._get_json(f"{self.base_url}/datasets/{dataset_id}/chart-data/", {'points': points})
+    
+    def compare_datasets(self, baseline_id: int, dataset_id: int, limit: int = 100) -> Dict:
+        """Get added, removed and changed units between two datasets"""
+        url = f"{self.base_url}/datasets/compare/"
+        return self._get_json(url, {'a': baseline_id, 'b': dataset_id, 'limit': limit})
+    
+    def get_trends(self, equipment: Optional[List[str]] = None) -> Dict:
+        """Get parameter series across the user's datasets, optionally for some units"""
+        params = {'equipment': ','.join(equipment)} if equipment else None
+        return self._get_json(f"{self.base_url}/trends/", params)
+    
     def get_history(self) -> List[Dict]:
         """Get upload history"""
-        url = f"{self.base_url}/history/"
-        response = self.session.get(url)
-        response.raise_for_status()
-        return response.json()
+        return self._get_json(f"{self.base_url}/history/")
     
-    def download_pdf(self, dataset_id: int, save_path: str) -> None:
-        """Download PDF report for a dataset"""
+    def download_pdf(self, dataset_id: int, save_path: str, all_records: bool = False) -> None:
+        """Download PDF report for a dataset, optionally listing every record"""
         url = f"{self.base_url}/datasets/{dataset_id}/download_pdf/"
-        response = self.session.get(url)
-        response.raise_for_status()
-        
-        with open(save_path, 'wb') as file:
-            file.write(response.content)
+        params = {'records': 'all'} if all_records else None
+        with self.session.get(url, params=params, stream=True) as response:
+            response.raise_for_status()
+            with open(save_path, 'wb') as file:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    file.write(chunk)
+    
+    def download_csv(self, dataset_id: int, save_path: str) -> None:
+        """Download the original uploaded CSV for a dataset"""
+        url = f"{self.base_url}/datasets/{dataset_id}/download_csv/"
+        with self.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(save_path, 'wb') as file:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    file.write(chunk)
@@ -0,0 +1,242 @@
+"""
+Resumable, parallel upload of CSV files to the backend's upload sessions
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, Optional
+import requests
+from response_cache import default_cache_dir
+
+
+PARALLEL_CHUNKS = 4
+CHUNK_ATTEMPTS = 5
+# Seconds before the first retry of a chunk, doubled for each further one
+RETRY_DELAY = 1.0
+# Connect and read timeouts of a chunk PUT
+CHUNK_TIMEOUT = (10, 120)
+# Bytes read at a time to hash the whole file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadResumeStore:
+    """
+    Upload sessions of files whose upload has not finished yet
+
+    Kept as a small JSON file next to the response cache, so an upload
+    interrupted by a lost connection or a closed application continues
+    with the chunks the server is missing. A file is only resumed while its
+    size and modification time are unchanged.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(default_cache_dir(), 'uploads.json')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(base_url: str, user_id, file_path: str) -> str:
+        stat = os.stat(file_path)
+        return f"{base_url}|{user_id}|{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries: Dict) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Optional[int]:
+        """Session id recorded for a file, or None"""
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, session_id: int) -> None:
+        with self._lock:
+            entries = self._load()
+            entries[key] = session_id
+            self._save(entries)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                self._save(entries)
+
+
+class UploadCancelled(Exception):
+    """Raised once an upload was cancelled with ChunkedUploader.cancel()"""
+
+
+class ChunkedUploader:
+    """
+    Sends a file to an upload session as checksummed chunks in parallel
+
+    Chunks go out in ascending order over PARALLEL_CHUNKS connections, so
+    the server can start ingesting the received prefix early. A chunk that
+    fails on a connection error, timeout or server error is retried with
+    exponential backoff; if it still fails, the session stays recorded and
+    the next upload of the same file resumes it. The whole file is hashed
+    while the chunks are sent, so the server can verify the reassembled
+    upload when the session is finalized.
+    """
+
+    def __init__(self, api_client, resume_store: Optional[UploadResumeStore] = None,
+                 parallel: int = PARALLEL_CHUNKS):
+        self.api_client = api_client
+        self.resume_store = resume_store or UploadResumeStore()
+        self.parallel = parallel
+        self._cancelled = threading.Event()
+
+    def upload(self, file_path: str, progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Upload every chunk of a file the server does not have yet
+
+        Args:
+            file_path: CSV file to upload
+            progress: Called with (bytes uploaded, file size) after every
+                chunk, from worker threads
+
+        Returns:
+            The upload session, ready to be finalized, with the "sha256" of
+            the whole file
+
+        Raises:
+            UploadCancelled: cancel() was called; the session is aborted
+        """
+        size = os.path.getsize(file_path)
+        key = self._key(file_path)
+        session = self._resume(key)
+        if session is None:
+            session = self.api_client.create_upload_session(os.path.basename(file_path), size)
+            self.resume_store.put(key, session['id'])
+
+        try:
+            self._send_chunks(session, file_path, progress)
+        except UploadCancelled:
+            self.abort(file_path, session['id'])
+            raise
+        return session
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop the upload in progress; chunks already being sent finish first"""
+        self._cancelled.set()
+
+    def abort(self, file_path: str, session_id: int) -> None:
+        """Discard the session of a file on the server and its resume record"""
+        self.forget(file_path)
+        try:
+            self.api_client.abort_upload_session(session_id)
+        except requests.RequestException:
+            # Already finished, or left to expire on the server
+            pass
+
+    def _check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise UploadCancelled()
+
+    def _send_chunks(self, session: Dict, file_path: str,
+                     progress: Optional[Callable[[int, int], None]]) -> None:
+        size = session['size']
+        received = set(session['received_chunks'])
+        uploaded = sum(self._chunk_length(session, index) for index in received)
+        lock = threading.Lock()
+        if progress is not None:
+            progress(uploaded, size)
+
+        def send(index):
+            nonlocal uploaded
+            self._check_cancelled()
+            self._send_chunk(session, file_path, index)
+            with lock:
+                uploaded += self._chunk_length(session, index)
+                done = uploaded
+            if progress is not None:
+                progress(done, size)
+
+        missing = [index for index in range(session['chunk_count']) if index not in received]
+        pool = ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix='upload-chunk')
+        try:
+            sent = pool.map(send, missing)
+            # The file is hashed here while the workers send its chunks
+            session['sha256'] = self._file_sha256(file_path)
+            # list() re-raises the first chunk that failed for good
+            list(sent)
+        finally:
+            pool.shutdown(cancel_futures=True)
+        self._check_cancelled()
+
+    def _file_sha256(self, file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+                self._check_cancelled()
+                digest.update(block)
+        return digest.hexdigest()
+
+    def forget(self, file_path: str) -> None:
+        """Drop the resume record of a file once its session is finalized"""
+        self.resume_store.delete(self._key(file_path))
+
+    def _key(self, file_path: str) -> str:
+        return UploadResumeStore.key(self.api_client.base_url, (self.api_client.user or {}).get('id'), file_path)
+
+    def _resume(self, key: str) -> Optional[Dict]:
+        session_id = self.resume_store.get(key)
+        if session_id is None:
+            return None
+        try:
+            session = self.api_client.get_upload_session(session_id)
+        except requests.HTTPError:
+            session = None
+        if session is None or session['status'] != 'uploading':
+            self.resume_store.delete(key)
+            return None
+        return session
+
+    @staticmethod
+    def _chunk_length(session: Dict, index: int) -> int:
+        start = index * session['chunk_size']
+        return min(session['chunk_size'], session['size'] - start)
+
+    def _send_chunk(self, session: Dict, file_path: str, index: int) -> None:
+        start = index * session['chunk_size']
+        with open(file_path, 'rb') as file:
+            file.seek(start)
+            data = file.read(self._chunk_length(session, index))
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Range': f"bytes {start}-{start + len(data) - 1}/{session['size']}",
+            'X-Chunk-SHA256': hashlib.sha256(data).hexdigest(),
+        }
+
+        delay = RETRY_DELAY
+        for attempt in range(CHUNK_ATTEMPTS):
+            try:
+                # The client's session is per thread, so each worker has its own
+                response = self.api_client.session.put(session['url'], data=data, headers=headers, timeout=CHUNK_TIMEOUT)
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == CHUNK_ATTEMPTS - 1:
+                    raise
+            else:
+                if attempt == CHUNK_ATTEMPTS - 1:
+                    response.raise_for_status()
+            if self._cancelled.wait(delay):
+                raise UploadCancelled()
+            delay *= 2
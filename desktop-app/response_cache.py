@@ -0,0 +1,117 @@
+"""
+Persistent cache of API responses for the desktop client
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Optional, Tuple
+
+
+APP_DIR_NAME = "ChemicalEquipmentVisualizer"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory of the application"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, APP_DIR_NAME)
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of JSON response bodies in SQLite
+
+    Entries are stored zlib-compressed with the ETag the server sent, so
+    they can be revalidated with If-None-Match. Once the stored bodies
+    exceed max_bytes, the least recently used entries are evicted. Safe to
+    use from several threads.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        if path is None:
+            path = os.path.join(default_cache_dir(), 'responses.sqlite3')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                etag TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, object]]:
+        """(ETag, decoded body) of an entry, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT etag, body FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as just used"""
+        with self._lock:
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    def put(self, key: str, etag: str, content: bytes) -> None:
+        """Store a raw JSON body and evict least recently used entries beyond max_bytes"""
+        body = zlib.compress(content)
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, body, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, etag, body, len(body), time.time())
+            )
+            self._evict()
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        """Remove an entry"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def total_size(self) -> int:
+        """Compressed size in bytes of all stored bodies"""
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Walk entries from least recently used until enough space is freed
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
@@ -8,6 +8,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
+from .workers import error_message
 
 
 class AuthWidget(QWidget):
@@ -15,9 +16,10 @@ class AuthWidget(QWidget):
     
     login_success = pyqtSignal(dict)
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, executor):
         super().__init__()
         self.api_client = api_client
+        self.executor = executor
         self.is_login_mode = True
         self.init_ui()
     
@@ -164,28 +166,40 @@ class AuthWidget(QWidget):
             QMessageBox.warning(self, "Error", "Please fill in all required fields")
             return
         
-        try:
-            if self.is_login_mode:
-                user = self.api_client.login(username, password)
-                self.login_success.emit(user)
-            else:
-                email = self.email_input.text().strip()
-                self.api_client.register(username, password, email)
-                QMessageBox.information(
-                    self,
-                    "Success",
-                    "Registration successful! Please login."
-                )
-                self.toggle_mode()
-                self.password_input.clear()
-        
-        except Exception as e:
-            error_msg = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_msg = error_data.get('error', str(e))
-                except:
-                    pass
-            
-            QMessageBox.critical(self, "Error", f"Authentication failed: {error_msg}")
+        self.submit_btn.setEnabled(False)
+        if self.is_login_mode:
+            self.executor.submit(
+                self.api_client.login, username, password,
+                on_success=self.on_login_finished,
+                on_error=self.on_auth_error,
+                key='auth'
+            )
+        else:
+            email = self.email_input.text().strip()
+            self.executor.submit(
+                self.api_client.register, username, password, email,
+                on_success=self.on_register_finished,
+                on_error=self.on_auth_error,
+                key='auth'
+            )
+    
+    def on_login_finished(self, user):
+        """Handle a successful login"""
+        self.submit_btn.setEnabled(True)
+        self.login_success.emit(user)
+    
+    def on_register_finished(self, user):
+        """Handle a successful registration"""
+        self.submit_btn.setEnabled(True)
+        QMessageBox.information(
+            self,
+            "Success",
+            "Registration successful! Please login."
+        )
+        self.toggle_mode()
+        self.password_input.clear()
+    
+    def on_auth_error(self, error):
+        """Report a failed login or registration"""
+        self.submit_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Authentication failed: {error_message(error)}")
@@ -0,0 +1,269 @@
+"""
+Persistent matplotlib chart widgets for the analysis view
+"""
+
+import math
+from PyQt5.QtWidgets import QFrame, QVBoxLayout, QLabel, QStackedLayout, QSizePolicy
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge
+
+
+BACKGROUND = '#0a0e27'
+AXIS_COLOR = '#b0b8d4'
+PALETTE = ['#1a237e', '#0288d1', '#00bfa5', '#534bae', '#5eb8ff', '#5df2d6']
+
+# Charts of datasets with more equipment types than this are rendered on a
+# worker thread; drawing takes about 2 ms per type and artist group, so
+# 20 types already cost around 50 ms on the GUI thread
+OFF_THREAD_TYPES = 20
+
+
+def style_axes(ax):
+    """Apply the dark theme to an axes"""
+    ax.set_facecolor(BACKGROUND)
+    ax.tick_params(colors=AXIS_COLOR)
+    for spine in ax.spines.values():
+        spine.set_color(AXIS_COLOR)
+
+
+class DistributionPlot:
+    """Equipment type distribution as a pie of reusable wedges"""
+
+    def __init__(self, figure):
+        self.ax = figure.add_subplot(111)
+        style_axes(self.ax)
+        self.ax.set_xlim(-1.4, 1.4)
+        self.ax.set_ylim(-1.4, 1.4)
+        self.ax.set_aspect('equal')
+        self.ax.axis('off')
+        self.wedges = []
+        self.labels = []
+        self.percentages = []
+
+    def _resize(self, count):
+        # Artists are only created or removed when the number of types changes
+        while len(self.wedges) > count:
+            self.wedges.pop().remove()
+            self.labels.pop().remove()
+            self.percentages.pop().remove()
+        while len(self.wedges) < count:
+            wedge = Wedge((0, 0), 1.0, 0, 0, edgecolor=BACKGROUND)
+            self.ax.add_patch(wedge)
+            self.wedges.append(wedge)
+            self.labels.append(self.ax.text(0, 0, '', color='white', va='center'))
+            self.percentages.append(self.ax.text(0, 0, '', color='white', ha='center', va='center'))
+
+    def update(self, chart_data):
+        types = chart_data.get('types', [])
+        counts = chart_data.get('type_counts', [])
+        total = sum(counts) or 1
+        self._resize(len(types))
+
+        # Counter-clockwise from the top, like pie(startangle=90)
+        start = 90.0
+        for i, (eq_type, count) in enumerate(zip(types, counts)):
+            sweep = 360.0 * count / total
+            wedge = self.wedges[i]
+            wedge.set_theta1(start)
+            wedge.set_theta2(start + sweep)
+            wedge.set_facecolor(PALETTE[i % len(PALETTE)])
+
+            middle = math.radians(start + sweep / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            self.labels[i].set_position((1.1 * x, 1.1 * y))
+            self.labels[i].set_text(eq_type)
+            self.labels[i].set_horizontalalignment('left' if x >= 0 else 'right')
+            self.percentages[i].set_position((0.6 * x, 0.6 * y))
+            self.percentages[i].set_text(f'{100.0 * count / total:.1f}%')
+            start += sweep
+
+
+class TypeMeansPlot:
+    """Average flowrate and pressure per type as grouped bars"""
+
+    PARAMETERS = [('flowrate', 'Flowrate (m³/h)', '#00bfa5'), ('pressure', 'Pressure (bar)', '#0288d1')]
+    WIDTH = 0.35
+
+    def __init__(self, figure):
+        self.ax = figure.add_subplot(111)
+        style_axes(self.ax)
+        self.ax.set_xlabel('Equipment Type', color=AXIS_COLOR)
+        self.ax.set_ylabel('Average Value', color=AXIS_COLOR)
+        # Fixed margins leave room for rotated type names without a
+        # tight_layout pass on every update
+        figure.subplots_adjust(left=0.14, right=0.97, top=0.95, bottom=0.3)
+        self.containers = []
+        self.legend = None
+
+    def _resize(self, count):
+        # Bars are only recreated when the number of types changes
+        if self.containers and len(self.containers[0]) == count:
+            return
+        for container in self.containers:
+            container.remove()
+        offsets = [-self.WIDTH / 2, self.WIDTH / 2]
+        self.containers = [
+            self.ax.bar([i + offset for i in range(count)], [0] * count, self.WIDTH, label=label, color=color)
+            for (_, label, color), offset in zip(self.PARAMETERS, offsets)
+        ]
+        if self.legend is None:
+            self.legend = self.ax.legend(facecolor='#1a1f3a', edgecolor='#00bfa5', labelcolor='white')
+
+    def update(self, chart_data):
+        types = chart_data.get('types', [])
+        means = chart_data.get('type_means', {})
+        self._resize(len(types))
+
+        highest = 0.0
+        for (parameter, _, _), container in zip(self.PARAMETERS, self.containers):
+            for bar, value in zip(container, means.get(parameter, [])):
+                bar.set_height(value or 0.0)
+                highest = max(highest, value or 0.0)
+
+        self.ax.set_xticks(range(len(types)))
+        self.ax.set_xticklabels(types, rotation=45, ha='right', color=AXIS_COLOR)
+        self.ax.set_xlim(-0.6, max(len(types), 1) - 0.4)
+        self.ax.set_ylim(0, highest * 1.1 or 1.0)
+
+
+def render_chart_image(plot_class, chart_data, width, height, dpi):
+    """
+    Render chart data to an RGBA buffer with a standalone Agg figure
+
+    Touches no shared matplotlib or Qt state, so it can run on a worker
+    thread.
+
+    Returns:
+        Tuple of (RGBA bytes, width, height) in pixels
+    """
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor=BACKGROUND)
+    canvas = FigureCanvasAgg(figure)
+    plot_class(figure).update(chart_data)
+    canvas.draw()
+    buffer = canvas.buffer_rgba()
+    return bytes(buffer), buffer.shape[1], buffer.shape[0]
+
+
+class ChartCard(QFrame):
+    """
+    Chart card with one figure and canvas for its whole lifetime
+
+    The plot's artists are created once and their data updated in place
+    for each dataset. Data set while the card is hidden (e.g. on another
+    tab) is only drawn once the card is shown. Datasets with more than
+    OFF_THREAD_TYPES types are rendered to an image on the request
+    executor instead, so drawing them never stalls the GUI.
+    """
+
+    plot_class = None
+
+    def __init__(self, title, executor, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet("""
+            QFrame {
+                background: rgba(26, 31, 58, 0.4);
+                border: 1px solid rgba(255, 255, 255, 0.1);
+                border-radius: 12px;
+                padding: 20px;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+        title_label = QLabel(title)
+        title_label.setStyleSheet("color: white; font-size: 14pt; font-weight: 600;")
+        layout.addWidget(title_label)
+
+        self.figure = Figure(figsize=(6, 5), facecolor=BACKGROUND)
+        self.plot = self.plot_class(self.figure)
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setStyleSheet("background: transparent;")
+        self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+        self.image_label = QLabel()
+        self.image_label.setAlignment(Qt.AlignCenter)
+        # QLabel is a QFrame; keep the card's frame style off the image
+        self.image_label.setStyleSheet("background: transparent; border: none; padding: 0;")
+        self.image_label.setMinimumSize(1, 1)
+
+        self.canvas_layout = QStackedLayout()
+        self.canvas_layout.addWidget(self.canvas)
+        self.canvas_layout.addWidget(self.image_label)
+        layout.addLayout(self.canvas_layout)
+
+        self.executor = executor
+        self._render_key = f'chart-{id(self)}'
+        self.chart_data = None
+        self._dirty = False
+
+    def set_chart_data(self, chart_data):
+        """Show the chart data of a dataset, drawing now only if visible"""
+        self.chart_data = chart_data
+        self._dirty = True
+        if self.isVisible():
+            self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._dirty:
+            self.refresh()
+
+    def refresh(self):
+        """Update the artists and schedule a redraw, or render off-thread"""
+        self._dirty = False
+        if self.chart_data is None:
+            return
+        if len(self.chart_data.get('types', [])) > OFF_THREAD_TYPES:
+            self.render_off_thread()
+            return
+        self.executor.cancel(self._render_key)
+        self.canvas_layout.setCurrentWidget(self.canvas)
+        self.plot.update(self.chart_data)
+        self.canvas.draw_idle()
+
+    def render_off_thread(self):
+        """Render the chart to an image on the executor and show it when done"""
+        ratio = self.devicePixelRatioF()
+        size = self.canvas.size()
+        width, height = max(int(size.width() * ratio), 1), max(int(size.height() * ratio), 1)
+        self.executor.submit(
+            render_chart_image, self.plot_class, self.chart_data, width, height, self.figure.dpi * ratio,
+            on_success=lambda result: self.show_image(result, ratio),
+            key=self._render_key
+        )
+
+    def show_image(self, result, ratio):
+        """Display a rendered chart image in place of the canvas"""
+        data, width, height = result
+        image = QImage(data, width, height, QImage.Format_RGBA8888).copy()
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(ratio)
+        self.image_label.setPixmap(pixmap)
+        self.canvas_layout.setCurrentWidget(self.image_label)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Images are rendered for one size; render again for the new one
+        if self.canvas_layout.currentWidget() is self.image_label and self.isVisible():
+            self.refresh()
+
+
+class DistributionChart(ChartCard):
+    """Equipment type distribution chart card"""
+
+    plot_class = DistributionPlot
+
+    def __init__(self, executor, parent=None):
+        super().__init__("Equipment Type Distribution", executor, parent)
+
+
+class TypeMeansChart(ChartCard):
+    """Average parameters per type chart card"""
+
+    plot_class = TypeMeansPlot
+
+    def __init__(self, executor, parent=None):
+        super().__init__("Average Parameters by Type", executor, parent)
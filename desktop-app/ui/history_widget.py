@@ -7,6 +7,7 @@ from PyQt5.QtWidgets import (
     QScrollArea, QHBoxLayout, QMessageBox
 )
 from PyQt5.QtCore import Qt, pyqtSignal
+from .workers import error_message
 
 
 class HistoryWidget(QWidget):
@@ -14,9 +15,10 @@ class HistoryWidget(QWidget):
     
     dataset_selected = pyqtSignal(dict)
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, executor):
         super().__init__()
         self.api_client = api_client
+        self.executor = executor
         self.datasets = []
         self.init_ui()
     
@@ -72,16 +74,26 @@ class HistoryWidget(QWidget):
         self.refresh()
     
     def refresh(self):
-        """Refresh history"""
-        try:
-            self.datasets = self.api_client.get_history()
-            self.display_history()
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Error",
-                f"Failed to load history: {str(e)}"
-            )
+        """Refresh history in the background"""
+        self.executor.submit(
+            self.api_client.get_history,
+            on_success=self.on_history_loaded,
+            on_error=self.on_history_error,
+            key='history'
+        )
+    
+    def on_history_loaded(self, datasets):
+        """Show freshly loaded history"""
+        self.datasets = datasets
+        self.display_history()
+    
+    def on_history_error(self, error):
+        """Report a failed history refresh"""
+        QMessageBox.critical(
+            self,
+            "Error",
+            f"Failed to load history: {error_message(error)}"
+        )
     
     def display_history(self):
         """Display history items"""
@@ -4,7 +4,7 @@ Main Window for the desktop application
 
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QStackedWidget, QMessageBox, QStatusBar
+    QPushButton, QStackedWidget, QMessageBox, QStatusBar, QProgressBar
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
@@ -14,6 +14,7 @@ from ui.auth_widget import AuthWidget
 from ui.upload_widget import UploadWidget
 from ui.visualization_widget import VisualizationWidget
 from ui.history_widget import HistoryWidget
+from ui.workers import RequestExecutor, error_message
 
 
 class MainWindow(QMainWindow):
@@ -22,6 +23,8 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.api_client = APIClient()
+        # Every API call runs on this pool, never on the GUI thread
+        self.executor = RequestExecutor(self)
         self.current_dataset = None
         
         self.init_ui()
@@ -50,7 +53,7 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.stacked_widget)
         
         # Auth widget
-        self.auth_widget = AuthWidget(self.api_client)
+        self.auth_widget = AuthWidget(self.api_client, self.executor)
         self.auth_widget.login_success.connect(self.on_login_success)
         self.stacked_widget.addWidget(self.auth_widget)
         
@@ -62,6 +65,17 @@ class MainWindow(QMainWindow):
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         self.statusBar.showMessage("Ready")
+        
+        # Busy indicator while any request is in flight
+        self.busy_indicator = QProgressBar()
+        self.busy_indicator.setRange(0, 0)
+        self.busy_indicator.setMaximumWidth(160)
+        self.busy_indicator.setMaximumHeight(14)
+        self.busy_indicator.setTextVisible(False)
+        self.busy_indicator.setVisible(False)
+        self.statusBar.addPermanentWidget(self.busy_indicator)
+        self.executor.busy_changed.connect(self.busy_indicator.setVisible)
+        self.busy_indicator.setVisible(self.executor.busy)
     
     def create_header(self, layout):
         """Create the application header"""
@@ -149,11 +163,11 @@ class MainWindow(QMainWindow):
         self.content_stack.addWidget(self.upload_widget)
         
         # Visualization widget
-        self.viz_widget = VisualizationWidget(self.api_client)
+        self.viz_widget = VisualizationWidget(self.api_client, self.executor)
         self.content_stack.addWidget(self.viz_widget)
         
         # History widget
-        self.history_widget = HistoryWidget(self.api_client)
+        self.history_widget = HistoryWidget(self.api_client, self.executor)
         self.history_widget.dataset_selected.connect(self.on_dataset_selected)
         self.content_stack.addWidget(self.history_widget)
         
@@ -180,11 +194,13 @@ class MainWindow(QMainWindow):
     
     def check_authentication(self):
         """Check if user is already authenticated"""
-        user = self.api_client.get_current_user()
+        self.stacked_widget.setCurrentIndex(0)
+        self.executor.submit(self.api_client.get_current_user, on_success=self.on_session_checked, key='auth')
+    
+    def on_session_checked(self, user):
+        """Skip the login form if the stored session is still valid"""
         if user:
             self.on_login_success(user)
-        else:
-            self.stacked_widget.setCurrentIndex(0)
     
     def on_login_success(self, user):
         """Handle successful login"""
@@ -192,33 +208,49 @@ class MainWindow(QMainWindow):
         self.logout_btn.setVisible(True)
         self.stacked_widget.setCurrentIndex(1)
         self.statusBar.showMessage(f"Logged in as {user['username']}")
+        self.history_widget.refresh()
     
-    def on_upload_success(self, dataset):
-        """Handle successful file upload"""
+    def load_dataset(self, dataset_id):
+        """Fetch full dataset details and chart data (runs on a worker thread)"""
+        # Records are paged in by the table
+        dataset = self.api_client.get_dataset(dataset_id)
+        dataset['chart_data'] = self.api_client.get_chart_data(dataset_id)
+        return dataset
+    
+    def show_dataset(self, dataset, message):
+        """Display a loaded dataset in the analysis tab"""
         self.current_dataset = dataset
         self.view_tab_btn.setEnabled(True)
         self.viz_widget.set_dataset(dataset)
         self.switch_tab(1)
+        self.statusBar.showMessage(message)
+    
+    def on_upload_success(self, dataset):
+        """Handle successful file upload"""
         self.history_widget.refresh()
-        self.statusBar.showMessage("Dataset uploaded successfully")
+        self.statusBar.showMessage("Loading uploaded dataset...")
+        self.executor.submit(
+            self.load_dataset, dataset['id'],
+            on_success=lambda loaded: self.show_dataset(loaded, "Dataset uploaded successfully"),
+            on_error=lambda e: self.show_error(f"Failed to load dataset charts: {error_message(e)}"),
+            key='dataset'
+        )
     
     def on_dataset_selected(self, dataset):
         """Handle dataset selection from history"""
-        try:
-            # Fetch full dataset details including records
-            full_dataset = self.api_client.get_dataset(dataset['id'])
-            
-            self.current_dataset = full_dataset
-            self.view_tab_btn.setEnabled(True)
-            self.viz_widget.set_dataset(full_dataset)
-            self.switch_tab(1)
-            self.statusBar.showMessage(f"Loaded dataset: {dataset['filename']}")
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Error",
-                f"Failed to load dataset details: {str(e)}"
-            )
+        # A newer selection supersedes one still loading
+        self.statusBar.showMessage(f"Loading dataset: {dataset['filename']}...")
+        self.executor.submit(
+            self.load_dataset, dataset['id'],
+            on_success=lambda loaded: self.show_dataset(loaded, f"Loaded dataset: {dataset['filename']}"),
+            on_error=lambda e: self.show_error(f"Failed to load dataset details: {error_message(e)}"),
+            key='dataset'
+        )
+    
+    def show_error(self, message):
+        """Show a failed request"""
+        self.statusBar.showMessage("Ready")
+        QMessageBox.critical(self, "Error", message)
     
     def logout(self):
         """Logout current user"""
@@ -231,7 +263,10 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            self.api_client.logout()
+            # Drop results of requests made for the previous user
+            for key in ('dataset', 'history'):
+                self.executor.cancel(key)
+            self.executor.submit(self.api_client.logout, key='auth')
             self.user_label.setText("")
             self.logout_btn.setVisible(False)
             self.current_dataset = None
@@ -0,0 +1,221 @@
+"""
+Lazily loaded table model for dataset records
+"""
+
+from array import array
+import sys
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, pyqtSignal
+from .workers import error_message
+
+
+# Header label, record field and display format per column
+COLUMNS = [
+    ('#', None, None),
+    ('Equipment Name', 'equipment_name', None),
+    ('Type', 'equipment_type', None),
+    ('Flowrate (m³/h)', 'flowrate', '{:.2f}'),
+    ('Pressure (bar)', 'pressure', '{:.2f}'),
+    ('Temperature (°C)', 'temperature', '{:.2f}'),
+]
+NUMERIC_FIELDS = ['flowrate', 'pressure', 'temperature']
+
+PAGE_SIZE = 1000
+
+
+class RecordsTableModel(QAbstractTableModel):
+    """
+    Records of a dataset, fetched page by page as the view scrolls
+
+    Loaded records are kept as one compact column per field (float arrays,
+    interned type names) and cells are only formatted when the view asks
+    for them, so opening a dataset costs one page regardless of its size.
+    Pages are requested through the executor and inserted when they arrive.
+    """
+
+    page_loaded = pyqtSignal()
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, api_client, executor, parent=None):
+        super().__init__(parent)
+        self.api_client = api_client
+        self.executor = executor
+        self.dataset_id = None
+        self.total_count = 0
+        self.query = {}
+        self._next_url = None
+        self._loading = False
+        # Pages requested before the last (re)load are dropped
+        self._generation = 0
+        self._request_key = f'records-{id(self)}'
+        self._clear()
+
+    def _clear(self):
+        self.names = []
+        self.types = []
+        self.values = {field: array('d') for field in NUMERIC_FIELDS}
+
+    def load(self, dataset_id, total_count=0, **query):
+        """
+        Show the records of a dataset, fetching the first page
+
+        Args:
+            dataset_id: Dataset to show
+            total_count: Number of records in the dataset, for display
+            query: Server-side ordering/filter parameters of the records
+                endpoint (ordering, name, type, ...)
+        """
+        self.beginResetModel()
+        self.dataset_id = dataset_id
+        self.total_count = total_count
+        self.query = {key: value for key, value in query.items() if value}
+        self._next_url = None
+        self._loading = False
+        self._generation += 1
+        self._clear()
+        self.endResetModel()
+        self._fetch_page()
+
+    def set_query(self, **query):
+        """Reload the records with other server-side ordering/filter parameters"""
+        self.load(self.dataset_id, self.total_count, **{**self.query, **query})
+
+    def _fetch_page(self):
+        if self.dataset_id is None or self._loading:
+            return
+        if self._next_url:
+            params = {'url': self._next_url}
+        elif not self.names:
+            params = {'limit': PAGE_SIZE, **self.query}
+        else:
+            return
+
+        self._loading = True
+        generation = self._generation
+        self.executor.submit(
+            self.api_client.get_record_page, self.dataset_id,
+            on_success=lambda page: self._page_loaded(generation, page),
+            on_error=lambda error: self._page_failed(generation, error),
+            key=self._request_key,
+            **params
+        )
+
+    def _page_failed(self, generation, error):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self.load_failed.emit(error_message(error))
+
+    def _page_loaded(self, generation, page):
+        if generation != self._generation:
+            return
+        self._loading = False
+        records = page['results']
+        self._next_url = page['next']
+        if records:
+            self._insert(records)
+        self.page_loaded.emit()
+
+    def _insert(self, records):
+        first = len(self.names)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        self.names.extend(record['equipment_name'] for record in records)
+        # A dataset has few distinct types; share one string object per type
+        self.types.extend(sys.intern(record['equipment_type']) for record in records)
+        for field in NUMERIC_FIELDS:
+            self.values[field].extend(record[field] for record in records)
+        self.endInsertRows()
+
+    @property
+    def fully_loaded(self):
+        """Whether every matching record has been fetched"""
+        return self._next_url is None and not self._loading
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._next_url is not None and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not parent.isValid():
+            self._fetch_page()
+
+    def raw_value(self, row, column):
+        """Unformatted value of a cell, used for sorting"""
+        field = COLUMNS[column][1]
+        if field is None:
+            return row + 1
+        if field == 'equipment_name':
+            return self.names[row]
+        if field == 'equipment_type':
+            return self.types[row]
+        return self.values[field][row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row, column = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            value = self.raw_value(row, column)
+            value_format = COLUMNS[column][2]
+            return value_format.format(value) if value_format else str(value)
+        if role == Qt.UserRole:
+            return self.raw_value(row, column)
+        if role == Qt.TextAlignmentRole and COLUMNS[column][1] in NUMERIC_FIELDS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable if index.isValid() else Qt.NoItemFlags
+
+
+class RecordsProxyModel(QSortFilterProxyModel):
+    """
+    Sorting and name filtering for a RecordsTableModel
+
+    Once every record is loaded, rows are sorted and filtered locally.
+    Before that, sorting or filtering only the loaded pages would be wrong,
+    so the source model is reloaded with the server-side ordering/name
+    filter instead, which the records endpoint serves from its indexes.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(Qt.UserRole)
+        self.setFilterKeyColumn(1)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        source = self.sourceModel()
+        field = COLUMNS[column][1] if column >= 0 else None
+        if source is None or source.fully_loaded or column < 0:
+            super().sort(column, order)
+            return
+
+        # The records endpoint sorts by id for the "#" column
+        ordering = field or 'id'
+        if order == Qt.DescendingOrder:
+            ordering = f'-{ordering}'
+        super().sort(-1)
+        source.set_query(ordering=ordering)
+
+    def set_name_filter(self, text):
+        """Show only records whose equipment name contains text"""
+        source = self.sourceModel()
+        if source is not None and (not source.fully_loaded or source.query.get('name')):
+            source.set_query(name=text)
+        self.setFilterFixedString(text)
+
+    def lessThan(self, left, right):
+        # Compare the raw values directly instead of going through QVariant
+        source = self.sourceModel()
+        return source.raw_value(left.row(), left.column()) < source.raw_value(right.row(), right.column())
@@ -9,24 +9,72 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, pyqtSignal, QThread
 from PyQt5.QtGui import QFont, QDragEnterEvent, QDropEvent
 import os
+import requests
+from chunked_upload import ChunkedUploader, UploadCancelled
+
+
+def format_size(size):
+    """Human readable file size"""
+    if size < 1024 * 1024:
+        return f"{size / 1024:.2f} KB"
+    if size < 1024 * 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / (1024 * 1024 * 1024):.2f} GB"
 
 
 class UploadThread(QThread):
-    """Thread for uploading file"""
+    """Thread for uploading file in chunks and waiting for it to be processed"""
+    
+    POLL_INTERVAL_MS = 500
     
     success = pyqtSignal(dict)
+    uploaded = pyqtSignal(object, object)
+    progress = pyqtSignal(int)
     error = pyqtSignal(str)
+    cancelled = pyqtSignal()
     
     def __init__(self, api_client, file_path):
         super().__init__()
         self.api_client = api_client
         self.file_path = file_path
+        self.uploader = ChunkedUploader(api_client)
+    
+    def cancel(self):
+        """Stop the upload and abort its session on the server"""
+        self.uploader.cancel()
     
     def run(self):
-        """Upload file in background"""
+        """Upload the chunks of the file in background and poll its ingestion"""
         try:
-            result = self.api_client.upload_csv(self.file_path)
+            # Resumes an earlier, interrupted upload of the same file
+            session = self.uploader.upload(self.file_path, self.uploaded.emit)
+            session = self.api_client.finalize_upload_session(
+                session['id'], run_async=True, sha256=session['sha256']
+            )
+            self.uploader.forget(self.file_path)
+            
+            aborted = False
+            while session['status'] in ('uploading', 'ingesting'):
+                if self.uploader.cancelled and not aborted:
+                    # A session that finished meanwhile is kept
+                    self.uploader.abort(self.file_path, session['id'])
+                    aborted = True
+                self.msleep(self.POLL_INTERVAL_MS)
+                session = self.api_client.get_upload_session(session['id'])
+                self.progress.emit(session['rows_processed'])
+            
+            if session['status'] == 'aborted' and self.uploader.cancelled:
+                raise UploadCancelled()
+            if session['status'] != 'succeeded':
+                self.error.emit(session['error'] or f"Upload {session['status']}")
+                return
+            
+            result = self.api_client.get_dataset(session['dataset'])
             self.success.emit(result)
+        except UploadCancelled:
+            self.cancelled.emit()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self.error.emit(f"{e}\n\nUpload the file again to continue where it stopped.")
         except Exception as e:
             error_msg = str(e)
             if hasattr(e, 'response') and e.response is not None:
@@ -120,7 +168,7 @@ class UploadWidget(QWidget):
         self.file_label.setStyleSheet("color: white; font-size: 14pt; font-weight: 600;")
         drop_layout.addWidget(self.file_label)
         
-        self.file_subtext = QLabel("CSV files only (max 10MB)")
+        self.file_subtext = QLabel("CSV files only")
         self.file_subtext.setAlignment(Qt.AlignCenter)
         self.file_subtext.setStyleSheet("color: #6b7280; font-size: 11pt;")
         drop_layout.addWidget(self.file_subtext)
@@ -143,6 +191,12 @@ class UploadWidget(QWidget):
         self.upload_btn.clicked.connect(self.upload_file)
         button_layout.addWidget(self.upload_btn)
         
+        self.cancel_btn = QPushButton("✖ Cancel Upload")
+        self.cancel_btn.setMinimumHeight(50)
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.cancel_upload)
+        button_layout.addWidget(self.cancel_btn)
+        
         card_layout.addLayout(button_layout)
         
         # Progress bar
@@ -214,19 +268,16 @@ class UploadWidget(QWidget):
             QMessageBox.warning(self, "Error", "Please select a CSV file")
             return
         
+        # Large files are uploaded in resumable chunks
         file_size = os.path.getsize(file_path)
-        if file_size > 10 * 1024 * 1024:  # 10MB
-            QMessageBox.warning(self, "Error", "File size must be less than 10MB")
-            return
         
         self.selected_file = file_path
         filename = os.path.basename(file_path)
-        size_kb = file_size / 1024
         
         # Update UI
         self.file_icon.setText("📄")
         self.file_label.setText(filename)
-        self.file_subtext.setText(f"{size_kb:.2f} KB")
+        self.file_subtext.setText(format_size(file_size))
         self.upload_btn.setEnabled(True)
         
         self.drop_zone.setStyleSheet("""
@@ -246,19 +297,52 @@ class UploadWidget(QWidget):
         self.browse_btn.setEnabled(False)
         self.upload_btn.setEnabled(False)
         self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # Indeterminate progress
+        self.progress_bar.setRange(0, 0)  # Indeterminate until the first chunk
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.setVisible(True)
         
         # Start upload thread
         self.upload_thread = UploadThread(self.api_client, self.selected_file)
         self.upload_thread.success.connect(self.on_upload_success)
+        self.upload_thread.uploaded.connect(self.on_upload_bytes)
+        self.upload_thread.progress.connect(self.on_upload_progress)
         self.upload_thread.error.connect(self.on_upload_error)
+        self.upload_thread.cancelled.connect(self.on_upload_cancelled)
         self.upload_thread.start()
     
-    def on_upload_success(self, dataset):
-        """Handle successful upload"""
+    def cancel_upload(self):
+        """Cancel the running upload"""
+        if self.upload_thread is None:
+            return
+        self.cancel_btn.setEnabled(False)
+        self.file_subtext.setText("Cancelling...")
+        self.upload_thread.cancel()
+    
+    def on_upload_bytes(self, uploaded, total):
+        """Show how much of the file has been uploaded"""
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(int(1000 * uploaded / total) if total else 1000)
+        self.file_subtext.setText(
+            f"Uploading... {100 * uploaded / total:.0f}% ({format_size(uploaded)} of {format_size(total)})"
+        )
+    
+    def on_upload_progress(self, rows_processed):
+        """Show how many rows the server has processed so far"""
+        # Back to indeterminate: the row count of the file is unknown
+        self.progress_bar.setRange(0, 0)
+        if rows_processed:
+            self.file_subtext.setText(f"Processing... {rows_processed:,} rows")
+    
+    def finish_upload(self):
+        """Restore the controls once an upload has ended"""
         self.progress_bar.setVisible(False)
+        self.cancel_btn.setVisible(False)
         self.browse_btn.setEnabled(True)
         self.upload_btn.setEnabled(True)
+    
+    def on_upload_success(self, dataset):
+        """Handle successful upload"""
+        self.finish_upload()
         
         QMessageBox.information(
             self,
@@ -270,11 +354,14 @@ class UploadWidget(QWidget):
         self.upload_success.emit(dataset)
         self.reset_ui()
     
+    def on_upload_cancelled(self):
+        """Handle a cancelled upload"""
+        self.finish_upload()
+        self.file_subtext.setText("Upload cancelled")
+    
     def on_upload_error(self, error_msg):
         """Handle upload error"""
-        self.progress_bar.setVisible(False)
-        self.browse_btn.setEnabled(True)
-        self.upload_btn.setEnabled(True)
+        self.finish_upload()
         
         QMessageBox.critical(
             self,
@@ -287,7 +374,7 @@ class UploadWidget(QWidget):
         self.selected_file = None
         self.file_icon.setText("📤")
         self.file_label.setText("Click to browse or drag and drop")
-        self.file_subtext.setText("CSV files only (max 10MB)")
+        self.file_subtext.setText("CSV files only")
         self.upload_btn.setEnabled(False)
         self.drop_zone.setStyleSheet("""
             QFrame {
@@ -3,22 +3,23 @@ Visualization widget with charts and tables
 """
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QFrame,
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
+    QTableView, QHeaderView, QFrame, QTabWidget,
     QScrollArea, QFileDialog, QMessageBox
 )
-from PyQt5.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from PyQt5.QtCore import Qt, QTimer
+from .charts import DistributionChart, TypeMeansChart
+from .records_model import RecordsProxyModel, RecordsTableModel
+from .workers import error_message
 
 
 class VisualizationWidget(QWidget):
     """Widget for data visualization"""
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, executor):
         super().__init__()
         self.api_client = api_client
+        self.executor = executor
         self.dataset = None
         self.init_ui()
     
@@ -30,8 +31,27 @@ class VisualizationWidget(QWidget):
         scroll.setStyleSheet("QScrollArea { border: none; }")
         
         container = QWidget()
-        self.main_layout = QVBoxLayout(container)
+        container_layout = QVBoxLayout(container)
+        container_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.empty_label = QLabel("📊 No dataset loaded\n\nUpload a CSV file to view analysis")
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.empty_label.setStyleSheet("""
+            color: #6b7280;
+            font-size: 16pt;
+            padding: 80px;
+        """)
+        container_layout.addWidget(self.empty_label)
+        
+        # Sections are built once and updated in place for each dataset
+        self.content = QWidget()
+        self.main_layout = QVBoxLayout(self.content)
+        self.main_layout.setContentsMargins(0, 0, 0, 0)
         self.main_layout.setSpacing(24)
+        self.create_summary_section()
+        self.create_charts_section()
+        self.create_table_section()
+        container_layout.addWidget(self.content)
         
         scroll.setWidget(container)
         
@@ -44,20 +64,8 @@ class VisualizationWidget(QWidget):
     
     def show_empty_state(self):
         """Show empty state when no dataset"""
-        # Clear existing widgets
-        while self.main_layout.count():
-            child = self.main_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-        
-        empty_label = QLabel("📊 No dataset loaded\n\nUpload a CSV file to view analysis")
-        empty_label.setAlignment(Qt.AlignCenter)
-        empty_label.setStyleSheet("""
-            color: #6b7280;
-            font-size: 16pt;
-            padding: 80px;
-        """)
-        self.main_layout.addWidget(empty_label)
+        self.content.setVisible(False)
+        self.empty_label.setVisible(True)
     
     def set_dataset(self, dataset):
         """Set dataset and display visualizations"""
@@ -66,20 +74,22 @@ class VisualizationWidget(QWidget):
     
     def display_data(self):
         """Display dataset visualizations"""
-        # Clear existing widgets
-        while self.main_layout.count():
-            child = self.main_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-        
-        # Summary section
-        self.create_summary_section()
-        
-        # Charts section
-        self.create_charts_section()
-        
-        # Table section
-        self.create_table_section()
+        self.update_summary_section()
+        
+        # Only the chart on the current tab draws now; the others draw when shown
+        chart_data = self.dataset.get('chart_data', {})
+        for chart in self.charts:
+            chart.set_chart_data(chart_data)
+        
+        self.filter_timer.stop()
+        self.record_filter.blockSignals(True)
+        self.record_filter.clear()
+        self.record_filter.blockSignals(False)
+        self.records_proxy.setFilterFixedString("")
+        self.records_model.load(self.dataset['id'], self.dataset['total_count'])
+        
+        self.empty_label.setVisible(False)
+        self.content.setVisible(True)
     
     def create_summary_section(self):
         """Create summary statistics section"""
@@ -91,15 +101,13 @@ class VisualizationWidget(QWidget):
         title.setObjectName("sectionLabel")
         title_container.addWidget(title)
         
-        subtitle = QLabel(self.dataset['filename'])
-        subtitle.setStyleSheet("color: white; font-size: 14pt; font-weight: 600;")
-        title_container.addWidget(subtitle)
+        self.filename_label = QLabel()
+        self.filename_label.setStyleSheet("color: white; font-size: 14pt; font-weight: 600;")
+        title_container.addWidget(self.filename_label)
         
-        upload_time = self.dataset.get('uploaded_at', '')
-        if upload_time:
-            time_label = QLabel(f"Uploaded: {upload_time[:19].replace('T', ' ')}")
-            time_label.setStyleSheet("color: #6b7280; font-size: 10pt;")
-            title_container.addWidget(time_label)
+        self.time_label = QLabel()
+        self.time_label.setStyleSheet("color: #6b7280; font-size: 10pt;")
+        title_container.addWidget(self.time_label)
         
         header.addLayout(title_container)
         header.addStretch()
@@ -117,18 +125,32 @@ class VisualizationWidget(QWidget):
         stats_container.setSpacing(16)
         
         stats = [
-            ("📦", "Total Equipment", str(self.dataset['total_count']), ""),
-            ("💨", "Avg Flowrate", f"{self.dataset['avg_flowrate']:.2f}", "m³/h"),
-            ("🔧", "Avg Pressure", f"{self.dataset['avg_pressure']:.2f}", "bar"),
-            ("🌡️", "Avg Temperature", f"{self.dataset['avg_temperature']:.2f}", "°C"),
+            ("total_count", "📦", "Total Equipment", ""),
+            ("avg_flowrate", "💨", "Avg Flowrate", "m³/h"),
+            ("avg_pressure", "🔧", "Avg Pressure", "bar"),
+            ("avg_temperature", "🌡️", "Avg Temperature", "°C"),
         ]
         
-        for icon, label, value, unit in stats:
-            card = self.create_stat_card(icon, label, value, unit)
+        # Value labels by dataset field, refilled for each dataset
+        self.stat_values = {}
+        for field, icon, label, unit in stats:
+            card = self.create_stat_card(icon, label, "", unit)
+            self.stat_values[field] = card.findChild(QLabel, "statValue")
             stats_container.addWidget(card)
         
         self.main_layout.addLayout(stats_container)
     
+    def update_summary_section(self):
+        """Fill the summary section with the current dataset"""
+        self.filename_label.setText(self.dataset['filename'])
+        upload_time = self.dataset.get('uploaded_at', '')
+        self.time_label.setText(f"Uploaded: {upload_time[:19].replace('T', ' ')}" if upload_time else "")
+        self.time_label.setVisible(bool(upload_time))
+        
+        self.stat_values['total_count'].setText(str(self.dataset['total_count']))
+        for field in ('avg_flowrate', 'avg_pressure', 'avg_temperature'):
+            self.stat_values[field].setText(f"{self.dataset[field]:.2f}")
+    
     def create_stat_card(self, icon, label, value, unit):
         """Create a stat card widget"""
         card = QFrame()
@@ -161,6 +183,7 @@ class VisualizationWidget(QWidget):
         text_layout.addWidget(label_widget)
         
         value_widget = QLabel(value)
+        value_widget.setObjectName("statValue")
         value_widget.setStyleSheet("""
             color: #5df2d6;
             font-size: 20pt;
@@ -184,126 +207,17 @@ class VisualizationWidget(QWidget):
         section_title.setObjectName("sectionLabel")
         self.main_layout.addWidget(section_title)
         
-        # Charts container
-        charts_layout = QHBoxLayout()
-        charts_layout.setSpacing(16)
-        
-        # Equipment distribution pie chart
-        pie_chart = self.create_pie_chart()
-        charts_layout.addWidget(pie_chart)
-        
-        # Parameters bar chart
-        bar_chart = self.create_bar_chart()
-        charts_layout.addWidget(bar_chart)
-        
-        self.main_layout.addLayout(charts_layout)
-    
-    def create_pie_chart(self):
-        """Create equipment type distribution pie chart"""
-        card = QFrame()
-        card.setStyleSheet("""
-            QFrame {
-                background: rgba(26, 31, 58, 0.4);
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                border-radius: 12px;
-                padding: 20px;
-            }
-        """)
-        
-        layout = QVBoxLayout(card)
-        
-        title = QLabel("Equipment Type Distribution")
-        title.setStyleSheet("color: white; font-size: 14pt; font-weight: 600;")
-        layout.addWidget(title)
-        
-        # Create matplotlib figure
-        fig = Figure(figsize=(6, 5), facecolor='#0a0e27')
-        ax = fig.add_subplot(111)
-        
-        distribution = self.dataset.get('equipment_distribution', {})
-        if distribution:
-            labels = list(distribution.keys())
-            sizes = list(distribution.values())
-            
-            colors = ['#1a237e', '#0288d1', '#00bfa5', '#534bae', '#5eb8ff', '#5df2d6']
-            
-            ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90,
-                   colors=colors[:len(labels)], textprops={'color': 'white'})
-            ax.axis('equal')
+        # One persistent chart per tab; hidden tabs are not drawn
+        self.distribution_chart = DistributionChart(self.executor)
+        self.type_means_chart = TypeMeansChart(self.executor)
+        self.charts = [self.distribution_chart, self.type_means_chart]
         
-        ax.set_facecolor('#0a0e27')
-        fig.tight_layout()
+        self.chart_tabs = QTabWidget()
+        self.chart_tabs.addTab(self.distribution_chart, "Type Distribution")
+        self.chart_tabs.addTab(self.type_means_chart, "Averages by Type")
+        self.chart_tabs.setMinimumHeight(600)
         
-        canvas = FigureCanvas(fig)
-        canvas.setStyleSheet("background: transparent;")
-        layout.addWidget(canvas)
-        
-        return card
-    
-    def create_bar_chart(self):
-        """Create average parameters bar chart"""
-        card = QFrame()
-        card.setStyleSheet("""
-            QFrame {
-                background: rgba(26, 31, 58, 0.4);
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                border-radius: 12px;
-                padding: 20px;
-            }
-        """)
-        
-        layout = QVBoxLayout(card)
-        
-        title = QLabel("Average Parameters by Type")
-        title.setStyleSheet("color: white; font-size: 14pt; font-weight: 600;")
-        layout.addWidget(title)
-        
-        # Create matplotlib figure
-        fig = Figure(figsize=(6, 5), facecolor='#0a0e27')
-        ax = fig.add_subplot(111)
-        
-        # Calculate averages by type
-        records = self.dataset.get('records', [])
-        type_data = {}
-        
-        for record in records:
-            eq_type = record['equipment_type']
-            if eq_type not in type_data:
-                type_data[eq_type] = {'flowrate': [], 'pressure': [], 'temperature': []}
-            
-            type_data[eq_type]['flowrate'].append(record['flowrate'])
-            type_data[eq_type]['pressure'].append(record['pressure'])
-            type_data[eq_type]['temperature'].append(record['temperature'])
-        
-        types = list(type_data.keys())
-        avg_flowrate = [sum(type_data[t]['flowrate']) / len(type_data[t]['flowrate']) for t in types]
-        avg_pressure = [sum(type_data[t]['pressure']) / len(type_data[t]['pressure']) for t in types]
-        
-        x = range(len(types))
-        width = 0.35
-        
-        ax.bar([i - width/2 for i in x], avg_flowrate, width, label='Flowrate (m³/h)', color='#00bfa5')
-        ax.bar([i + width/2 for i in x], avg_pressure, width, label='Pressure (bar)', color='#0288d1')
-        
-        ax.set_xlabel('Equipment Type', color='#b0b8d4')
-        ax.set_ylabel('Average Value', color='#b0b8d4')
-        ax.set_xticks(x)
-        ax.set_xticklabels(types, rotation=45, ha='right', color='#b0b8d4')
-        ax.tick_params(colors='#b0b8d4')
-        ax.legend(facecolor='#1a1f3a', edgecolor='#00bfa5', labelcolor='white')
-        ax.set_facecolor('#0a0e27')
-        ax.spines['bottom'].set_color('#b0b8d4')
-        ax.spines['top'].set_color('#b0b8d4')
-        ax.spines['left'].set_color('#b0b8d4')
-        ax.spines['right'].set_color('#b0b8d4')
-        
-        fig.tight_layout()
-        
-        canvas = FigureCanvas(fig)
-        canvas.setStyleSheet("background: transparent;")
-        layout.addWidget(canvas)
-        
-        return card
+        self.main_layout.addWidget(self.chart_tabs)
     
     def create_table_section(self):
         """Create data table section"""
@@ -311,41 +225,69 @@ class VisualizationWidget(QWidget):
         section_title.setObjectName("sectionLabel")
         self.main_layout.addWidget(section_title)
         
-        # Table
-        table = QTableWidget()
+        # Filter
+        filter_layout = QHBoxLayout()
+        self.record_filter = QLineEdit()
+        self.record_filter.setPlaceholderText("Filter by equipment name...")
+        filter_layout.addWidget(self.record_filter)
+        self.records_label = QLabel()
+        self.records_label.setStyleSheet("color: #6b7280; font-size: 10pt;")
+        filter_layout.addWidget(self.records_label)
+        self.main_layout.addLayout(filter_layout)
+        
+        # Records are fetched page by page as the table scrolls
+        self.records_model = RecordsTableModel(self.api_client, self.executor, self)
+        self.records_proxy = RecordsProxyModel(self)
+        self.records_proxy.setSourceModel(self.records_model)
+        
+        table = QTableView()
         table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background: rgba(26, 31, 58, 0.4);
                 border-radius: 12px;
             }
         """)
-        
-        records = self.dataset.get('records', [])
-        
-        # Set up table
-        table.setColumnCount(6)
-        table.setRowCount(len(records))
-        table.setHorizontalHeaderLabels([
-            '#', 'Equipment Name', 'Type', 'Flowrate (m³/h)', 'Pressure (bar)', 'Temperature (°C)'
-        ])
-        
-        # Populate table
-        for i, record in enumerate(records):
-            table.setItem(i, 0, QTableWidgetItem(str(i + 1)))
-            table.setItem(i, 1, QTableWidgetItem(record['equipment_name']))
-            table.setItem(i, 2, QTableWidgetItem(record['equipment_type']))
-            table.setItem(i, 3, QTableWidgetItem(f"{record['flowrate']:.2f}"))
-            table.setItem(i, 4, QTableWidgetItem(f"{record['pressure']:.2f}"))
-            table.setItem(i, 5, QTableWidgetItem(f"{record['temperature']:.2f}"))
+        table.setModel(self.records_proxy)
         
         # Configure table
         table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Fixed row heights let the view skip measuring every row
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table.verticalHeader().setDefaultSectionSize(28)
+        table.verticalHeader().setVisible(False)
         table.setAlternatingRowColors(True)
-        table.setEditTriggers(QTableWidget.NoEditTriggers)
-        table.setSelectionBehavior(QTableWidget.SelectRows)
-        table.setMaximumHeight(400)
+        table.setEditTriggers(QTableView.NoEditTriggers)
+        table.setSelectionBehavior(QTableView.SelectRows)
+        # Records start in upload order; the first click on a header sorts
+        table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        table.setSortingEnabled(True)
+        # A bounded height keeps the view from fetching every page to fill itself
+        table.setFixedHeight(400)
         
         self.main_layout.addWidget(table)
+        
+        # Debounce typing so the server is queried once per pause
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(300)
+        self.filter_timer.timeout.connect(
+            lambda: self.records_proxy.set_name_filter(self.record_filter.text().strip())
+        )
+        self.record_filter.textChanged.connect(self.filter_timer.start)
+        
+        self.records_model.modelReset.connect(self.update_records_label)
+        self.records_model.page_loaded.connect(self.update_records_label)
+        self.records_model.load_failed.connect(
+            lambda message: QMessageBox.critical(self, "Error", f"Failed to load dataset records: {message}")
+        )
+    
+    def update_records_label(self):
+        """Show how many records are loaded"""
+        loaded = self.records_model.rowCount()
+        if self.records_model.fully_loaded:
+            self.records_label.setText(f"{loaded:,} records")
+        else:
+            self.records_label.setText(f"{loaded:,} of {self.records_model.total_count:,} records loaded")
     
     def download_pdf(self):
         """Download PDF report"""
@@ -357,16 +299,16 @@ class VisualizationWidget(QWidget):
         )
         
         if file_path:
-            try:
-                self.api_client.download_pdf(self.dataset['id'], file_path)
-                QMessageBox.information(
+            self.executor.submit(
+                self.api_client.download_pdf, self.dataset['id'], file_path,
+                on_success=lambda _: QMessageBox.information(
                     self,
                     "Success",
                     f"PDF report saved to:\n{file_path}"
-                )
-            except Exception as e:
-                QMessageBox.critical(
+                ),
+                on_error=lambda e: QMessageBox.critical(
                     self,
                     "Error",
-                    f"Failed to download PDF: {str(e)}"
+                    f"Failed to download PDF: {error_message(e)}"
                 )
+            )
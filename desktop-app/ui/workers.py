@@ -0,0 +1,136 @@
+"""
+Background execution of API calls
+"""
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+def error_message(error):
+    """User-facing message of an API call exception, preferring the server's error"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            return response.json().get('error', str(error))
+        except Exception:
+            pass
+    return str(error)
+
+
+class RequestSignals(QObject):
+    """Signals of a RequestTask, delivered on the GUI thread"""
+
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class RequestTask(QRunnable):
+    """API call run on a thread pool thread"""
+
+    def __init__(self, fn, args, kwargs):
+        super().__init__()
+        # The executor keeps the task until it has finished
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = RequestSignals()
+        self.cancelled = False
+
+    def cancel(self):
+        """Drop the result; a call already in flight still runs to completion"""
+        self.cancelled = True
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(e)
+        else:
+            if not self.cancelled:
+                self.signals.succeeded.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class RequestExecutor(QObject):
+    """
+    Runs API calls on a QThreadPool and reports results through callbacks
+
+    Callbacks run on the GUI thread, so they can update widgets directly.
+    Calls submitted with the same key supersede each other: starting one
+    cancels the previous, whose result is then never delivered (e.g. a
+    dataset clicked in the history while another is still loading).
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._tasks = set()
+        self._latest = {}
+
+    @property
+    def busy(self):
+        """Whether any call is queued or in flight"""
+        return bool(self._tasks)
+
+    def submit(self, fn, *args, on_success=None, on_error=None, key=None, **kwargs):
+        """
+        Call fn(*args, **kwargs) on a worker thread
+
+        Args:
+            fn: Callable, usually an APIClient method
+            on_success: Called with the return value
+            on_error: Called with the raised exception
+            key: Calls with the same key supersede each other
+
+        Returns:
+            The RequestTask, which can be cancelled
+        """
+        if key is not None:
+            self.cancel(key)
+
+        task = RequestTask(fn, args, kwargs)
+        if on_success is not None:
+            task.signals.succeeded.connect(on_success)
+        if on_error is not None:
+            task.signals.failed.connect(on_error)
+        task.signals.finished.connect(lambda: self._finish(task, key))
+
+        was_busy = self.busy
+        self._tasks.add(task)
+        if key is not None:
+            self._latest[key] = task
+        self.pool.start(task)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return task
+
+    def cancel(self, key):
+        """Cancel the latest call submitted with a key, if it has not finished"""
+        task = self._latest.pop(key, None)
+        if task is None:
+            return
+        task.cancel()
+        # A call still waiting for a thread never runs
+        if self.pool.tryTake(task):
+            self._finish(task, None)
+
+    def _finish(self, task, key):
+        if task not in self._tasks:
+            return
+        self._tasks.discard(task)
+        if key is not None and self._latest.get(key) is task:
+            del self._latest[key]
+        if not self._tasks:
+            self.busy_changed.emit(False)
+
+    def wait(self, msecs=-1):
+        """Block until every started call has returned (e.g. on shutdown)"""
+        return self.pool.waitForDone(msecs)
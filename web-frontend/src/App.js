@@ -6,7 +6,7 @@ import Charts from './components/Charts';
 import Summary from './components/Summary';
 import History from './components/History';
 import Auth from './components/Auth';
-import { getCurrentUser, logoutUser, getDataset } from './api';
+import { getCurrentUser, logoutUser, getDataset, getAllDatasetRecords, getDatasetChartData } from './api';
 
 function App() {
     const [currentDataset, setCurrentDataset] = useState(null);
@@ -30,18 +30,31 @@ function App() {
         }
     };
 
-    const handleUploadSuccess = (dataset) => {
-        setCurrentDataset(dataset);
+    const handleUploadSuccess = async (dataset) => {
         setRefreshHistory(prev => prev + 1);
+        try {
+            const [records, chartData] = await Promise.all([
+                getAllDatasetRecords(dataset.id),
+                getDatasetChartData(dataset.id),
+            ]);
+            setCurrentDataset({ ...dataset, records, chartData });
+        } catch (err) {
+            console.error("Failed to load dataset records:", err);
+            setCurrentDataset(dataset);
+        }
         setActiveTab('view');
     };
 
     const handleDatasetSelect = async (dataset) => {
         try {
             // Use summary dataset initially or show loading
-            // Fetch full details
-            const fullDataset = await getDataset(dataset.id);
-            setCurrentDataset(fullDataset);
+            // Fetch full details and the paginated records
+            const [fullDataset, records, chartData] = await Promise.all([
+                getDataset(dataset.id),
+                getAllDatasetRecords(dataset.id),
+                getDatasetChartData(dataset.id),
+            ]);
+            setCurrentDataset({ ...fullDataset, records, chartData });
             setActiveTab('view');
         } catch (err) {
             console.error("Failed to load full dataset:", err);
@@ -11,18 +11,44 @@ const api = axios.create({
 });
 
 // Equipment Dataset APIs
-export const uploadCSV = async (file) => {
+const UPLOAD_POLL_INTERVAL = 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export const getUploadJob = async (jobId) => {
+  const response = await api.get(`/jobs/${jobId}/`);
+  return response.data;
+};
+
+// Queue the file for background ingestion and poll the job until it finishes.
+// onProgress is called with the job on every poll.
+export const uploadCSV = async (file, onProgress) => {
   const formData = new FormData();
   formData.append('file', file);
 
   const response = await axios.post(`${API_BASE_URL}/upload/`, formData, {
+    params: { async: 1 },
     headers: {
       'Content-Type': 'multipart/form-data',
     },
     withCredentials: true,
   });
 
-  return response.data;
+  let job = response.data;
+  while (job.status === 'queued' || job.status === 'running') {
+    await sleep(UPLOAD_POLL_INTERVAL);
+    job = await getUploadJob(job.id);
+    if (onProgress) onProgress(job);
+  }
+
+  if (job.status === 'failed') {
+    const error = new Error(job.error);
+    error.response = { data: { error: job.error } };
+    throw error;
+  }
+
+  const dataset = await api.get(`/datasets/${job.dataset}/`);
+  return dataset.data;
 };
 
 export const getDatasetSummary = async (datasetId) => {
@@ -45,8 +71,67 @@ export const getDataset = async (datasetId) => {
   return response.data;
 };
 
-export const downloadPDF = async (datasetId) => {
+export const getDatasetRecords = async (datasetId, params = {}) => {
+  const response = await api.get(`/datasets/${datasetId}/records/`, { params });
+  return response.data;
+};
+
+export const getDatasetChartData = async (datasetId, points = 2000) => {
+  const response = await api.get(`/datasets/${datasetId}/chart-data/`, { params: { points } });
+  return response.data;
+};
+
+export const compareDatasets = async (baselineId, datasetId, limit = 100) => {
+  const response = await api.get('/datasets/compare/', { params: { a: baselineId, b: datasetId, limit } });
+  return response.data;
+};
+
+export const getTrends = async (equipment = []) => {
+  const params = equipment.length ? { equipment: equipment.join(',') } : {};
+  const response = await api.get('/trends/', { params });
+  return response.data;
+};
+
+export const getDatasetAggregates = async (datasetId) => {
+  const response = await api.get(`/datasets/${datasetId}/aggregates/`);
+  return response.data;
+};
+
+// Loads every record through the columnar fast path and rebuilds row objects
+export const getAllDatasetRecords = async (datasetId, params = {}) => {
+  let page = await getDatasetRecords(datasetId, { shape: 'columnar', limit: 50000, ...params });
+  const records = [];
+
+  for (;;) {
+    const { columns } = page;
+    const fields = Object.keys(columns);
+    for (let i = 0; i < page.count; i++) {
+      const record = {};
+      fields.forEach((field) => {
+        record[field] = columns[field][i];
+      });
+      records.push(record);
+    }
+
+    if (!page.next) break;
+    const response = await axios.get(page.next, { withCredentials: true });
+    page = response.data;
+  }
+
+  return records;
+};
+
+export const downloadPDF = async (datasetId, allRecords = false) => {
   const response = await axios.get(`${API_BASE_URL}/datasets/${datasetId}/download_pdf/`, {
+    params: allRecords ? { records: 'all' } : undefined,
+    responseType: 'blob',
+    withCredentials: true,
+  });
+  return response.data;
+};
+
+export const downloadCSV = async (datasetId) => {
+  const response = await axios.get(`${API_BASE_URL}/datasets/${datasetId}/download_csv/`, {
     responseType: 'blob',
     withCredentials: true,
   });
@@ -102,39 +102,12 @@ function Charts({ dataset }) {
         ],
     };
 
-    // Average Parameters by Type (Bar Chart)
-    const records = dataset.records || [];
-    const typeAverages = {};
-
-    records.forEach((record) => {
-        if (!typeAverages[record.equipment_type]) {
-            typeAverages[record.equipment_type] = {
-                flowrate: [],
-                pressure: [],
-                temperature: [],
-            };
-        }
-        typeAverages[record.equipment_type].flowrate.push(record.flowrate);
-        typeAverages[record.equipment_type].pressure.push(record.pressure);
-        typeAverages[record.equipment_type].temperature.push(record.temperature);
-    });
-
-    const types = Object.keys(typeAverages);
-    const avgFlowrates = types.map(
-        (type) =>
-            typeAverages[type].flowrate.reduce((a, b) => a + b, 0) /
-            typeAverages[type].flowrate.length
-    );
-    const avgPressures = types.map(
-        (type) =>
-            typeAverages[type].pressure.reduce((a, b) => a + b, 0) /
-            typeAverages[type].pressure.length
-    );
-    const avgTemperatures = types.map(
-        (type) =>
-            typeAverages[type].temperature.reduce((a, b) => a + b, 0) /
-            typeAverages[type].temperature.length
-    );
+    // Average Parameters by Type (Bar Chart), from the server-side chart data
+    const chartData = dataset.chartData || { types: [], type_means: {} };
+    const types = chartData.types;
+    const avgFlowrates = chartData.type_means.flowrate || [];
+    const avgPressures = chartData.type_means.pressure || [];
+    const avgTemperatures = chartData.type_means.temperature || [];
 
     const parametersBarData = {
         labels: types,
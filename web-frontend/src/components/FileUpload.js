@@ -4,6 +4,7 @@ import { uploadCSV } from '../api';
 function FileUpload({ onUploadSuccess }) {
     const [file, setFile] = useState(null);
     const [uploading, setUploading] = useState(false);
+    const [rowsProcessed, setRowsProcessed] = useState(0);
     const [error, setError] = useState('');
     const [dragActive, setDragActive] = useState(false);
 
@@ -57,10 +58,11 @@ function FileUpload({ onUploadSuccess }) {
         }
 
         setUploading(true);
+        setRowsProcessed(0);
         setError('');
 
         try {
-            const result = await uploadCSV(file);
+            const result = await uploadCSV(file, (job) => setRowsProcessed(job.rows_processed));
             onUploadSuccess(result);
             setFile(null);
             document.getElementById('file-input').value = '';
@@ -156,7 +158,9 @@ function FileUpload({ onUploadSuccess }) {
                 {uploading ? (
                     <>
                         <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-white"></div>
-                        Uploading & Processing...
+                        {rowsProcessed > 0
+                            ? `Processing... ${rowsProcessed.toLocaleString()} rows`
+                            : 'Uploading & Processing...'}
                     </>
                 ) : (
                     <>